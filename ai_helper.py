@@ -3,12 +3,14 @@ import aiohttp
 import json
 import asyncio
 import re
-from config import OPENAI_API_KEY, OPENAI_MODEL
+from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL, OPENAI_TIMEOUT_SECONDS
+from http_client import get_session
 
 class AIAssistant:
     def __init__(self, api_key=None):
         self.openai_key = OPENAI_API_KEY
         self.model = OPENAI_MODEL
+        self.base_url = OPENAI_BASE_URL
         self.provider = "openai" if self.openai_key else None
         self.is_available = bool(self.provider)
     
@@ -32,7 +34,7 @@ class AIAssistant:
                 {"role": "user", "content": user_message}
             ]
 
-            url = "https://api.openai.com/v1/chat/completions"
+            url = f"{self.base_url}/chat/completions"
             headers = {
                 "Authorization": f"Bearer {self.openai_key}",
                 "Content-Type": "application/json"
@@ -44,59 +46,59 @@ class AIAssistant:
             }
 
             attempts = 2
+            session = await get_session()
             for attempt in range(1, attempts + 1):
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, headers=headers, json=payload, timeout=aiohttp.ClientTimeout(total=30)) as resp:
-                        text = await resp.text()
-                        if resp.status != 200:
-                            if resp.status == 401:
-                                return "❌ Неверный OpenAI API ключ. Проверьте OPENAI_API_KEY в .env"
-                            elif resp.status == 403:
-                                return "❌ Доступ запрещен. Проверьте права доступа к OpenAI API"
-                            elif resp.status == 404:
-                                return f"❌ Модель {self.model} не найдена. Возможно, у вас нет доступа к GPT-5"
-                            elif resp.status == 429:
-                                if attempt < attempts:
-                                    await asyncio.sleep(1.0 * attempt)  
-                                    continue
-                                return "❌ Превышен лимит запросов OpenAI API. Попробуйте позже"
-                            elif resp.status >= 500:
-                                if attempt < attempts:
-                                    await asyncio.sleep(0.5 * attempt)
-                                    continue
-                                return f"❌ Серверная ошибка OpenAI: {resp.status}"
-                            else:
-                                return f"❌ Ошибка OpenAI API: {resp.status} - {text}"
-                        try:
-                            result = json.loads(text)
-                        except Exception:
+                async with session.post(url, headers=headers, json=payload, timeout=aiohttp.ClientTimeout(total=OPENAI_TIMEOUT_SECONDS)) as resp:
+                    text = await resp.text()
+                    if resp.status != 200:
+                        if resp.status == 401:
+                            return "❌ Неверный OpenAI API ключ. Проверьте OPENAI_API_KEY в .env"
+                        elif resp.status == 403:
+                            return "❌ Доступ запрещен. Проверьте права доступа к OpenAI API"
+                        elif resp.status == 404:
+                            return f"❌ Модель {self.model} не найдена. Возможно, у вас нет доступа к GPT-5"
+                        elif resp.status == 429:
+                            if attempt < attempts:
+                                await asyncio.sleep(1.0 * attempt)  
+                                continue
+                            return "❌ Превышен лимит запросов OpenAI API. Попробуйте позже"
+                        elif resp.status >= 500:
                             if attempt < attempts:
                                 await asyncio.sleep(0.5 * attempt)
                                 continue
-                            return "❌ Неверный ответ от OpenAI (не JSON)"
-
-                        if 'choices' in result and isinstance(result['choices'], list) and result['choices']:
-                            choice = result['choices'][0]
-
-                            if 'message' in choice and isinstance(choice['message'], dict) and 'content' in choice['message']:
-                                return choice['message']['content']
-
-                            if 'text' in choice and isinstance(choice['text'], str):
-                                return choice['text']
-
-                        if 'output' in result and isinstance(result['output'], str):
-                            return result['output']
-                        if 'text' in result and isinstance(result['text'], str):
-                            return result['text']
-
-                        try:
-                            with open('openai_raw_responses.log', 'a', encoding='utf-8') as f:
-                                f.write(f"--- UNEXPECTED RESPONSE FORMAT ---\n")
-                                f.write(f"Model: {self.model}\n")
-                                f.write(f"Response: {text}\n\n")
-                        except Exception:
-                            pass
-                        return "❌ Неожиданный формат ответа от OpenAI. Проверьте логи."
+                            return f"❌ Серверная ошибка OpenAI: {resp.status}"
+                        else:
+                            return f"❌ Ошибка OpenAI API: {resp.status} - {text}"
+                    try:
+                        result = json.loads(text)
+                    except Exception:
+                        if attempt < attempts:
+                            await asyncio.sleep(0.5 * attempt)
+                            continue
+                        return "❌ Неверный ответ от OpenAI (не JSON)"
+
+                    if 'choices' in result and isinstance(result['choices'], list) and result['choices']:
+                        choice = result['choices'][0]
+
+                        if 'message' in choice and isinstance(choice['message'], dict) and 'content' in choice['message']:
+                            return choice['message']['content']
+
+                        if 'text' in choice and isinstance(choice['text'], str):
+                            return choice['text']
+
+                    if 'output' in result and isinstance(result['output'], str):
+                        return result['output']
+                    if 'text' in result and isinstance(result['text'], str):
+                        return result['text']
+
+                    try:
+                        with open('openai_raw_responses.log', 'a', encoding='utf-8') as f:
+                            f.write(f"--- UNEXPECTED RESPONSE FORMAT ---\n")
+                            f.write(f"Model: {self.model}\n")
+                            f.write(f"Response: {text}\n\n")
+                    except Exception:
+                        pass
+                    return "❌ Неожиданный формат ответа от OpenAI. Проверьте логи."
 
         except Exception as e:
             return f"⚠️ OpenAI временно недоступен: {str(e)}"
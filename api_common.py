@@ -0,0 +1,260 @@
+"""
+Общая логика HTTP API мини-аппы: нормализация задач, разбор голосовых фраз
+и проверка Telegram WebApp. Используется и Flask-сервером (api_server.py),
+и асинхронным aiohttp-приложением (api_web.py), чтобы JSON-ответы совпадали.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+
+from config import BOT_TOKEN, INIT_DATA_MAX_AGE_SECONDS, METRICS_TOKEN, SESSION_SECRET, SESSION_TTL_SECONDS
+from database import TOMBSTONE_RETENTION_DAYS
+from nl_parser import parse_phrase
+
+logger = logging.getLogger(__name__)
+
+
+# --------- Нормализация полей задач ---------
+def parse_voice_to_task(text: str) -> dict:
+    """
+    Русская фраза → структура задачи для мини-аппы (title/date/time/category/priority).
+    Разбор — общий с ботом, см. nl_parser.parse_phrase.
+    """
+    return parse_phrase(text).as_api_dict()
+
+
+# --------- Проверка данных Telegram WebApp ---------
+# secret_key = HMAC_SHA256("WebAppData", BOT_TOKEN) не зависит от запроса — считаем один раз
+_WEBAPP_SECRET_KEY = hmac.new(
+    b"WebAppData",
+    BOT_TOKEN.encode(),
+    hashlib.sha256,
+).digest()
+
+
+def verify_telegram_data(init_data: str, max_age: int = INIT_DATA_MAX_AGE_SECONDS) -> dict | None:
+    """
+    Пользователь из initData, если подпись верна и auth_date не старше max_age
+    секунд: иначе перехваченная initData выдавала бы свежие токены вечно
+    """
+    try:
+        parsed_data = dict(urllib.parse.parse_qsl(init_data))
+
+        received_hash = parsed_data.pop("hash", None)
+        if not received_hash:
+            logger.debug("initData без hash")
+            return None
+
+        data_check_string = "\n".join(
+            f"{key}={parsed_data[key]}" for key in sorted(parsed_data)
+        )
+
+        calculated_hash = hmac.new(
+            _WEBAPP_SECRET_KEY,
+            data_check_string.encode(),
+            hashlib.sha256,
+        ).hexdigest()
+
+        if not hmac.compare_digest(calculated_hash, received_hash):
+            logger.debug("initData: hash не совпал")
+            return None
+
+        auth_date = int(parsed_data.get("auth_date", 0))
+        # минута запаса на расхождение часов с серверами Telegram
+        if not -60 <= time.time() - auth_date <= max_age:
+            logger.debug("initData: auth_date %s вне допустимого окна", auth_date)
+            return None
+
+        user_json = parsed_data.get("user")
+        if user_json:
+            return json.loads(user_json)
+
+        return None
+    except Exception as e:
+        logger.warning(f"Ошибка проверки данных Telegram: {e}")
+        return None
+
+
+# --------- Токены сессии ---------
+# Формат: "<user_id>.<telegram_id>.<expires_at>.<подпись>". Проверка — один HMAC
+# без обращения к БД, поэтому её можно делать на каждом запросе.
+_SESSION_KEY = hmac.new(
+    b"FocusUpSession",
+    (SESSION_SECRET or BOT_TOKEN).encode(),
+    hashlib.sha256,
+).digest()
+
+
+def _sign_session(payload: str) -> str:
+    digest = hmac.new(_SESSION_KEY, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def issue_session_token(user_id: int, telegram_id: int, ttl: int = SESSION_TTL_SECONDS) -> str:
+    """Выдаётся в /api/auth после проверки initData"""
+    payload = f"{int(user_id)}.{int(telegram_id)}.{int(time.time()) + ttl}"
+    return f"{payload}.{_sign_session(payload)}"
+
+
+def verify_session_token(token: str | None) -> dict | None:
+    """Токен → {"user_id", "telegram_id", "expires_at"} или None, если подделан/истёк"""
+    if not token:
+        return None
+    try:
+        payload, signature = token.rsplit(".", 1)
+        if not hmac.compare_digest(_sign_session(payload), signature):
+            return None
+        user_id, telegram_id, expires_at = (int(x) for x in payload.split("."))
+    except ValueError:
+        return None
+    if expires_at < time.time():
+        return None
+    return {"user_id": user_id, "telegram_id": telegram_id, "expires_at": expires_at}
+
+
+def authenticate_request(authorization: str | None, claimed_user_id=None):
+    """
+    Проверка заголовка "Authorization: Bearer <token>".
+    Возвращает (session, None, None) или (None, json_ошибки, http_статус).
+    Если клиент всё ещё передаёт user_id, он должен совпадать с токеном.
+    """
+    token = None
+    if authorization and authorization.startswith("Bearer "):
+        token = authorization[7:].strip()
+
+    session = verify_session_token(token)
+    if session is None:
+        return None, {"success": False, "error": "Unauthorized"}, 401
+
+    if claimed_user_id not in (None, ""):
+        try:
+            claimed = int(claimed_user_id)
+        except (TypeError, ValueError):
+            claimed = None
+        if claimed != session["user_id"]:
+            return None, {"success": False, "error": "Forbidden"}, 403
+
+    return session, None, None
+
+
+def metrics_denied(authorization: str | None) -> int | None:
+    """
+    Статус отказа для /metrics и /api/metrics/*: 404, пока METRICS_TOKEN не задан
+    (SQL, тайминги и планы запросов без токена не отдаются), 401 при неверном
+    токене, None — доступ разрешён
+    """
+    if not METRICS_TOKEN:
+        return 404
+    token = authorization[7:].strip() if authorization and authorization.startswith("Bearer ") else ""
+    return None if hmac.compare_digest(token, METRICS_TOKEN) else 401
+
+
+# --------- Сериализация ответов ---------
+def serialize_task(t) -> dict:
+    """Строка в колонках database.API_TASK_COLUMNS → JSON-задача для мини-аппы"""
+    return {
+        "id": t[0],
+        "user_id": t[1],
+        "title": t[2],
+        "category": t[3],
+        "tags": t[4],
+        "deadline": t[5],
+        "completed": bool(t[6]),
+        "created_at": t[7],
+        "updated_at": t[8],
+        "priority": t[9],
+    }
+
+
+# --------- ETag / дельта-синхронизация /api/tasks ---------
+TASKS_CACHE_CONTROL = "private, no-cache"
+SINCE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def tasks_etag(user_id: int, version, max_updated_at) -> str:
+    """ETag списка задач: счётчик изменений пользователя + последний updated_at"""
+    digest = hashlib.sha1(f"{user_id}:{version}:{max_updated_at}".encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Проверка If-None-Match (список через запятую, W/-префикс, «*»)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _utcnow_str() -> str:
+    # CURRENT_TIMESTAMP в SQLite — UTC в том же формате
+    return datetime.now(timezone.utc).strftime(SINCE_FORMAT)
+
+
+def parse_since(since: str) -> str | None:
+    """Курсор ?since= → 'YYYY-MM-DD HH:MM:SS' (как updated_at в БД) или None, если формат неверный"""
+    try:
+        return datetime.strptime(since.strip().replace("T", " "), SINCE_FORMAT).strftime(SINCE_FORMAT)
+    except (ValueError, AttributeError):
+        return None
+
+
+def since_is_expired(since: str) -> bool:
+    """Надгробия старше TOMBSTONE_RETENTION_DAYS удалены — по такому курсору нужна полная выдача"""
+    horizon = datetime.now(timezone.utc) - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    return since < horizon.strftime(SINCE_FORMAT)
+
+
+def tasks_full_payload(rows, max_updated_at) -> dict:
+    return {
+        "success": True,
+        "full": True,
+        "tasks": [serialize_task(t) for t in rows],
+        "deleted": [],
+        "cursor": max_updated_at or _utcnow_str(),
+    }
+
+
+def tasks_delta_payload(changed, deleted, since: str) -> dict:
+    """Ответ ?since=: изменённые задачи, id удалённых и новый курсор"""
+    cursor = max(
+        [since]
+        + [t[8] for t in changed if t[8]]
+        + [deleted_at for _, deleted_at in deleted if deleted_at]
+    )
+    return {
+        "success": True,
+        "full": False,
+        "tasks": [serialize_task(t) for t in changed],
+        "deleted": [task_id for task_id, _ in deleted],
+        "cursor": cursor,
+    }
+
+
+def parse_task_status(status) -> bool:
+    """Строковый статус из мини-аппы (completed / in_progress) → bool для БД"""
+    if isinstance(status, bool):
+        return status
+    s = str(status).lower()
+    return s in {"completed", "done", "true", "1"}
+
+
+def extract_recognized_text(raw_result: str) -> str:
+    """Убираем префикс "🎤 Распознанный текст:" из ответа voice_recognition.py"""
+    text = raw_result
+    if text.startswith("🎤"):
+        parts = text.split("\n\n", 1)
+        if len(parts) == 2:
+            text = parts[1].strip()
+    return text
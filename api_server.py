@@ -1,23 +1,41 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, g, request, jsonify, send_from_directory, make_response
 from flask_cors import CORS
-import hashlib
-import hmac
-import urllib.parse
-import os, re
-import json
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+import functools
+import logging
 from ai_helper import ai_assistant
 import asyncio
+import threading
 from voice_recognition import voice_recognizer
+from api_common import (
+    parse_voice_to_task,
+    verify_telegram_data,
+    issue_session_token,
+    authenticate_request,
+    TASKS_CACHE_CONTROL,
+    tasks_etag,
+    etag_matches,
+    parse_since,
+    since_is_expired,
+    tasks_full_payload,
+    tasks_delta_payload,
+    parse_task_status,
+    extract_recognized_text,
+    metrics_denied,
+)
+from query_profiler import profiler
+from metrics import REGISTRY, CONTENT_TYPE
 
 
+from config import SESSION_TTL_SECONDS, VOICE_UPLOAD_MAX_BYTES
 from database import (
     init_db,
     add_user,
     get_user_stats,
     add_task,
-    get_user_tasks,
+    get_user_tasks_for_api,
+    get_tasks_version,
+    get_tasks_changed_since,
     update_task_status,
     delete_task,
     add_pomodoro_session,
@@ -26,260 +44,73 @@ from database import (
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+logger = logging.getLogger(__name__)
 
-BOT_TOKEN = os.getenv("BOT_TOKEN")
+app = Flask(__name__)
+CORS(app, expose_headers=["ETag"])
+# Тот же предел тела запроса, что и у aiohttp-версии (api_web.py)
+app.config["MAX_CONTENT_LENGTH"] = VOICE_UPLOAD_MAX_BYTES
 
 # Инициализация базы
 init_db()
 
 
-# --------- Вспомогательное ---------
-def normalize_category(cat: str | None) -> str:
-    """Переводим старые русские категории в кодовые (work/personal/study/health)"""
-    if not cat:
-        return "personal"
-    c = str(cat).lower()
-    if c in {"work", "personal", "study", "health"}:
-        return c
-    if "работ" in c:
-        return "work"
-    if "учеб" in c or "учёб" in c:
-        return "study"
-    if "здоров" in c:
-        return "health"
-    return "personal"
-
-
-def normalize_deadline(deadline: str | None) -> str | None:
-    """
-    Приводим deadline к формату 'dd.mm.yy HH:MM',
-    чтобы всё было как у задач из бота.
-    """
-    if not deadline:
-        return None
+# --------- Постоянный event loop для асинхронных вызовов ---------
+# Flask-вьюхи синхронные, а AI/Whisper — корутины. Вместо asyncio.run() на каждый
+# запрос держим один цикл в фоновом потоке: соединения к OpenAI переиспользуются,
+# а много медленных запросов могут выполняться одновременно.
+_async_loop = None
+_async_loop_lock = threading.Lock()
 
-    try:
-        dt = None
-
-        # Если пришёл ISO из мини-аппа: 2025-11-25T03:41:00
-        if "T" in deadline:
-            try:
-                dt = datetime.fromisoformat(deadline)
-            except ValueError:
-                dt = None
-
-        # Если уже в формате dd.mm.yy HH:MM – просто вернём как есть
-        if dt is None:
-            for fmt in ("%d.%m.%y %H:%M", "%d.%m.%Y %H:%M", "%Y-%m-%d %H:%M:%S"):
-                try:
-                    dt = datetime.strptime(deadline, fmt)
-                    break
-                except ValueError:
-                    continue
-
-        if dt is None:
-            return deadline
-
-        return dt.strftime("%d.%m.%y %H:%M")
-    except Exception:
-        return deadline
+ASYNC_CALL_TIMEOUT = 90
 
 
-def priority_from_tags(tags: str | None) -> str:
-    """Достаём приоритет из поля tags, если оно используется, иначе medium"""
-    if not tags:
-        return "medium"
-    t = str(tags).lower()
-    if "high" in t or "высок" in t or "3" == t.strip():
-        return "high"
-    if "low" in t or "низк" in t or "1" == t.strip():
-        return "low"
-    return "medium"
+def _get_async_loop() -> asyncio.AbstractEventLoop:
+    """Лениво запускаем цикл (после fork у gunicorn-воркеров, а не до него)"""
+    global _async_loop
+    if _async_loop is None:
+        with _async_loop_lock:
+            if _async_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever,
+                    name="api-async-loop",
+                    daemon=True,
+                ).start()
+                _async_loop = loop
+    return _async_loop
 
 
-def parse_voice_to_task(text: str) -> dict:
-    """
-    Очень простой парсер русской фразы в структуру задачи:
-    - дата: сегодня / завтра / послезавтра / 12.03 / 12.03.2025
-    - время: 10:30 / 9.00 и т.п.
-    - категория: по ключевым словам (работа, учеба, здоровье, личное)
-    - приоритет: высокий / средний / низкий / важный / срочный
-    - title: остаток строки без служебных слов
-    """
-    original_text = text.strip()
-    text_low = original_text.lower()
-    now = datetime.now()
-
-    date_str = None
-    time_str = None
-    category = None
-    priority = None
-
-    # ---------- ДАТА ----------
-    date = None
-    if "сегодня" in text_low:
-        date = now.date()
-    elif "завтра" in text_low:
-        date = (now + timedelta(days=1)).date()
-    elif "послезавтра" in text_low:
-        date = (now + timedelta(days=2)).date()
-    else:
-        # ищем формат 12.03, 12/03, 12-03, с годом или без
-        m_date = re.search(r"\b(\d{1,2})[.\-/](\d{1,2})(?:[.\-/](\d{2,4}))?\b", text_low)
-        if m_date:
-            d = int(m_date.group(1))
-            mo = int(m_date.group(2))
-            y = int(m_date.group(3)) if m_date.group(3) else now.year
-            # если год двухзначный — приводим к 20xx
-            if y < 100:
-                y += 2000
-            try:
-                date = datetime(y, mo, d).date()
-            except ValueError:
-                date = None
-
-    if date:
-        date_str = date.strftime("%Y-%m-%d")
-
-    # ---------- ВРЕМЯ ----------
-    m_time = re.search(r"\b(\d{1,2})[:.](\d{2})\b", text_low)
-    if m_time:
-        hh = int(m_time.group(1))
-        mm = int(m_time.group(2))
-        if 0 <= hh <= 23 and 0 <= mm <= 59:
-            time_str = f"{hh:02d}:{mm:02d}"
-
-    # ---------- КАТЕГОРИЯ ----------
-    if any(w in text_low for w in ["работ", "офис", "созвон", "митинг", "совещан"]):
-        category = "work"
-    elif any(w in text_low for w in ["учеб", "универ", "школ", "лекци", "семинар", "дз", "домашк"]):
-        category = "study"
-    elif any(w in text_low for w in ["здоров", "спорт", "трениров", "зал", "врач", "клини", "больниц"]):
-        category = "health"
-    elif any(w in text_low for w in ["дом", "семь", "личн", "друз", "поездк", "покупк"]):
-        category = "personal"
-
-    # ---------- ПРИОРИТЕТ ----------
-    if any(w in text_low for w in ["высок", "самое важное", "очень важно", "срочн", "🔥"]):
-        priority = "high"
-    elif any(w in text_low for w in ["средн", "обычн"]):
-        priority = "medium"
-    elif any(w in text_low for w in ["низк", "несрочн", "когда-нибудь"]):
-        priority = "low"
-
-    # ---------- TITLE (очищаем от "служебного") ----------
-    title = original_text
-
-    # убираем слова сегодня/завтра/послезавтра
-    for w in ["сегодня", "завтра", "послезавтра"]:
-        title = re.sub(rf"\b{w}\b", "", title, flags=re.IGNORECASE)
-
-    # убираем время
-    if m_time:
-        title = title.replace(m_time.group(0), "")
-
-    # убираем дату (формат dd.mm / dd.mm.yyyy)
-    m_date2 = re.search(r"\b(\d{1,2})[.\-/](\d{1,2})(?:[.\-/](\d{2,4}))?\b", title)
-    if m_date2:
-        title = title.replace(m_date2.group(0), "")
-
-    # убираем слова про приоритет
-    for w in [
-        "высокий приоритет",
-        "низкий приоритет",
-        "средний приоритет",
-        "высокий",
-        "низкий",
-        "средний",
-        "приоритет",
-        "важная задача",
-        "важно",
-        "срочно",
-    ]:
-        title = re.sub(rf"\b{w}\b", "", title, flags=re.IGNORECASE)
-
-    # убираем явные слова категорий (чтобы не дублировать)
-    for w in [
-        "по работе",
-        "работа",
-        "рабочее",
-        "учёба",
-        "учеба",
-        "по учёбе",
-        "по учебе",
-        "здоровье",
-        "по здоровью",
-        "личное",
-    ]:
-        title = re.sub(rf"\b{w}\b", "", title, flags=re.IGNORECASE)
-
-    # финальная чистка пробелов/знаков
-    title = re.sub(r"\s+", " ", title).strip(" ,.-")
-
-    if not title:
-        title = original_text
-
-    return {
-        "title": title,
-        "date": date_str,
-        "time": time_str,
-        "category": category,
-        "priority": priority,
-    }
-
-
-# --------- Проверка данных Telegram WebApp ---------
-def verify_telegram_data(init_data: str) -> dict | None:
+def run_async(coro, timeout: float = ASYNC_CALL_TIMEOUT):
+    """Выполняет корутину на постоянном цикле и ждёт результат в потоке запроса"""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_async_loop())
     try:
-        parsed_data = dict(urllib.parse.parse_qsl(init_data))
-        print("parsed_data:", parsed_data)
-
-        received_hash = parsed_data.pop("hash", None)
-        if not received_hash:
-            print("NO HASH IN DATA")
-            return None
-
-        data_check_arr = []
-        for key in sorted(parsed_data.keys()):
-            value = parsed_data[key]
-            data_check_arr.append(f"{key}={value}")
-        data_check_string = "\n".join(data_check_arr)
-
-        print("data_check_string:", data_check_string)
-
-        # secret_key = HMAC_SHA256("WebAppData", BOT_TOKEN)
-        secret_key = hmac.new(
-            b"WebAppData",
-            BOT_TOKEN.encode(),
-            hashlib.sha256,
-        ).digest()
-
-        calculated_hash = hmac.new(
-            secret_key,
-            data_check_string.encode(),
-            hashlib.sha256,
-        ).hexdigest()
-
-        print("calculated_hash:", calculated_hash)
-        print("received_hash:", received_hash)
-
-        if calculated_hash != received_hash:
-            print("HASH MISMATCH!")
-            return None
-
-        user_json = parsed_data.get("user")
-        if user_json:
-            return json.loads(user_json)
-
-        return None
-    except Exception as e:
-        print(f"Error verifying Telegram data: {e}")
-        return None
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
 
 
 # --------- AUTH ---------
+def require_session(view):
+    """Пускает только запросы с валидным токеном сессии; user_id берём из токена"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        claimed_user_id = request.args.get("user_id")
+        if claimed_user_id is None and request.is_json:
+            claimed_user_id = (request.get_json(silent=True) or {}).get("user_id")
+
+        session, error, status = authenticate_request(
+            request.headers.get("Authorization"), claimed_user_id
+        )
+        if error:
+            return jsonify(error), status
+
+        g.user_id = session["user_id"]
+        return view(*args, **kwargs)
+    return wrapper
+
+
 @app.route("/api/auth", methods=["POST"])
 def auth():
     data = request.json or {}
@@ -307,6 +138,8 @@ def auth():
     return jsonify(
         {
             "success": True,
+            "token": issue_session_token(internal_id, telegram_id),
+            "expires_in": SESSION_TTL_SECONDS,
             "user": {
                 "id": internal_id,
                 "telegram_id": telegram_id,
@@ -320,86 +153,58 @@ def auth():
 
 # --------- TASKS ---------
 @app.route('/api/tasks', methods=['GET'])
+@require_session
 def get_tasks():
-    user_id = request.args.get('user_id')
-    if not user_id:
-        return jsonify({'success': False, 'error': 'user_id required'}), 400
-
-    rows = get_user_tasks(int(user_id))
-    tasks_clean = []
-
-    for t in rows:
-        # Если база возвращает dict (частый вариант)
-        if isinstance(t, dict):
-            task_id = t.get("id")
-            uid = t.get("user_id")
-            title = t.get("title") or t.get("task")
-            category_raw = t.get("category")
-            tags = t.get("tags")
-            deadline_raw = t.get("deadline")
-            completed = t.get("completed", 0)
-            created_at = t.get("created_at")
-            updated_at = t.get("updated_at")
-            priority_raw = t.get("priority")
+    """
+    Список задач. Отдаёт ETag: если список не менялся — 304 без тела.
+    С ?since=<cursor> возвращает только изменённые задачи и id удалённых.
+    """
+    since = request.args.get("since")
+    if since:
+        since = parse_since(since)
+        if since is None:
+            return jsonify({"success": False, "error": "invalid since"}), 400
+
+    version, max_updated_at = get_tasks_version(g.user_id)
+    etag = tasks_etag(g.user_id, version, max_updated_at)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = make_response("", 304)
+    else:
+        if since and not since_is_expired(since):
+            changed, deleted = get_tasks_changed_since(g.user_id, since)
+            payload = tasks_delta_payload(changed, deleted, since)
         else:
-            # Если возвращается tuple / list — аккуратно берём по индексам
-            task_id      = t[0] if len(t) > 0 else None
-            uid          = t[1] if len(t) > 1 else None
-            title        = t[2] if len(t) > 2 else None
-            category_raw = t[3] if len(t) > 3 else None
-            tags         = t[4] if len(t) > 4 else None
-            deadline_raw = t[5] if len(t) > 5 else None
-            completed    = t[6] if len(t) > 6 else 0
-            created_at   = t[7] if len(t) > 7 else None
-            updated_at   = t[8] if len(t) > 8 else None
-            priority_raw = t[9] if len(t) > 9 else None
-
-        category = normalize_category(category_raw)
-        deadline_norm = normalize_deadline(deadline_raw)
-
-        # приоритет берём из колонки, а если нет — из tags
-        pr = priority_raw or priority_from_tags(tags)
-        if pr not in ("low", "medium", "high"):
-            pr = "medium"
-
-        tasks_clean.append({
-            "id": task_id,
-            "user_id": uid,
-            "title": title,
-            "category": category,
-            "tags": tags,
-            "deadline": deadline_norm,
-            "completed": bool(completed),
-            "created_at": created_at,
-            "updated_at": updated_at,
-            "priority": pr,
-        })
+            payload = tasks_full_payload(get_user_tasks_for_api(g.user_id), max_updated_at)
+        response = jsonify(payload)
 
-    return jsonify({"success": True, "tasks": tasks_clean})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = TASKS_CACHE_CONTROL
+    return response
 
 
 @app.route('/api/tasks', methods=['POST'])
+@require_session
 def create_task():
     data = request.json or {}
-    user_id = data.get('user_id')
     task_text = data.get('task')
     priority = data.get('priority', 'medium')
     deadline = data.get('deadline')
     category = data.get('category', 'personal')
 
-    if not user_id or not task_text:
-        return jsonify({'success': False, 'error': 'user_id and task required'}), 400
+    if not task_text:
+        return jsonify({'success': False, 'error': 'task required'}), 400
 
     try:
         task_id = add_task(
-            int(user_id),
+            g.user_id,
             task_text,
             category=category,
             tags=priority,
             deadline=deadline,
+            priority=priority,
         )
     except Exception as e:
-        print("ADD_TASK ERROR:", e)
+        logger.error("ADD_TASK ERROR: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
     return jsonify({
@@ -410,6 +215,7 @@ def create_task():
 
 
 @app.route("/api/tasks/<int:task_id>", methods=["PUT"])
+@require_session
 def update_task(task_id):
     """Обновить статус задачи (completed / in_progress)"""
     data = request.json or {}
@@ -419,13 +225,9 @@ def update_task(task_id):
         return jsonify({"success": False, "error": "status required"}), 400
 
     # переводим строковый статус в bool для БД
-    if isinstance(status, bool):
-        completed = status
-    else:
-        s = str(status).lower()
-        completed = s in {"completed", "done", "true", "1"}
+    completed = parse_task_status(status)
 
-    success = update_task_status(task_id, completed)
+    success = update_task_status(task_id, completed, user_id=g.user_id)
 
     if not success:
         return jsonify({"success": False, "error": "Task not found"}), 404
@@ -434,9 +236,10 @@ def update_task(task_id):
 
 
 @app.route("/api/tasks/<int:task_id>", methods=["DELETE"])
+@require_session
 def remove_task(task_id):
     """Удалить задачу"""
-    success = delete_task(task_id)
+    success = delete_task(task_id, user_id=g.user_id)
     if not success:
         return jsonify({"success": False, "error": "Task not found"}), 404
     return jsonify({"success": True, "message": "Task deleted successfully"})
@@ -444,29 +247,30 @@ def remove_task(task_id):
 
 # --------- AI ---------
 @app.route('/api/ai', methods=['POST'])
+@require_session
 def api_ai():
     """
     AI для мини-аппы — тот же движок, что и в боте
     """
     data = request.json or {}
-    user_id = data.get('user_id')
     message = (data.get('message') or "").strip()
 
     if not message:
         return jsonify({"success": False, "error": "message required"}), 400
 
-    user_context = f"Пользователь ID={user_id}"
+    user_context = f"Пользователь ID={g.user_id}"
 
     try:
-        # AIAssistant — асинхронный → оборачиваем
-        reply = asyncio.run(ai_assistant.generate_response(message, user_context))
+        # AIAssistant — асинхронный → выполняем на постоянном цикле
+        reply = run_async(ai_assistant.generate_response(message, user_context))
         return jsonify({"success": True, "reply": reply})
     except Exception as e:
-        print("AI ERROR:", e)
+        logger.error("AI ERROR: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
     
 
 @app.route("/api/voice", methods=["POST"])
+@require_session
 def api_voice():
     """
     Принимает аудио-файл (form-data: file),
@@ -485,9 +289,9 @@ def api_voice():
         ext = file.filename.rsplit(".", 1)[1].lower()
 
     try:
-        # вызываем асинхронный метод через asyncio.run (как в /api/ai)
-        raw_result = asyncio.run(
-            voice_recognizer.recognize_voice(voice_bytes, file_format=ext)
+        # вызываем асинхронный метод на постоянном цикле (как в /api/ai)
+        raw_result = run_async(
+            voice_recognizer.recognize_bytes(voice_bytes, file_format=ext)
         )
 
         # Если пришла ошибка из voice_recognition.py — отдадим её как error
@@ -496,12 +300,7 @@ def api_voice():
 
         # raw_result сейчас строка вида:
         # "🎤 Распознанный текст:\n\n...."
-        text = raw_result
-
-        if text.startswith("🎤"):
-            parts = text.split("\n\n", 1)
-            if len(parts) == 2:
-                text = parts[1].strip()
+        text = extract_recognized_text(raw_result)
 
         # 👉 ПАРСИМ ТЕКСТ В СТРУКТУРУ
         parsed = parse_voice_to_task(text)
@@ -513,7 +312,7 @@ def api_voice():
         })
 
     except Exception as e:
-        print("VOICE API ERROR:", e)
+        logger.error("VOICE API ERROR: %s", e)
         return jsonify(
             {"success": False, "error": "Ошибка при распознавании голоса"}
         ), 500
@@ -521,22 +320,19 @@ def api_voice():
 
 # --------- POMODORO ---------
 @app.route("/api/pomodoro", methods=["POST"])
+@require_session
 def add_pomodoro():
     """Сохранить Pomodoro-сессию (duration в СЕКУНДАХ)"""
     data = request.json or {}
-    user_id = data.get("user_id")
     task_id = data.get("task_id")
     duration = data.get("duration", 25 * 60)
 
-    if not user_id:
-        return jsonify({"success": False, "error": "user_id required"}), 400
-
     try:
         duration = int(duration)
     except Exception:
         duration = 25 * 60
 
-    session_id = add_pomodoro_session(int(user_id), duration, task_id)
+    session_id = add_pomodoro_session(g.user_id, duration, task_id)
 
     return jsonify(
         {
@@ -548,24 +344,18 @@ def add_pomodoro():
 
 
 @app.route("/api/pomodoro/stats", methods=["GET"])
+@require_session
 def get_pomodoro_stats():
-    user_id = request.args.get("user_id")
-    if not user_id:
-        return jsonify({"success": False, "error": "user_id required"}), 400
-
-    stats = get_user_pomodoro_stats(int(user_id))
+    stats = get_user_pomodoro_stats(g.user_id)
     return jsonify({"success": True, "stats": stats})
 
 
 # --------- ОБЩАЯ СТАТИСТИКА ---------
 @app.route("/api/stats", methods=["GET"])
+@require_session
 def get_stats():
-    user_id = request.args.get("user_id")
-    if not user_id:
-        return jsonify({"success": False, "error": "user_id required"}), 400
-
-    tasks_stats = get_user_stats(int(user_id))
-    pomodoro_stats = get_user_pomodoro_stats(int(user_id))
+    tasks_stats = get_user_stats(g.user_id)
+    pomodoro_stats = get_user_pomodoro_stats(g.user_id)
 
     return jsonify(
         {
@@ -582,13 +372,34 @@ def health():
     return jsonify({"status": "ok", "message": "FocusUp API is running"})
 
 
+@app.route("/api/metrics/sql", methods=["GET"])
+def sql_metrics():
+    denied = metrics_denied(request.headers.get("Authorization"))
+    if denied:
+        return jsonify({"success": False, "error": "Unauthorized" if denied == 401 else "Not Found"}), denied
+    return jsonify(profiler.report())
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    denied = metrics_denied(request.headers.get("Authorization"))
+    if denied:
+        return ("Unauthorized" if denied == 401 else "Not Found"), denied
+    response = make_response(REGISTRY.render())
+    response.headers["Content-Type"] = CONTENT_TYPE
+    return response
+
+
 @app.route("/")
 def index_page():
     return send_from_directory(".", "index.html")
 
 
 if __name__ == "__main__":
-    print("🚀 FocusUp API Server starting...")
-    print("📊 Database: focusup.db")
-    print("🌐 Mini App can connect on: http://localhost:8888")
-    app.run(host="0.0.0.0", port=8888, debug=True)
+    from log_setup import setup_logging
+
+    setup_logging()
+    logger.info("🚀 FocusUp API Server starting...")
+    logger.info("📊 Database: focusup.db")
+    logger.info("🌐 Mini App can connect on: http://localhost:8888")
+    app.run(host="0.0.0.0", port=8888, debug=True, threaded=True)
@@ -0,0 +1,390 @@
+"""
+Асинхронный HTTP API мини-аппы на aiohttp.web.
+
+Те же маршруты /api/* и те же JSON-ответы, что у Flask-версии (api_server.py),
+но без блокирующих воркеров: БД через async_database, OpenAI/Whisper через
+общую HTTP-сессию. Может работать отдельно (python api_web.py) или в одном
+процессе с ботом (RUN_API_IN_BOT=1) — тогда делит с ним event loop, пул БД,
+HTTP-сессию и кэши.
+"""
+import functools
+import logging
+
+from aiohttp import web
+
+import async_database as db
+from ai_helper import ai_assistant
+from api_common import (
+    parse_voice_to_task,
+    verify_telegram_data,
+    issue_session_token,
+    authenticate_request,
+    TASKS_CACHE_CONTROL,
+    tasks_etag,
+    etag_matches,
+    parse_since,
+    since_is_expired,
+    tasks_full_payload,
+    tasks_delta_payload,
+    parse_task_status,
+    extract_recognized_text,
+    metrics_denied,
+)
+from config import API_HOST, API_PORT, SESSION_TTL_SECONDS, VOICE_UPLOAD_MAX_BYTES
+from http_client import close_session
+from metrics import metrics_handler
+from query_profiler import profiler
+from voice_recognition import voice_recognizer
+
+logger = logging.getLogger(__name__)
+
+routes = web.RouteTableDef()
+
+
+def _json(data, status=200):
+    return web.json_response(data, status=status)
+
+
+async def _json_body(request: web.Request) -> dict:
+    """Аналог `request.json or {}` из Flask"""
+    try:
+        data = await request.json()
+    except Exception:
+        return {}
+    return data or {}
+
+
+@web.middleware
+async def cors_middleware(request: web.Request, handler):
+    """То же поведение, что у flask_cors.CORS(app) с настройками по умолчанию"""
+    if request.method == "OPTIONS":
+        response = web.Response()
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+        requested = request.headers.get("Access-Control-Request-Headers")
+        if requested:
+            response.headers["Access-Control-Allow-Headers"] = requested
+    else:
+        response = await handler(request)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Expose-Headers"] = "ETag"
+    return response
+
+
+# --------- AUTH ---------
+def require_session(handler):
+    """Пускает только запросы с валидным токеном сессии; user_id кладём в request["user_id"]"""
+    @functools.wraps(handler)
+    async def wrapper(request: web.Request):
+        claimed_user_id = request.query.get("user_id")
+        if claimed_user_id is None and request.content_type == "application/json":
+            claimed_user_id = (await _json_body(request)).get("user_id")
+
+        session, error, status = authenticate_request(
+            request.headers.get("Authorization"), claimed_user_id
+        )
+        if error:
+            return _json(error, status)
+
+        request["user_id"] = session["user_id"]
+        return await handler(request)
+    return wrapper
+
+
+@routes.post("/api/auth")
+async def auth(request: web.Request):
+    data = await _json_body(request)
+    init_data = data.get("initData")
+
+    if not init_data:
+        return _json({"success": False, "error": "No initData provided"}, 400)
+
+    user = verify_telegram_data(init_data)
+    if not user:
+        return _json({"success": False, "error": "Invalid Telegram data"}, 401)
+
+    telegram_id = user["id"]
+    username = user.get("username")
+    first_name = user.get("first_name")
+    last_name = user.get("last_name")
+
+    internal_id = await db.add_user(
+        telegram_id=telegram_id,
+        username=username,
+        first_name=first_name,
+        last_name=last_name,
+    )
+
+    return _json(
+        {
+            "success": True,
+            "token": issue_session_token(internal_id, telegram_id),
+            "expires_in": SESSION_TTL_SECONDS,
+            "user": {
+                "id": internal_id,
+                "telegram_id": telegram_id,
+                "username": username,
+                "first_name": first_name,
+                "last_name": last_name,
+            },
+        }
+    )
+
+
+# --------- TASKS ---------
+@routes.get("/api/tasks")
+@require_session
+async def get_tasks(request: web.Request):
+    """
+    Список задач. Отдаёт ETag: если список не менялся — 304 без тела.
+    С ?since=<cursor> возвращает только изменённые задачи и id удалённых.
+    """
+    user_id = request["user_id"]
+    since = request.query.get("since")
+    if since:
+        since = parse_since(since)
+        if since is None:
+            return _json({"success": False, "error": "invalid since"}, 400)
+
+    version, max_updated_at = await db.get_tasks_version(user_id)
+    etag = tasks_etag(user_id, version, max_updated_at)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = web.Response(status=304)
+    else:
+        if since and not since_is_expired(since):
+            changed, deleted = await db.get_tasks_changed_since(user_id, since)
+            payload = tasks_delta_payload(changed, deleted, since)
+        else:
+            payload = tasks_full_payload(await db.get_user_tasks_for_api(user_id), max_updated_at)
+        response = _json(payload)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = TASKS_CACHE_CONTROL
+    return response
+
+
+@routes.post("/api/tasks")
+@require_session
+async def create_task(request: web.Request):
+    data = await _json_body(request)
+    task_text = data.get("task")
+    priority = data.get("priority", "medium")
+    deadline = data.get("deadline")
+    category = data.get("category", "personal")
+
+    if not task_text:
+        return _json({"success": False, "error": "task required"}, 400)
+
+    try:
+        task_id = await db.add_task(
+            request["user_id"],
+            task_text,
+            category=category,
+            tags=priority,
+            deadline=deadline,
+            priority=priority,
+        )
+    except Exception as e:
+        logger.error("❌ Ошибка add_task в API: %s", e)
+        return _json({"success": False, "error": str(e)}, 500)
+
+    return _json({
+        "success": True,
+        "task_id": task_id,
+        "message": "Task created successfully",
+    })
+
+
+@routes.put("/api/tasks/{task_id:\\d+}")
+@require_session
+async def update_task(request: web.Request):
+    """Обновить статус задачи (completed / in_progress)"""
+    task_id = int(request.match_info["task_id"])
+    data = await _json_body(request)
+    status = data.get("status")
+
+    if status is None:
+        return _json({"success": False, "error": "status required"}, 400)
+
+    success = await db.update_task_status(
+        task_id, parse_task_status(status), user_id=request["user_id"]
+    )
+
+    if not success:
+        return _json({"success": False, "error": "Task not found"}, 404)
+
+    return _json({"success": True, "message": "Task updated successfully"})
+
+
+@routes.delete("/api/tasks/{task_id:\\d+}")
+@require_session
+async def remove_task(request: web.Request):
+    """Удалить задачу"""
+    task_id = int(request.match_info["task_id"])
+    success = await db.delete_task(task_id, user_id=request["user_id"])
+    if not success:
+        return _json({"success": False, "error": "Task not found"}, 404)
+    return _json({"success": True, "message": "Task deleted successfully"})
+
+
+# --------- AI ---------
+@routes.post("/api/ai")
+@require_session
+async def api_ai(request: web.Request):
+    """AI для мини-аппы — тот же движок, что и в боте"""
+    data = await _json_body(request)
+    message = (data.get("message") or "").strip()
+
+    if not message:
+        return _json({"success": False, "error": "message required"}, 400)
+
+    user_context = f"Пользователь ID={request['user_id']}"
+
+    try:
+        reply = await ai_assistant.generate_response(message, user_context)
+        return _json({"success": True, "reply": reply})
+    except Exception as e:
+        logger.error("❌ Ошибка AI в API: %s", e)
+        return _json({"success": False, "error": str(e)}, 500)
+
+
+@routes.post("/api/voice")
+@require_session
+async def api_voice(request: web.Request):
+    """
+    Принимает аудио-файл (form-data: file), отправляет в Whisper
+    и возвращает распознанный текст + разобранные поля задачи.
+    """
+    form = await request.post()
+    file = form.get("file")
+    if not isinstance(file, web.FileField):
+        return _json({"success": False, "error": "Файл не передан"}, 400)
+
+    voice_bytes = file.file.read()
+
+    ext = "ogg"
+    if file.filename and "." in file.filename:
+        ext = file.filename.rsplit(".", 1)[1].lower()
+
+    try:
+        raw_result = await voice_recognizer.recognize_bytes(voice_bytes, file_format=ext)
+
+        if isinstance(raw_result, str) and raw_result.startswith("❌"):
+            return _json({"success": False, "error": raw_result}, 500)
+
+        text = extract_recognized_text(raw_result)
+        parsed = parse_voice_to_task(text)
+
+        return _json({
+            "success": True,
+            "text": text,
+            "parsed": parsed,
+        })
+
+    except Exception as e:
+        logger.error("❌ Ошибка распознавания голоса в API: %s", e)
+        return _json({"success": False, "error": "Ошибка при распознавании голоса"}, 500)
+
+
+# --------- POMODORO ---------
+@routes.post("/api/pomodoro")
+@require_session
+async def add_pomodoro(request: web.Request):
+    """Сохранить Pomodoro-сессию (duration в СЕКУНДАХ)"""
+    data = await _json_body(request)
+    task_id = data.get("task_id")
+    duration = data.get("duration", 25 * 60)
+
+    try:
+        duration = int(duration)
+    except Exception:
+        duration = 25 * 60
+
+    session_id = await db.add_pomodoro_session(request["user_id"], duration, task_id)
+
+    return _json(
+        {
+            "success": True,
+            "session_id": session_id,
+            "message": "Pomodoro session saved",
+        }
+    )
+
+
+@routes.get("/api/pomodoro/stats")
+@require_session
+async def get_pomodoro_stats(request: web.Request):
+    stats = await db.get_user_pomodoro_stats(request["user_id"])
+    return _json({"success": True, "stats": stats})
+
+
+# --------- ОБЩАЯ СТАТИСТИКА ---------
+@routes.get("/api/stats")
+@require_session
+async def get_stats(request: web.Request):
+    user_id = request["user_id"]
+    tasks_stats = await db.get_user_stats(user_id)
+    pomodoro_stats = await db.get_user_pomodoro_stats(user_id)
+
+    return _json(
+        {
+            "success": True,
+            "tasks_stats": tasks_stats,
+            "pomodoro_stats": pomodoro_stats,
+        }
+    )
+
+
+# --------- SERVICE ---------
+@routes.get("/api/health")
+async def health(request: web.Request):
+    return _json({"status": "ok", "message": "FocusUp API is running"})
+
+
+@routes.get("/api/metrics/sql")
+async def sql_metrics(request: web.Request):
+    denied = metrics_denied(request.headers.get("Authorization"))
+    if denied:
+        return _json({"success": False, "error": "Unauthorized" if denied == 401 else "Not Found"}, status=denied)
+    return _json(profiler.report())
+
+
+@routes.get("/metrics")
+async def prometheus_metrics(request: web.Request):
+    return await metrics_handler(request)
+
+
+@routes.get("/")
+async def index_page(request: web.Request):
+    return web.FileResponse("index.html")
+
+
+def create_app() -> web.Application:
+    # по умолчанию aiohttp режет тело на 1 МБ — голосовые крупнее получали бы 413
+    app = web.Application(middlewares=[cors_middleware], client_max_size=VOICE_UPLOAD_MAX_BYTES)
+    app.add_routes(routes)
+    return app
+
+
+async def start_api_server(app: web.Application | None = None, host: str = API_HOST, port: int = API_PORT) -> web.AppRunner:
+    """Запускает API на текущем event loop (например, рядом с диспетчером бота)"""
+    runner = web.AppRunner(app or create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("🌐 FocusUp API (aiohttp) слушает http://%s:%s", host, port)
+    return runner
+
+
+async def _close_http_session(app: web.Application):
+    await close_session()
+
+
+if __name__ == "__main__":
+    from database import init_db
+
+    from log_setup import setup_logging
+    setup_logging()
+    init_db()
+    standalone_app = create_app()
+    standalone_app.on_cleanup.append(_close_http_session)
+    web.run_app(standalone_app, host=API_HOST, port=API_PORT)
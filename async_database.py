@@ -0,0 +1,69 @@
+"""
+Асинхронный слой над database.py.
+
+sqlite3 блокирующий, поэтому запросы выполняются в небольшом общем пуле потоков,
+а event loop (бот, aiohttp API) в это время обслуживает другие апдейты.
+Функции повторяют сигнатуры и результаты синхронных версий из database.py.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+DB_THREADS = int(os.getenv('DB_THREADS', '4'))
+
+_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix='focusup-db')
+
+
+async def run_db(func, *args, **kwargs):
+    """Выполнить синхронную функцию БД в пуле потоков"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def _async(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
+
+
+init_db = _async(database.init_db)
+add_user = _async(database.add_user)
+get_user_id = _async(database.get_user_id)
+get_user_id_by_telegram_id = _async(database.get_user_id_by_telegram_id)
+get_user_by_telegram_id = _async(database.get_user_by_telegram_id)
+
+add_task = _async(database.add_task)
+get_task_by_id = _async(database.get_task_by_id)
+get_user_tasks = _async(database.get_user_tasks)
+get_user_tasks_for_api = _async(database.get_user_tasks_for_api)
+get_tasks_version = _async(database.get_tasks_version)
+get_tasks_changed_since = _async(database.get_tasks_changed_since)
+get_active_tasks = _async(database.get_active_tasks)
+get_completed_tasks = _async(database.get_completed_tasks)
+get_today_tasks = _async(database.get_today_tasks)
+get_upcoming_tasks = _async(database.get_upcoming_tasks)
+get_overdue_tasks = _async(database.get_overdue_tasks)
+get_tasks_by_date = _async(database.get_tasks_by_date)
+search_tasks = _async(database.search_tasks)
+search_tasks_by_tags = _async(database.search_tasks_by_tags)
+
+update_task_status = _async(database.update_task_status)
+update_task_title = _async(database.update_task_title)
+update_task_category = _async(database.update_task_category)
+update_task_deadline = _async(database.update_task_deadline)
+update_task_tags = _async(database.update_task_tags)
+delete_task = _async(database.delete_task)
+
+add_pomodoro_session = _async(database.add_pomodoro_session)
+get_user_pomodoro_stats = _async(database.get_user_pomodoro_stats)
+get_user_stats = _async(database.get_user_stats)
+
+get_cached_transcription = _async(database.get_cached_transcription)
+save_transcription = _async(database.save_transcription)
+
+get_due_reminders = _async(database.get_due_reminders)
+claim_reminder = _async(database.claim_reminder)
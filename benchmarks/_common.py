@@ -0,0 +1,43 @@
+"""Общие утилиты бенчмарков: пути, окружение, временная БД, статистика задержек"""
+import os
+import statistics
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# config.py требует BOT_TOKEN; для бенчмарков реальный токен не нужен
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+
+
+def use_temp_db(prefix='focusup-bench-') -> str:
+    """Направляет database.py во временный файл (до импорта database!)"""
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix='.db')
+    os.close(fd)
+    os.environ['FOCUSUP_DB'] = path
+    return path
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def latency_summary(samples_sec) -> dict:
+    """Секунды → сводка в миллисекундах"""
+    ms = [s * 1000 for s in samples_sec]
+    return {
+        'count': len(ms),
+        'mean_ms': round(statistics.fmean(ms), 3) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms), 3) if ms else 0.0,
+    }
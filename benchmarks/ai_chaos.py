@@ -0,0 +1,173 @@
+"""
+AI-помощник и Whisper под задержками и сбоями фейкового OpenAI (fake_openai.py).
+
+Чат: --chats вызовов ai_assistant.generate_response по --concurrency сразу.
+Голосовые: --voices вызовов voice_recognizer.recognize_voice через очередь
+распознавания (transcription_queue) с --workers воркерами. Отчёт: доля
+успешных ответов, виды ошибок, p50/p99 и запросов к API на вызов (повторы).
+
+Проверки (код выхода 1): наружу не вылетает ни одно исключение, ответ —
+всегда текст; одновременных запросов распознавания не больше воркеров
+очереди; без внедрённых сбоев все ответы успешны.
+
+    python benchmarks/ai_chaos.py --latency lognormal:0.3,0.5 --error-rate 0.2 --malformed-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import _common
+from fake_openai import CHAT_REPLY, TRANSCRIPT, FakeOpenAI
+
+
+def _kind(text, expected):
+    if not isinstance(text, str):
+        return 'not_text'
+    if expected in text:
+        return 'ok'
+    return text.split('.')[0].split(':')[0][:50]
+
+
+async def run_chats(count, concurrency):
+    from ai_helper import ai_assistant
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, kinds, errors = [], Counter(), []
+
+    async def one(index):
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                text = await ai_assistant.generate_response(f'Как спланировать день? #{index}')
+            except Exception as e:
+                errors.append(repr(e))
+                return
+            latencies.append(time.perf_counter() - t0)
+            kinds[_kind(text, CHAT_REPLY)] += 1
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies, kinds, errors
+
+
+async def run_voices(count, workers, voice_bytes):
+    from transcription_queue import TranscriptionQueue
+    from voice_recognition import voice_recognizer
+
+    queue = TranscriptionQueue(workers=workers, max_size=count, per_user=count)
+    latencies, kinds, errors = [], Counter(), []
+    done = asyncio.Event()
+    remaining = count
+
+    def finish():
+        nonlocal remaining
+        remaining -= 1
+        if not remaining:
+            done.set()
+
+    def make_job(index):
+        submitted = time.perf_counter()
+
+        async def on_result(text):
+            latencies.append(time.perf_counter() - submitted)
+            kinds[_kind(text, TRANSCRIPT)] += 1
+            finish()
+
+        async def on_error(e):
+            errors.append(repr(e))
+            finish()
+
+        return lambda: voice_recognizer.recognize_voice(voice_bytes), on_result, on_error
+
+    for index in range(count):
+        queue.submit(index, *make_job(index))
+    if count:
+        await done.wait()
+    await queue.stop()
+    return latencies, kinds, errors
+
+
+async def run(args):
+    fake = FakeOpenAI(latency=args.latency, error_rate=args.error_rate,
+                      malformed_rate=args.malformed_rate, seed=args.seed)
+    os.environ['OPENAI_BASE_URL'] = await fake.start()
+    os.environ['OPENAI_API_KEY'] = 'sk-fake'
+    from http_client import close_session
+
+    results = {}
+    try:
+        t0 = time.perf_counter()
+        chat = await run_chats(args.chats, args.concurrency)
+        results['chat'] = _summary(chat, args.chats, fake.requests['chat'], time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        voice = await run_voices(args.voices, args.workers, os.urandom(args.voice_kb * 1024))
+        results['transcription'] = _summary(voice, args.voices, fake.requests['transcription'],
+                                            time.perf_counter() - t0)
+    finally:
+        await close_session()
+        await fake.stop()
+    results['server'] = fake.summary()
+    return results
+
+
+def _summary(outcome, calls, upstream_requests, elapsed):
+    latencies, kinds, errors = outcome
+    result = _common.latency_summary(latencies)
+    result.update({
+        'seconds': round(elapsed, 2),
+        'ok_rate': round(kinds['ok'] / calls, 3) if calls else 0.0,
+        'replies': dict(kinds.most_common()),
+        'exceptions': errors,
+        'requests_per_call': round(upstream_requests / calls, 2) if calls else 0.0,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50, help='одновременных запросов к чату')
+    parser.add_argument('--voices', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4, help='воркеров очереди распознавания')
+    parser.add_argument('--voice-kb', type=int, default=32)
+    parser.add_argument('--latency', default='lognormal:0.3,0.5', help='none, fixed:S, uniform:A,B, lognormal:M,SIGMA')
+    parser.add_argument('--error-rate', type=float, default=0.1, help='доля ответов 429/5xx')
+    parser.add_argument('--malformed-rate', type=float, default=0.05, help='доля битых тел')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-aichaos-')
+    results = asyncio.run(run(args))
+
+    failures = []
+    print(f"{'path':<14} {'calls':>6} {'ok':>6} {'req/call':>9} {'p50 ms':>9} {'p99 ms':>9}  replies")
+    for name, calls in (('chat', args.chats), ('transcription', args.voices)):
+        r = results[name]
+        print(f"{name:<14} {calls:>6} {r['ok_rate']:>6} {r['requests_per_call']:>9} "
+              f"{r['p50_ms']:>9} {r['p99_ms']:>9}  {r['replies']}")
+        if r['exceptions'] or r.get('replies', {}).get('not_text'):
+            failures.append(f"{name}: исключения наружу {r['exceptions'][:3]}")
+        if not args.error_rate and not args.malformed_rate and r['ok_rate'] < 1:
+            failures.append(f"{name}: без сбоев успешны не все ответы ({r['ok_rate']})")
+    in_flight = results['server']['max_in_flight'].get('transcription', 0)
+    print(f"сервер: {results['server']}")
+    if in_flight > args.workers:
+        failures.append(f"одновременных распознаваний {in_flight} > воркеров {args.workers}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Сравнение Flask (api_server.py) и aiohttp.web (api_web.py): запросы в секунду и p99.
+
+Оба сервера поднимаются в отдельных процессах на одной временной БД с
+тестовым пользователем, затем одинаковой нагрузкой прогоняются эндпоинты.
+
+    python benchmarks/api_servers.py --requests 2000 --concurrency 50 --tasks 200
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+import _common
+
+FLASK_PORT = 18881
+AIOHTTP_PORT = 18882
+
+
+def _serve_flask(port):
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    from werkzeug.serving import make_server
+    import api_server
+
+    make_server('127.0.0.1', port, api_server.app, threaded=True).serve_forever()
+
+
+def _serve_aiohttp(port):
+    from aiohttp import web
+    import api_web
+
+    web.run_app(api_web.create_app(), host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def seed(tasks_count: int) -> int:
+    import database
+
+    database.init_db()
+    user_id = database.add_user(424242, 'bench', 'Bench', 'User')
+    for i in range(tasks_count):
+        deadline = f"{(i % 28) + 1:02d}.{(i % 12) + 1:02d}.25 {(i % 24):02d}:00" if i % 3 else None
+        task_id = database.add_task(user_id, f"Задача {i}", category='💼 Работа', deadline=deadline)
+        if i % 4 == 0:
+            database.update_task_status(task_id, True)
+    return user_id
+
+
+async def _wait_ready(session, base_url, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}/api/health") as resp:
+                if resp.status == 200:
+                    return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"сервер {base_url} не поднялся")
+
+
+async def _load(session, url, total, concurrency, headers=None):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            t0 = time.perf_counter()
+            try:
+                async with session.get(url, headers=headers) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = _common.latency_summary(latencies)
+    result['rps'] = round(total / elapsed, 1)
+    result['errors'] = errors
+    return result
+
+
+async def run_benchmark(paths, total, concurrency, token):
+    import aiohttp
+
+    headers = {'Authorization': f'Bearer {token}'}
+    results = {}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for name, port in (('flask', FLASK_PORT), ('aiohttp', AIOHTTP_PORT)):
+            base_url = f"http://127.0.0.1:{port}"
+            await _wait_ready(session, base_url)
+            # прогрев соединений и кэшей
+            await _load(session, base_url + paths[0], min(200, total), concurrency, headers)
+            results[name] = {}
+            for path in paths:
+                results[name][path] = await _load(session, base_url + path, total, concurrency, headers)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=200, help='задач у тестового пользователя')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    db_path = _common.use_temp_db()
+    user_id = seed(args.tasks)
+    from api_common import issue_session_token
+    token = issue_session_token(user_id, 424242)
+    paths = [
+        '/api/health',
+        f'/api/tasks?user_id={user_id}',
+        f'/api/stats?user_id={user_id}',
+    ]
+
+    ctx = multiprocessing.get_context('spawn')
+    servers = [
+        ctx.Process(target=_serve_flask, args=(FLASK_PORT,), daemon=True),
+        ctx.Process(target=_serve_aiohttp, args=(AIOHTTP_PORT,), daemon=True),
+    ]
+    for proc in servers:
+        proc.start()
+
+    try:
+        results = asyncio.run(run_benchmark(paths, args.requests, args.concurrency, token))
+    finally:
+        for proc in servers:
+            proc.terminate()
+            proc.join()
+        os.unlink(db_path)
+
+    print(f"{'server':<8} {'endpoint':<28} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for server, per_path in results.items():
+        for path, r in per_path.items():
+            endpoint = path.split('?')[0]
+            print(f"{server:<8} {endpoint:<28} {r['rps']:>9} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
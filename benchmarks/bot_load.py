@@ -0,0 +1,228 @@
+"""
+Сквозная нагрузка на бота: настоящий dp из bot.py против фейкового Bot API.
+
+Виртуальные пользователи проигрывают сценарии — создание задачи через меню,
+календарь с переходом на следующий месяц, запуск и остановку Pomodoro,
+вопрос AI-помощнику — и на каждом шаге ждут ответа бота. Апдейты доставляются
+через getUpdates или webhook (--mode). Отчёт: апдейтов в секунду, p50/p99
+задержки ответа по шагам и объём исходящих вызовов Bot API. Шаг без ответа
+за --timeout считается ошибкой (код выхода 1).
+
+По умолчанию исходящие вызовы идут через telegram_limiter с лимитом чата из
+config (около секунды на шаг из нескольких сообщений); --chat-rate 1000
+снимает его, чтобы мерить стоимость самих хендлеров. С --openai-latency
+AI-помощник ходит в фейковый OpenAI (fake_openai.py) с этой задержкой,
+иначе без ключа отвечает, что AI не настроен.
+
+    python benchmarks/bot_load.py --users 50 --rounds 3 --mode polling
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import _common
+from fake_openai import FakeOpenAI
+from fake_telegram import FakeTelegram, free_port
+
+
+def _text_contains(fragment):
+    return lambda method, params: fragment in str(params.get('text', '')) + str(params.get('caption', ''))
+
+
+def _next_month():
+    now = datetime.now()
+    return (1, now.year + 1) if now.month == 12 else (now.month + 1, now.year)
+
+
+# Сценарий — список шагов (имя, вид апдейта, данные, ожидаемый ответ или None — любой)
+FLOWS = {
+    'create_task': [
+        ('tasks_menu', 'text', '📝 Задачи', None),
+        ('add_task', 'callback', 'add_task', None),
+        ('title', 'text', 'Подготовить отчёт', None),
+        ('category', 'callback', 'category_work', None),
+        ('deadline', 'callback', 'deadline_tomorrow', None),
+        ('time', 'callback', 'time_10:00', _text_contains('Задача создана')),
+    ],
+    'calendar': [
+        ('calendar', 'text', '📅 Календарь', None),
+        ('calendar_next', 'callback', 'cal_next_{month}_{year}', None),
+        ('calendar_back', 'callback', 'cal_today', None),
+    ],
+    'pomodoro': [
+        ('pomodoro_menu', 'text', '🍅 Pomodoro', None),
+        ('pomodoro_start', 'callback', 'pomo_start_work', lambda method, _: method == 'sendAnimation'),
+        ('pomodoro_stop', 'callback', 'pomo_stop', _text_contains('остановлена')),
+    ],
+    'ai_chat': [
+        ('ai_menu', 'text', '🤖 AI-помощник', None),
+        ('ai_chat', 'callback', 'ai_chat', None),
+        ('ai_question', 'text', 'Как победить прокрастинацию?', None),
+    ],
+}
+FLOW_WEIGHTS = {'create_task': 4, 'calendar': 3, 'pomodoro': 2, 'ai_chat': 1}
+
+
+class Driver:
+    def __init__(self, fake, deliver, timeout):
+        self.fake = fake
+        self.deliver = deliver
+        self.timeout = timeout
+        self.step_latencies = defaultdict(list)
+        self.failures = []
+        self.updates = 0
+
+    async def step(self, user_id, name, kind, data, match):
+        month, year = _next_month()
+        data = data.format(month=month, year=year)
+        if kind == 'text':
+            update = self.fake.message_update(user_id, data)
+        else:
+            update = self.fake.callback_update(user_id, data)
+        reply = self.fake.wait_reply(user_id, match)
+        t0 = time.perf_counter()
+        await self.deliver(update)
+        self.updates += 1
+        try:
+            await asyncio.wait_for(reply, self.timeout)
+        except asyncio.TimeoutError:
+            self.failures.append(f"{user_id}: нет ответа на шаг {name}")
+            return False
+        self.step_latencies[name].append(time.perf_counter() - t0)
+        return True
+
+    async def user(self, user_id, rounds, rng):
+        await self.step(user_id, 'start', 'text', '/start', None)
+        flows, weights = zip(*FLOW_WEIGHTS.items())
+        for _ in range(rounds):
+            flow = rng.choices(flows, weights)[0]
+            for step in FLOWS[flow]:
+                if not await self.step(user_id, *step):
+                    break
+
+
+async def _polling(fake, bot_module):
+    polling = asyncio.create_task(
+        bot_module.dp.start_polling(bot_module.bot, handle_signals=False, polling_timeout=10)
+    )
+
+    async def deliver(update):
+        fake.push_update(update)
+
+    async def stop():
+        await bot_module.dp.stop_polling()
+        await polling
+
+    return deliver, stop
+
+
+async def _webhook(fake, bot_module):
+    from aiohttp import web
+    from config import WEBHOOK_PATH
+    from webhook import create_webhook_app, webhook_secret
+
+    port = free_port()
+    runner = web.AppRunner(create_webhook_app(bot_module.dp, bot_module.bot, with_api=False), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    await bot_module.bot.set_webhook(f'http://127.0.0.1:{port}{WEBHOOK_PATH}', secret_token=webhook_secret())
+
+    async def deliver(update):
+        await fake.post_update(update)
+
+    return deliver, runner.cleanup
+
+
+async def run(args):
+    fake = FakeTelegram()
+    os.environ['TELEGRAM_API_URL'] = await fake.start()
+    openai = None
+    if args.openai_latency:
+        openai = FakeOpenAI(latency=args.openai_latency, seed=args.seed)
+        os.environ['OPENAI_BASE_URL'] = await openai.start()
+        os.environ['OPENAI_API_KEY'] = 'sk-fake'
+    import bot as bot_module
+    from database import init_db
+
+    init_db()
+    if args.chat_rate:
+        from telegram_limiter import telegram_limiter
+        telegram_limiter.chat_rate = telegram_limiter.chat_burst = args.chat_rate
+    deliver, stop = await (_polling if args.mode == 'polling' else _webhook)(fake, bot_module)
+    driver = Driver(fake, deliver, args.timeout)
+    calls_before = len(fake.calls)
+
+    rng = random.Random(args.seed)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        driver.user(user_id, args.rounds, random.Random(rng.random()))
+        for user_id in range(100_001, 100_001 + args.users)
+    ))
+    elapsed = time.perf_counter() - t0
+
+    # Остановить таймеры, если сценарий оборвался посреди Pomodoro
+    from handlers.pomodoro import active_timers, stop_pomodoro
+    for user_id in list(active_timers):
+        await stop_pomodoro(user_id)
+    await stop()
+    from http_client import close_session
+    await close_session()
+    await bot_module.bot.session.close()
+    await fake.stop()
+    if openai is not None:
+        await openai.stop()
+
+    api_calls = Counter(method for method, _, _ in fake.calls[calls_before:])
+    return {
+        'mode': args.mode,
+        'seconds': round(elapsed, 2),
+        'updates': driver.updates,
+        'updates_per_s': round(driver.updates / elapsed, 1),
+        'steps': {name: _common.latency_summary(samples) for name, samples in driver.step_latencies.items()},
+        'api_calls': dict(api_calls.most_common()),
+        'api_calls_per_update': round(sum(api_calls.values()) / max(1, driver.updates), 2),
+        'openai': openai.summary() if openai is not None else None,
+        'failures': driver.failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=3, help='сценариев на пользователя')
+    parser.add_argument('--mode', choices=('polling', 'webhook'), default='polling')
+    parser.add_argument('--timeout', type=float, default=30, help='секунд ожидания ответа на шаг')
+    parser.add_argument('--chat-rate', type=float, help='лимит сообщений в секунду на чат вместо TG_CHAT_RATE')
+    parser.add_argument('--openai-latency', help='задержка фейкового OpenAI, например lognormal:0.8,0.5')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-botload-')
+    results = asyncio.run(run(args))
+
+    for failure in results['failures']:
+        print(f"FAIL {failure}")
+    print(f"{results['updates']} апдейтов за {results['seconds']} с: {results['updates_per_s']} апдейтов/с ({args.mode})")
+    print(f"{'step':<16} {'count':>6} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, r in results['steps'].items():
+        print(f"{name:<16} {r['count']:>6} {r['p50_ms']:>9} {r['p99_ms']:>9}")
+    print(f"вызовы Bot API ({results['api_calls_per_update']} на апдейт): {results['api_calls']}")
+    if results['openai']:
+        print(f"OpenAI: {results['openai']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if results['failures'] else 0)
+
+
+if __name__ == '__main__':
+    main()
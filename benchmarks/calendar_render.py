@@ -0,0 +1,123 @@
+"""
+Рендер календаря (kalendar.render_calendar): время и запросы к БД на месяц.
+
+Для пользователей с разным числом задач (по умолчанию 10, 1000 и 10000)
+рендерится текущий и следующий месяц. Число SQL-запросов и соединений на
+рендер не должно зависеть от числа задач и превышать бюджет QUERY_BUDGET —
+иначе код выхода 1. Заодно проверяется, что счётчики на кнопках дней
+сходятся с числом задач месяца.
+
+    python benchmarks/calendar_render.py --tasks 10 1000 10000 --repeat 20
+"""
+import argparse
+import json
+import random
+import re
+import sys
+from datetime import datetime
+
+import _common
+
+# Запросов и соединений на один рендер: пользователь + его задачи
+QUERY_BUDGET = {'statements': 2, 'connections': 2}
+
+TELEGRAM_ID_BASE = 20_000_000
+
+
+def _months():
+    now = datetime.now()
+    following = (1, now.year + 1) if now.month == 12 else (now.month + 1, now.year)
+    return [(now.month, now.year), following]
+
+
+def make_user(telegram_id, tasks, seed):
+    import database
+    from workload import insert_tasks
+
+    database.add_user(telegram_id, f'calendar{tasks}')
+    user_id = database.get_user_id_by_telegram_id(telegram_id)
+    conn = database.get_connection()
+    try:
+        insert_tasks(conn, random.Random(seed), user_id, tasks)
+        conn.commit()
+    finally:
+        conn.close()
+    return user_id
+
+
+def expected_month_total(user_id, month, year):
+    import database
+    from deadlines import parse_deadline
+
+    total = 0
+    for task in database.get_user_tasks(user_id):
+        deadline = parse_deadline(task[5]) if task[5] else None
+        if deadline and deadline.month == month and deadline.year == year:
+            total += 1
+    return total
+
+
+def keyboard_total(keyboard):
+    total = 0
+    for row in keyboard.inline_keyboard:
+        for button in row:
+            if button.callback_data.startswith('cal_day_'):
+                match = re.search(r'\n\D*(\d+)$', button.text)
+                total += int(match.group(1)) if match else 0
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, nargs='+', default=[10, 1000, 10_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-calendar-')
+    import database
+    from handlers.kalendar import render_calendar
+
+    database.init_db()
+    failures = []
+    results = {}
+    print(f"{'tasks':>6} {'month':>8} {'queries':>8} {'conns':>6} {'p50 ms':>9} {'p99 ms':>9}")
+    for index, tasks in enumerate(args.tasks):
+        telegram_id = TELEGRAM_ID_BASE + index
+        user_id = make_user(telegram_id, tasks, args.seed + index)
+        for month, year in _months():
+            render_calendar(telegram_id, month, year)   # прогрев кэша разбора дедлайнов
+            samples, statements, connections = [], 0, 0
+            for _ in range(args.repeat):
+                _, keyboard, counter = render_calendar(telegram_id, month, year)
+                samples.append(counter.seconds)
+                statements = max(statements, counter.statements)
+                connections = max(connections, counter.connections)
+
+            name = f'{tasks}[{month:02d}.{year}]'
+            result = results[name] = _common.latency_summary(samples)
+            result.update({'statements': statements, 'connections': connections})
+            print(f"{tasks:>6} {month:>2}.{year} {statements:>8} {connections:>6} "
+                  f"{result['p50_ms']:>9} {result['p99_ms']:>9}")
+
+            if statements > QUERY_BUDGET['statements'] or connections > QUERY_BUDGET['connections']:
+                failures.append(f"{name}: {statements} запросов / {connections} соединений, "
+                                f"бюджет {QUERY_BUDGET}")
+            shown, expected = keyboard_total(keyboard), expected_month_total(user_id, month, year)
+            if shown != expected:
+                failures.append(f"{name}: на кнопках {shown} задач, в месяце {expected}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'budget': QUERY_BUDGET, 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Набор бенчмарков database.py на синтетической БД (workload.py).
+
+Для каждой публичной функции database.py есть случай (для «типичного» и
+«тяжёлого» пользователя, где это важно), плюс рендер календаря. Функция без
+случая — ошибка (код выхода 1), чтобы набор не отставал от database.py.
+Результаты сохраняются в JSON; с --compare сравниваются с прошлым прогоном
+и при замедлении больше --threshold раз код выхода тоже 1.
+
+    python benchmarks/db_suite.py --users 10000 --json results/db.json
+    python benchmarks/db_suite.py --compare results/db.json
+"""
+import argparse
+import inspect
+import itertools
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+import _common
+
+# Не запросы к данным: схема, соединение и счётчик запросов
+NOT_BENCHMARKED = {'init_db', 'get_connection', 'count_queries'}
+
+
+def build_cases(probes):
+    """(имя, функция БД, фабрика аргументов, число повторов)"""
+    import database
+    from deadlines import deadline_timestamp, wall_clock_ts
+    from handlers import kalendar
+
+    light, heavy = probes['light'], probes['heavy']
+    now = datetime.now()
+    since = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    counter = itertools.count()
+
+    def task_of(user_id):
+        conn = database.get_connection()
+        try:
+            return conn.execute('SELECT id FROM tasks WHERE user_id = ? LIMIT 1', (user_id,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    light_task, heavy_task = task_of(light['user_id']), task_of(heavy['user_id'])
+
+    def fresh_task(user_id):
+        return database.add_task(user_id, 'Задача на удаление', '🏠 Личное')
+
+    def reminder_task(user_id):
+        deadline = (now + timedelta(minutes=30)).strftime('%d.%m.%y %H:%M')
+        return database.add_task(user_id, 'Напоминание', '💼 Работа', 'high', deadline), deadline_timestamp(deadline)
+
+    def calendar_render(telegram_id):
+        kalendar.render_calendar(telegram_id, now.month, now.year)
+
+    cases = [
+        ('get_user_id_by_telegram_id', database.get_user_id_by_telegram_id, lambda: (light['telegram_id'],), 200),
+        ('get_user_id', database.get_user_id, lambda: (light['telegram_id'],), 200),
+        ('get_user_by_telegram_id', database.get_user_by_telegram_id, lambda: (light['telegram_id'],), 200),
+        ('add_user', database.add_user, lambda: (900_000_000 + next(counter), 'bench'), 100),
+        ('add_task', database.add_task,
+         lambda: (light['user_id'], 'Подготовить отчёт', '💼 Работа', 'high', '25.12.25 10:00'), 100),
+        ('get_task_by_id', database.get_task_by_id, lambda: (light['user_id'], light_task), 200),
+        ('update_task_status', database.update_task_status, lambda: (light_task, True, light['user_id']), 100),
+        ('update_task_title', database.update_task_title, lambda: (light_task, 'Новое название'), 100),
+        ('update_task_category', database.update_task_category, lambda: (light_task, '🎓 Учеба'), 100),
+        ('update_task_deadline', database.update_task_deadline, lambda: (light_task, '01.01.26 09:00'), 100),
+        ('update_task_tags', database.update_task_tags, lambda: (light_task, 'low'), 100),
+        ('delete_task', database.delete_task, lambda: (fresh_task(light['user_id']), light['user_id']), 50),
+        ('add_pomodoro_session', database.add_pomodoro_session, lambda: (light['user_id'], 1500), 100),
+        ('get_cached_transcription', database.get_cached_transcription, lambda: ('tg:bench', 3600), 200),
+        ('save_transcription', database.save_transcription,
+         lambda: (f'tg:bench-{next(counter)}', 'текст', 5000, 3600), 100),
+        # окно планировщика напоминаний по всем пользователям: 30 мин вперёд + 10 мин запаса
+        ('get_due_reminders', database.get_due_reminders,
+         lambda: (wall_clock_ts(now), wall_clock_ts(now) + 40 * 60), 50),
+        ('claim_reminder', database.claim_reminder, lambda: reminder_task(light['user_id']), 100),
+    ]
+
+    per_user = [
+        ('get_user_tasks', database.get_user_tasks, (), 20),
+        ('get_user_tasks_for_api', database.get_user_tasks_for_api, (), 20),
+        ('get_active_tasks', database.get_active_tasks, (), 20),
+        ('get_completed_tasks', database.get_completed_tasks, (), 20),
+        ('get_tasks_version', database.get_tasks_version, (), 100),
+        ('get_tasks_changed_since', database.get_tasks_changed_since, (since,), 20),
+        ('get_tasks_by_date', database.get_tasks_by_date, (now.date(),), 50),
+        ('get_today_tasks', database.get_today_tasks, (), 50),
+        ('get_upcoming_tasks', database.get_upcoming_tasks, (), 20),
+        ('get_overdue_tasks', database.get_overdue_tasks, (), 20),
+        ('search_tasks', database.search_tasks, ('отчёт',), 20),
+        ('search_tasks_by_tags', database.search_tasks_by_tags, ('high',), 20),
+        ('get_user_stats', database.get_user_stats, (), 20),
+        ('get_user_pomodoro_stats', database.get_user_pomodoro_stats, (), 20),
+    ]
+    for name, func, extra, repeat in per_user:
+        for label, probe in (('light', light), ('heavy', heavy)):
+            cases.append((f'{name}[{label}]', func, lambda p=probe, e=extra: (p['user_id'], *e), repeat))
+
+    cases.append(('get_task_by_id[heavy]', database.get_task_by_id, lambda: (heavy['user_id'], heavy_task), 200))
+    for label, probe, repeat in (('light', light, 5), ('heavy', heavy, 2)):
+        cases.append((f'calendar_render[{label}]', calendar_render, lambda p=probe: (p['telegram_id'],), repeat))
+    return cases
+
+
+def run_case(func, make_args, repeat):
+    func(*make_args())   # прогрев
+    samples = []
+    for _ in range(repeat):
+        args = make_args()
+        t0 = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - t0)
+    return _common.latency_summary(samples)
+
+
+def uncovered(cases):
+    import database
+
+    public = {
+        name for name, value in inspect.getmembers(database, inspect.isfunction)
+        if value.__module__ == 'database' and not name.startswith('_')
+    }
+    covered = {name.split('[')[0] for name, *_ in cases}
+    return sorted(public - covered - NOT_BENCHMARKED)
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous['p50_ms']:
+            continue
+        ratio = current['p50_ms'] / previous['p50_ms']
+        if ratio > threshold:
+            regressions.append(f"{name}: p50 {previous['p50_ms']} → {current['p50_ms']} ms (×{ratio:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--heavy-tasks', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', help='подстрока имени случая')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.25, help='допустимое замедление p50, раз')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-suite-')
+    from workload import generate
+
+    workload = generate(args.users, heavy_tasks=args.heavy_tasks, seed=args.seed)
+    print(f"workload: {workload['users']} users, {workload['tasks']} tasks, "
+          f"{workload['pomodoro_sessions']} pomodoro sessions ({workload['generated_in_s']} s), "
+          f"probes: {workload['probes']}")
+
+    cases = build_cases(workload['probes'])
+    missing = uncovered(cases)
+    if args.only:
+        cases = [case for case in cases if args.only in case[0]]
+
+    results = {}
+    print(f"{'case':<36} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    for name, func, make_args, repeat in cases:
+        results[name] = run_case(func, make_args, repeat)
+        r = results[name]
+        print(f"{name:<36} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['mean_ms']:>9}")
+
+    for name in missing:
+        print(f"FAIL нет случая для database.{name}")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'workload': workload, 'missing': missing, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if missing or regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
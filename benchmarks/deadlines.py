@@ -0,0 +1,103 @@
+"""
+Разбор дедлайнов: прежний перебор strptime против deadlines.parse_deadline.
+
+Строки берутся из реалистичного распределения (в основном 'dd.mm.yy HH:MM',
+немного дат без времени, ISO и мусора) — несколько сотен уникальных значений
+на 100k строк, как при рендере календаря у многих пользователей. Результаты
+обоих путей сверяются построчно.
+
+    python benchmarks/deadlines.py --rows 100000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime
+
+import _common  # noqa: F401  (путь к модулям проекта)
+
+LEGACY_FORMATS = ['%d.%m.%y %H:%M', '%d.%m.%Y %H:%M', '%d.%m.%y', '%d.%m.%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d']
+
+
+def legacy_parse_deadline(deadline_str):
+    """Прежний kalendar.parse_deadline"""
+    if not deadline_str:
+        return None
+    for fmt in LEGACY_FORMATS:
+        try:
+            parsed_date = datetime.strptime(deadline_str, fmt)
+            if parsed_date.year < 1950:
+                parsed_date = parsed_date.replace(year=parsed_date.year + 100)
+            return parsed_date
+        except ValueError:
+            continue
+    return None
+
+
+def make_rows(rows, unique, seed=1):
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(unique):
+        day, month, hour, minute = rng.randint(1, 28), rng.randint(1, 12), rng.randint(0, 23), rng.choice((0, 15, 30, 45))
+        kind = rng.random()
+        if kind < 0.85:
+            pool.append(f"{day:02d}.{month:02d}.25 {hour:02d}:{minute:02d}")
+        elif kind < 0.93:
+            pool.append(f"{day:02d}.{month:02d}.25")
+        elif kind < 0.97:
+            pool.append(f"{day:02d}.{month:02d}.2025 {hour:02d}:{minute:02d}")
+        elif kind < 0.99:
+            pool.append(f"2025-{month:02d}-{day:02d}")
+        else:
+            pool.append("когда-нибудь")
+    return [rng.choice(pool) for _ in range(rows)] + [None] * (rows // 10)
+
+
+def _time(func, values):
+    t0 = time.perf_counter()
+    for value in values:
+        func(value)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--unique', type=int, default=500, help='уникальных строк-дедлайнов')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    import deadlines
+
+    values = make_rows(args.rows, args.unique)
+
+    mismatches = [v for v in values if legacy_parse_deadline(v) != deadlines.parse_deadline(v)]
+    deadlines._parse_cached.cache_clear()
+
+    results = {
+        'legacy_strptime_s': _time(legacy_parse_deadline, values),
+        'cold_cache_s': _time(deadlines.parse_deadline, values),
+        'warm_cache_s': _time(deadlines.parse_deadline, values),
+        'fast_path_uncached_s': _time(deadlines._parse_cached.__wrapped__, [v for v in values if v]),
+    }
+    info = deadlines.cache_info()
+    results = {k: round(v, 4) for k, v in results.items()}
+    results['cache'] = {'hits': info.hits, 'misses': info.misses, 'maxsize': info.maxsize}
+    results['mismatches'] = len(mismatches)
+
+    total = len(values)
+    print(f"{total} строк, {args.unique} уникальных дедлайнов")
+    for key in ('legacy_strptime_s', 'cold_cache_s', 'warm_cache_s', 'fast_path_uncached_s'):
+        print(f"{key:<22} {results[key]:>8} s  {results[key] / total * 1e9:>8.0f} ns/строка")
+    print(f"кэш: {results['cache']}, расхождений с прежним разбором: {len(mismatches)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
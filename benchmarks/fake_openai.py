@@ -0,0 +1,226 @@
+"""
+Фейковый OpenAI API для нагрузочных и «хаос»-тестов AI-помощника и Whisper.
+
+Отвечает на POST /v1/chat/completions (в том числе stream=true — SSE-чанками)
+и /v1/audio/transcriptions так, как ответил бы OpenAI, с настраиваемой
+задержкой и сбоями: доля ответов 429 (с Retry-After) и 5xx, доля битых тел
+(200 с не-JSON). Считает запросы, статусы и одновременные запросы к каждому
+эндпоинту — по max_in_flight видно, держится ли лимит параллельности.
+
+Бот направляется сюда через OPENAI_BASE_URL. Отдельно:
+
+    python benchmarks/fake_openai.py --port 8081 --latency lognormal:0.8,0.5 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8081/v1 OPENAI_API_KEY=sk-fake python bot.py
+
+Задержка: none, fixed:S, uniform:A,B или lognormal:MEDIAN,SIGMA (секунды).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from fake_telegram import free_port
+
+CHAT_REPLY = '✅ Разбейте задачу на шаги по 25 минут и начните с самого простого.'
+TRANSCRIPT = 'Завтра в 10 утра позвонить маме'
+
+
+def parse_latency(spec):
+    """Строка вида lognormal:0.8,0.5 → функция rng -> секунды"""
+    kind, _, args = (spec or 'none').partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+    if kind == 'none':
+        return lambda rng: 0.0
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    raise ValueError(f'Неизвестное распределение задержки: {spec}')
+
+
+class FakeOpenAI:
+    def __init__(self, port=None, latency='none', error_rate=0.0, error_statuses=(429, 500, 503),
+                 malformed_rate=0.0, retry_after=1, seed=0):
+        self.port = port or free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}/v1'
+        self.latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.malformed_rate = malformed_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+
+        self.requests = Counter()            # эндпоинт -> запросов
+        self.statuses = Counter()            # (эндпоинт, статус или 'malformed') -> ответов
+        self.in_flight = Counter()
+        self.max_in_flight = Counter()
+        self.uploaded_bytes = 0
+        self._ids = itertools.count(1)
+        self._runner = None
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/v1/chat/completions', self._chat)
+        app.router.add_post('/v1/audio/transcriptions', self._transcription)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', self.port).start()
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    # --- сбои и учёт ---
+
+    def _fault(self):
+        """None — обычный ответ, иначе HTTP-статус ошибки или 'malformed'"""
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            return self.rng.choice(self.error_statuses)
+        if roll < self.error_rate + self.malformed_rate:
+            return 'malformed'
+        return None
+
+    def _error_response(self, endpoint, status):
+        self.statuses[(endpoint, status)] += 1
+        headers = {'Retry-After': str(self.retry_after)} if status == 429 else None
+        error_type = 'rate_limit_exceeded' if status == 429 else 'server_error'
+        return web.json_response(
+            {'error': {'message': f'Injected {status}', 'type': error_type, 'code': status}},
+            status=status, headers=headers,
+        )
+
+    def _enter(self, endpoint):
+        self.requests[endpoint] += 1
+        self.in_flight[endpoint] += 1
+        self.max_in_flight[endpoint] = max(self.max_in_flight[endpoint], self.in_flight[endpoint])
+
+    # --- эндпоинты ---
+
+    async def _chat(self, request):
+        endpoint = 'chat'
+        self._enter(endpoint)
+        try:
+            payload = await request.json()
+            delay = self.latency(self.rng)
+            fault = self._fault()
+            if payload.get('stream'):
+                return await self._chat_stream(request, payload, delay, fault)
+            await asyncio.sleep(delay)
+            if fault == 'malformed':
+                self.statuses[(endpoint, fault)] += 1
+                return web.Response(text='{"choices": [', content_type='application/json')
+            if fault:
+                return self._error_response(endpoint, fault)
+            self.statuses[(endpoint, 200)] += 1
+            return web.json_response({
+                'id': f'chatcmpl-{next(self._ids)}',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': payload.get('model', 'gpt-4o'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': CHAT_REPLY},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {'prompt_tokens': 100, 'completion_tokens': 20, 'total_tokens': 120},
+            })
+        finally:
+            self.in_flight[endpoint] -= 1
+
+    async def _chat_stream(self, request, payload, delay, fault):
+        """SSE: задержка размазана по чанкам; битый ответ обрывается на середине"""
+        endpoint = 'chat'
+        if isinstance(fault, int):
+            await asyncio.sleep(delay)
+            return self._error_response(endpoint, fault)
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        words = CHAT_REPLY.split(' ')
+        chunk_id = f'chatcmpl-{next(self._ids)}'
+        for index, word in enumerate(words):
+            await asyncio.sleep(delay / len(words))
+            if fault == 'malformed' and index == len(words) // 2:
+                await response.write(b'data: {"choices": [{"delta": \n\n')
+                self.statuses[(endpoint, fault)] += 1
+                return response
+            chunk = {
+                'id': chunk_id,
+                'object': 'chat.completion.chunk',
+                'model': payload.get('model', 'gpt-4o'),
+                'choices': [{'index': 0, 'delta': {'content': word if not index else f' {word}'},
+                             'finish_reason': None}],
+            }
+            await response.write(f'data: {json.dumps(chunk, ensure_ascii=False)}\n\n'.encode())
+        await response.write(b'data: [DONE]\n\n')
+        self.statuses[(endpoint, 200)] += 1
+        return response
+
+    async def _transcription(self, request):
+        endpoint = 'transcription'
+        self._enter(endpoint)
+        try:
+            # тело читается целиком — как у настоящего API, загрузка стоит времени
+            size = 0
+            async for chunk in request.content.iter_any():
+                size += len(chunk)
+            self.uploaded_bytes += size
+            await asyncio.sleep(self.latency(self.rng))
+            fault = self._fault()
+            if fault == 'malformed':
+                self.statuses[(endpoint, fault)] += 1
+                return web.Response(text='<html>Bad gateway</html>', content_type='application/json')
+            if fault:
+                return self._error_response(endpoint, fault)
+            self.statuses[(endpoint, 200)] += 1
+            return web.json_response({'text': TRANSCRIPT})
+        finally:
+            self.in_flight[endpoint] -= 1
+
+    def summary(self):
+        return {
+            'requests': dict(self.requests),
+            'statuses': {f'{endpoint}:{status}': count for (endpoint, status), count in sorted(
+                self.statuses.items(), key=str)},
+            'max_in_flight': dict(self.max_in_flight),
+            'uploaded_bytes': self.uploaded_bytes,
+        }
+
+
+async def _serve(args):
+    fake = FakeOpenAI(args.port, args.latency, args.error_rate, malformed_rate=args.malformed_rate, seed=args.seed)
+    print(f'OPENAI_BASE_URL={await fake.start()}')
+    try:
+        while True:
+            await asyncio.sleep(60)
+            print(json.dumps(fake.summary(), ensure_ascii=False))
+    finally:
+        await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', default='lognormal:0.8,0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='доля ответов 429/5xx')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='доля битых тел')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
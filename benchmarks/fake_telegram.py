@@ -0,0 +1,259 @@
+"""
+Фейковый сервер Bot API для нагрузочных тестов бота.
+
+Отвечает на POST /bot<token>/<method> так, как ответил бы Telegram (getMe,
+sendMessage, editMessageText, sendAnimation, getFile, ...), отдаёт файлы
+голосовых и записывает все вызовы. Апдейты можно отдавать боту через getUpdates (polling) или
+присылать POST-запросом на его webhook с секретным заголовком.
+wait_reply(chat_id) ждёт следующего (подходящего) ответа бота в этот чат.
+С flood_limits сервер, как настоящий Telegram, отвечает 429 с retry_after
+на отправки сверх лимита (общего и на чат).
+
+Бот направляется сюда через TELEGRAM_API_URL.
+"""
+import asyncio
+import itertools
+import json
+import math
+import socket
+import time
+from collections import defaultdict
+
+from aiohttp import ClientSession, web
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'FocusUp', 'username': 'focusup_bot'}
+
+# Методы, которые отправляют или меняют сообщение в чате
+REPLY_METHODS = {
+    'sendMessage', 'editMessageText', 'editMessageCaption', 'editMessageReplyMarkup',
+    'sendAnimation', 'sendPhoto', 'sendDocument',
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class FakeTelegram:
+    def __init__(self, port=None, flood_limits=None):
+        """flood_limits — (сообщений/с на бота, сообщений/с на чат, запас на чат)"""
+        self.port = port or free_port()
+        self.flood_limits = flood_limits
+        self.flood_errors = 0
+        self._buckets = {}                   # None (общий) / chat_id -> [токены, время]
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.calls = []                      # (method, params, monotonic)
+        self.method_counts = defaultdict(int)
+        self.webhook_url = None
+        self.webhook_secret = None
+
+        self.files = {}                      # file_id -> байты (getFile и /file/bot<token>/...)
+        self.last_message_ids = {}           # chat_id -> id последнего сообщения бота
+
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._updates = []
+        self._updates_available = asyncio.Event()
+        self._reply_waiters = defaultdict(list)   # chat_id -> [Future]
+        self._runner = None
+        self._client = None
+
+    # --- сервер ---
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/bot{token}/{method}', self._handle)
+        app.router.add_get('/file/bot{token}/{path:.*}', self._download)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', self.port).start()
+        self._client = ClientSession()
+        return self.base_url
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request):
+        method = request.match_info['method']
+        params = {}
+        if request.content_type == 'application/json':
+            params = await request.json()
+        else:
+            for name, value in (await request.post()).items():
+                params[name] = value if not isinstance(value, str) else _maybe_json(value)
+        self.calls.append((method, params, time.monotonic()))
+        self.method_counts[method] += 1
+
+        if method == 'getUpdates':
+            return _ok(await self._get_updates(params))
+        if self.flood_limits and method in REPLY_METHODS:
+            retry_after = self._flood_check(params.get('chat_id'))
+            if retry_after:
+                self.flood_errors += 1
+                return web.json_response({
+                    'ok': False, 'error_code': 429,
+                    'description': f'Too Many Requests: retry after {retry_after}',
+                    'parameters': {'retry_after': retry_after},
+                }, status=429)
+        result = self._result(method, params)
+        if method in REPLY_METHODS and 'chat_id' in params:
+            waiters = self._reply_waiters.get(int(params['chat_id']), [])
+            for waiter in list(waiters):
+                future, match = waiter
+                if future.done():
+                    waiters.remove(waiter)
+                elif match is None or match(method, params):
+                    future.set_result((method, params))
+                    waiters.remove(waiter)
+        return _ok(result)
+
+    def _result(self, method, params):
+        if method == 'getMe':
+            return BOT_USER
+        if method == 'setWebhook':
+            self.webhook_url = params.get('url')
+            self.webhook_secret = params.get('secret_token')
+            return True
+        if method == 'deleteWebhook':
+            self.webhook_url = None
+            return True
+        if method == 'getFile':
+            file_id = params.get('file_id')
+            data = self.files.get(file_id, b'')
+            return {'file_id': file_id, 'file_unique_id': f'unique-{file_id}', 'file_size': len(data),
+                    'file_path': f'files/{file_id}'}
+        if method in REPLY_METHODS and 'chat_id' in params:
+            message_id = params.get('message_id')
+            if not message_id:
+                message_id = next(self._message_ids)
+                self.last_message_ids[int(params['chat_id'])] = message_id
+            return {
+                'message_id': int(message_id),
+                'date': int(time.time()),
+                'chat': {'id': int(params['chat_id']), 'type': 'private'},
+                'from': BOT_USER,
+                'text': str(params.get('text', '')),
+            }
+        return True
+
+    def _flood_check(self, chat_id):
+        """0, если отправка укладывается в лимиты, иначе retry_after в секундах"""
+        global_rate, chat_rate, chat_burst = self.flood_limits
+        now = time.monotonic()
+        checks = [(None, global_rate, global_rate)]
+        if chat_id is not None:
+            checks.append((int(chat_id), chat_rate, chat_burst))
+        buckets = []
+        for key, rate, capacity in checks:
+            bucket = self._buckets.setdefault(key, [capacity, now])
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                return max(1, math.ceil((1 - bucket[0]) / rate))
+            buckets.append(bucket)
+        for bucket in buckets:
+            bucket[0] -= 1
+        return 0
+
+    async def _download(self, request):
+        data = self.files.get(request.match_info['path'].rsplit('/', 1)[-1])
+        if data is None:
+            return web.Response(status=404)
+        return web.Response(body=data)
+
+    async def _get_updates(self, params):
+        offset = int(params.get('offset') or 0)
+        timeout = float(params.get('timeout') or 0)
+        self._updates = [u for u in self._updates if u['update_id'] >= offset]
+        if not self._updates and timeout:
+            self._updates_available.clear()
+            try:
+                await asyncio.wait_for(self._updates_available.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:100]
+
+    # --- апдейты от «пользователей» ---
+
+    def message_update(self, user_id, text):
+        update = {
+            'update_id': next(self._update_ids),
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'},
+                'text': text,
+            },
+        }
+        if text.startswith('/'):
+            update['message']['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return update
+
+    def voice_update(self, user_id, file_id, data, duration=3):
+        """Голосовое: байты отдаются боту через getFile и /file/..."""
+        self.files[file_id] = data
+        return {
+            'update_id': next(self._update_ids),
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'},
+                'voice': {'file_id': file_id, 'file_unique_id': f'unique-{file_id}', 'duration': duration,
+                          'mime_type': 'audio/ogg', 'file_size': len(data)},
+            },
+        }
+
+    def callback_update(self, user_id, data, message_id=None):
+        return {
+            'update_id': next(self._update_ids),
+            'callback_query': {
+                'id': str(next(self._update_ids)),
+                'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'},
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {
+                    'message_id': message_id or self.last_message_ids.get(user_id, 1),
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'from': BOT_USER,
+                    'text': '...',
+                },
+            },
+        }
+
+    def push_update(self, update):
+        """Отдать апдейт боту через getUpdates"""
+        self._updates.append(update)
+        self._updates_available.set()
+
+    async def post_update(self, update, secret=None):
+        """Прислать апдейт на webhook; возвращает HTTP-статус"""
+        headers = {'X-Telegram-Bot-Api-Secret-Token': secret if secret is not None else self.webhook_secret or ''}
+        async with self._client.post(self.webhook_url, json=update, headers=headers) as response:
+            return response.status
+
+    def wait_reply(self, chat_id, match=None) -> asyncio.Future:
+        """Future с (method, params) следующего ответа в чат; match(method, params) — фильтр"""
+        future = asyncio.get_running_loop().create_future()
+        self._reply_waiters[int(chat_id)].append((future, match))
+        return future
+
+
+def _maybe_json(value):
+    if value[:1] in ('{', '['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _ok(result):
+    return web.json_response({'ok': True, 'result': result})
@@ -0,0 +1,120 @@
+"""
+FSM-хранилища: MemoryStorage против SQLiteStorage (с кэшем и без).
+
+Каждый «шаг диалога» повторяет то, что делает хендлер создания задачи:
+get_state → get_data → update_data → set_state. Перед замерами проверяется,
+что состояние переживает пересоздание хранилища, видно второму экземпляру
+(как второму процессу) и истекает по TTL (при ошибке — код выхода 1).
+
+    python benchmarks/fsm_storage.py --users 500 --steps 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import _common
+
+DB_PATH = _common.use_temp_db('focusup-fsm-')
+
+
+def _key(user_id):
+    from aiogram.fsm.storage.base import StorageKey
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+async def check_persistence():
+    from fsm_storage import SQLiteStorage
+
+    failures = []
+    key = _key(42)
+
+    storage = SQLiteStorage(DB_PATH)
+    await storage.set_state(key, 'TaskCreation:waiting_for_title')
+    await storage.update_data(key, {'title': 'Купить молоко', 'task': [1, 2, 'x']})
+    await storage.close()
+
+    reopened = SQLiteStorage(DB_PATH)
+    other_process = SQLiteStorage(DB_PATH, cache_size=0)
+    for name, storage in (('после перезапуска', reopened), ('второй экземпляр', other_process)):
+        if await storage.get_state(key) != 'TaskCreation:waiting_for_title':
+            failures.append(f"{name}: состояние потеряно")
+        if (await storage.get_data(key)).get('title') != 'Купить молоко':
+            failures.append(f"{name}: данные потеряны")
+
+    await other_process.set_state(key, None)
+    await other_process.set_data(key, {})
+    if await other_process.get_state(key) is not None:
+        failures.append("очистка состояния не сработала")
+    await reopened.close()
+    await other_process.close()
+
+    short = SQLiteStorage(DB_PATH, ttl_seconds=0.05)
+    await short.set_state(key, 'TaskEditing:editing_title')
+    await asyncio.sleep(0.1)
+    if await short.get_state(key) is not None:
+        failures.append("TTL: состояние не истекло (кэш)")
+    await short.close()
+    fresh = SQLiteStorage(DB_PATH, cache_size=0)
+    if await fresh.get_state(key) is not None:
+        failures.append("TTL: состояние не истекло (БД)")
+    await fresh.close()
+    return failures
+
+
+async def run_dialogs(storage, users, steps):
+    latencies = []
+
+    async def dialog(user_id):
+        key = _key(user_id)
+        for step in range(steps):
+            t0 = time.perf_counter()
+            await storage.get_state(key)
+            await storage.get_data(key)
+            await storage.update_data(key, {f'field_{step}': 'значение', 'step': step})
+            await storage.set_state(key, f'TaskCreation:step_{step}')
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(dialog(user_id) for user_id in range(1, users + 1)))
+    elapsed = time.perf_counter() - t0
+    await storage.close()
+    result = _common.latency_summary(latencies)
+    result['steps_per_s'] = round(len(latencies) / elapsed)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--steps', type=int, default=10, help='шагов диалога на пользователя')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from fsm_storage import SQLiteStorage
+
+    failures = asyncio.run(check_persistence())
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    results = {
+        'memory': asyncio.run(run_dialogs(MemoryStorage(), args.users, args.steps)),
+        'sqlite_cached': asyncio.run(run_dialogs(SQLiteStorage(DB_PATH), args.users, args.steps)),
+        'sqlite_no_cache': asyncio.run(run_dialogs(SQLiteStorage(DB_PATH, cache_size=0), args.users, args.steps)),
+    }
+
+    print(f"{'storage':<16} {'step p50 ms':>12} {'step p99 ms':>12} {'steps/s':>9}")
+    for name, r in results.items():
+        print(f"{name:<16} {r['p50_ms']:>12} {r['p99_ms']:>12} {r['steps_per_s']:>9}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'failures': failures, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
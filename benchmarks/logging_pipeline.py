@@ -0,0 +1,215 @@
+"""
+Логирование через очередь (log_setup.py): задержка хендлера с логами и без.
+
+Настоящий хендлер handlers.tasks.show_my_tasks_list (get_user_id,
+get_user_tasks, debug-логи по дороге) вызывается --calls раз с заглушкой
+CallbackQuery в режимах:
+
+- off         — уровень WARNING, debug-записи отсекаются проверкой уровня;
+- queue-info  — очередь и фоновый поток, уровень INFO (боевой режим);
+- queue-debug — очередь, уровень DEBUG: все записи, но формат — в фоне;
+- sync-debug  — обычный StreamHandler на DEBUG, как раньше с basicConfig:
+                форматирование и запись прямо в хендлере.
+
+Вывод идёт в «медленный» поток, каждая запись в который стоит --sink-ms
+(терминал, journald, pipe под нагрузкой). Проверки (код выхода 1): в режиме
+очереди до вывода доходят все записи и ни одно сообщение не форматируется
+в потоке хендлера; при WARNING аргументы debug-записей не форматируются вовсе;
+dict, изменённый сразу после вызова логгера, записан со старым значением.
+
+    python benchmarks/logging_pipeline.py --calls 2000 --sink-ms 0.2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import _common
+
+TELEGRAM_ID = 40_000_000
+MODES = ('off', 'queue-info', 'queue-debug', 'sync-debug')
+
+
+class SlowSink:
+    """Поток вывода, запись в который стоит sink_ms"""
+
+    def __init__(self, sink_ms):
+        self.delay = sink_ms / 1000
+        self.writes = 0
+        self.snapshots = []
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.writes += 1
+            if 'снимок' in text:
+                self.snapshots.append(text)
+
+    def flush(self):
+        pass
+
+
+class RecordCounter(logging.Filter):
+    def __init__(self):
+        super().__init__()
+        self.records = 0
+
+    def filter(self, record):
+        self.records += 1
+        return True
+
+
+class FormatProbe(int):
+    """
+    Аргумент лога, запоминающий, в каком потоке его отформатировали. Число —
+    чтобы очередь, как для обычных строк и чисел, отложила форматирование
+    """
+
+    def __new__(cls):
+        probe = super().__new__(cls, 0)
+        probe.threads = []
+        return probe
+
+    def __str__(self):
+        self.threads.append(threading.get_ident())
+        return 'probe'
+
+
+class StubMessage:
+    async def edit_text(self, text, **kwargs):
+        return None
+
+
+class StubCallback:
+    def __init__(self, telegram_id):
+        self.from_user = SimpleNamespace(id=telegram_id)
+        self.message = StubMessage()
+
+    async def answer(self, *args, **kwargs):
+        return None
+
+
+def configure(mode, sink):
+    import log_setup
+
+    log_setup.stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    if mode == 'sync-debug':
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter(log_setup.TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+    else:
+        level = {'off': logging.WARNING, 'queue-info': logging.INFO, 'queue-debug': logging.DEBUG}[mode]
+        log_setup.setup_logging(level=level, stream=sink, structured=False, force=True)
+    counter = RecordCounter()
+    root.handlers[0].addFilter(counter)
+    return counter
+
+
+async def run_mode(mode, calls, sink_ms):
+    import log_setup
+    from handlers.tasks import show_my_tasks_list
+
+    sink = SlowSink(sink_ms)
+    counter = configure(mode, sink)
+    probe = FormatProbe()
+    logger = logging.getLogger('benchmark')
+    callback = StubCallback(TELEGRAM_ID)
+
+    await show_my_tasks_list(callback)
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        await show_my_tasks_list(callback)
+        logger.debug('проба %s', probe)
+        samples.append(time.perf_counter() - t0)
+
+    # изменяемый аргумент, который меняют сразу после вызова логгера
+    state = {'шаг': 'до'}
+    logger.warning('снимок %s', state)
+    state['шаг'] = 'после'
+
+    flush0 = time.perf_counter()
+    log_setup.stop_logging()
+    flush = time.perf_counter() - flush0
+    result = _common.latency_summary(samples)
+    result.update({
+        'records': counter.records,
+        'written': sink.writes,
+        'flush_s': round(flush, 3),
+        'formatted_in_handler': sum(1 for ident in probe.threads if ident == threading.get_ident()),
+        'formatted': len(probe.threads),
+        'snapshot_stale': any('после' in text for text in sink.snapshots),
+    })
+    return result
+
+
+def make_user(tasks, seed):
+    import database
+    from workload import insert_tasks
+
+    database.init_db()
+    database.add_user(TELEGRAM_ID, 'logging')
+    user_id = database.get_user_id_by_telegram_id(TELEGRAM_ID)
+    conn = database.get_connection()
+    try:
+        insert_tasks(conn, random.Random(seed), user_id, tasks)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--tasks', type=int, default=50)
+    parser.add_argument('--sink-ms', type=float, default=0.2, help='стоимость одной записи в вывод, мс')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-logging-')
+    make_user(args.tasks, args.seed)
+
+    results = {}
+    failures = []
+    for mode in args.modes:
+        results[mode] = asyncio.run(run_mode(mode, args.calls, args.sink_ms))
+    logging.getLogger().handlers.clear()
+
+    print(f"{'mode':<12} {'p50 ms':>8} {'p99 ms':>8} {'records':>8} {'written':>8} {'flush s':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<12} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['records']:>8} {r['written']:>8} {r['flush_s']:>8}")
+        if mode.startswith('queue') and r['written'] != r['records']:
+            failures.append(f"{mode}: записано {r['written']} из {r['records']} записей")
+        if mode.startswith('queue') and r['formatted_in_handler']:
+            failures.append(f"{mode}: {r['formatted_in_handler']} сообщений отформатировано в потоке хендлера")
+        if r['snapshot_stale']:
+            failures.append(f"{mode}: изменяемый аргумент записан с изменённым позже значением")
+        if mode == 'off' and r['formatted']:
+            failures.append(f"off: debug-аргументы отформатированы {r['formatted']} раз")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Сторож event loop (loop_watchdog.py): ложные срабатывания, цена и поимка блокировок.
+
+1. Фон: --coroutines корутин крутят asyncio.sleep --seconds секунд — сторож
+   не должен заметить ни одной блокировки; замеряются задержка цикла и
+   процессорное время с ним и без него.
+2. Синтетика: корутина вызывает time.sleep(--block-ms) — должна быть ровно
+   одна блокировка, виновник — blocking_step, длительность — около --block-ms.
+3. Настоящий хендлер: синхронный рендер календаря (handlers/kalendar.py) для
+   пользователя с --tasks задачами прямо в корутине; если он держит цикл
+   дольше тройного порога, блокировка должна быть приписана kalendar.*.
+
+Нарушение любой из проверок — код выхода 1.
+
+    python benchmarks/loop_watchdog.py --seconds 3 --block-ms 300 --tasks 10000
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import _common
+
+TELEGRAM_ID = 30_000_000
+
+
+async def _background(coroutines, seconds):
+    async def spinner():
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(random.uniform(0.001, 0.02))
+
+    await asyncio.gather(*(spinner() for _ in range(coroutines)))
+
+
+async def run_background(coroutines, seconds, stall_ms):
+    from loop_watchdog import LoopWatchdog
+
+    cpu0 = time.process_time()
+    await _background(coroutines, seconds)
+    bare_cpu = time.process_time() - cpu0
+
+    watchdog = LoopWatchdog(stall_ms=stall_ms)
+    watchdog.start()
+    cpu0 = time.process_time()
+    await _background(coroutines, seconds)
+    watched_cpu = time.process_time() - cpu0
+    await watchdog.stop()
+    return {
+        'stalls': len(watchdog.stalls),
+        'max_lag_ms': watchdog.report()['max_lag_ms'],
+        'cpu_bare_s': round(bare_cpu, 3),
+        'cpu_watched_s': round(watched_cpu, 3),
+    }
+
+
+def blocking_step(seconds):
+    time.sleep(seconds)
+
+
+async def run_synthetic(block_ms, stall_ms):
+    from loop_watchdog import LoopWatchdog
+
+    watchdog = LoopWatchdog(interval_ms=20, stall_ms=stall_ms)
+    watchdog.start()
+    await asyncio.sleep(0.2)
+    blocking_step(block_ms / 1000)
+    await asyncio.sleep(0.2)
+    await watchdog.stop()
+    return watchdog.report()
+
+
+async def run_handler(stall_ms):
+    from handlers.kalendar import render_calendar
+    from loop_watchdog import LoopWatchdog
+
+    now = time.localtime()
+    render_calendar(TELEGRAM_ID, now.tm_mon, now.tm_year)   # прогрев кэшей
+    watchdog = LoopWatchdog(interval_ms=10, stall_ms=stall_ms)
+    watchdog.start()
+    await asyncio.sleep(0.1)
+    t0 = time.perf_counter()
+    render_calendar(TELEGRAM_ID, now.tm_mon, now.tm_year)
+    blocked = time.perf_counter() - t0
+    await asyncio.sleep(0.1)
+    await watchdog.stop()
+    report = watchdog.report()
+    report['render_ms'] = round(blocked * 1000, 1)
+    return report
+
+
+def make_user(tasks, seed):
+    import database
+    from workload import insert_tasks
+
+    database.init_db()
+    database.add_user(TELEGRAM_ID, 'watchdog')
+    user_id = database.get_user_id_by_telegram_id(TELEGRAM_ID)
+    conn = database.get_connection()
+    try:
+        insert_tasks(conn, random.Random(seed), user_id, tasks)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--coroutines', type=int, default=1000)
+    parser.add_argument('--stall-ms', type=float, default=100, help='порог блокировки для фона и синтетики')
+    parser.add_argument('--block-ms', type=float, default=300)
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--handler-stall-ms', type=float, default=20, help='порог для рендера календаря')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-watchdog-')
+    make_user(args.tasks, args.seed)
+
+    failures = []
+    results = {}
+
+    background = results['background'] = asyncio.run(run_background(args.coroutines, args.seconds, args.stall_ms))
+    print(f"фон: блокировок {background['stalls']}, max lag {background['max_lag_ms']} мс, "
+          f"CPU {background['cpu_bare_s']} с без сторожа / {background['cpu_watched_s']} с с ним")
+    if background['stalls']:
+        failures.append(f"ложные срабатывания на фоне: {background['stalls']}")
+
+    synthetic = results['synthetic'] = asyncio.run(run_synthetic(args.block_ms, args.stall_ms))
+    stalls = synthetic['stalls']
+    print(f"синтетика: {[(s['culprit'], s['blocked_ms']) for s in stalls]}")
+    if len(stalls) != 1:
+        failures.append(f"синтетика: блокировок {len(stalls)}, ожидалась одна")
+    elif 'blocking_step' not in stalls[0]['culprit']:
+        failures.append(f"синтетика: виновник {stalls[0]['culprit']}")
+    elif not args.block_ms * 0.8 <= stalls[0]['blocked_ms'] <= args.block_ms * 1.5:
+        failures.append(f"синтетика: длительность {stalls[0]['blocked_ms']} мс при блокировке {args.block_ms} мс")
+
+    handler = results['handler'] = asyncio.run(run_handler(args.handler_stall_ms))
+    stalls = handler['stalls']
+    print(f"рендер календаря {handler['render_ms']} мс: "
+          f"{[(s['handler'], s['culprit'], s['blocked_ms']) for s in stalls] or 'не пойман'}")
+    if stalls:
+        print('   ' + '\n   '.join(stalls[0]['stack'][-6:]))
+    if handler['render_ms'] > args.handler_stall_ms * 3:
+        if not stalls:
+            failures.append(f"рендер держал цикл {handler['render_ms']} мс, блокировка не поймана")
+        elif not (stalls[0]['handler'] or '').startswith('kalendar.'):
+            failures.append(f"блокировка приписана {stalls[0]['handler']}, а не kalendar.*")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Метрики Prometheus (metrics.py): цена замеров на горячем пути и корректность /metrics.
+
+- Histogram.observe и Counter.inc — наносекунды на вызов;
+- HandlerMetricsMiddleware — надбавка к пустому хендлеру;
+- трассировка HTTP-сессии — запросы к фейковому OpenAI (fake_openai.py)
+  с замерами и без, плюс сверка: ответов в метриках (по статусам) столько же,
+  сколько отдал сервер;
+- render() — время и размер ответа при --series сериях гистограммы.
+
+Весь вывод REGISTRY.render() проверяется разбором: у каждого показателя
+объявлен TYPE, семейство не объявлено дважды, корзины гистограмм не убывают
+и +Inf совпадает с _count; есть время SQL по функциям database.py.
+Нарушение — код выхода 1.
+
+    python benchmarks/metrics.py --calls 200000 --requests 300 --series 2000
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import _common
+from fake_openai import FakeOpenAI
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def validate(text):
+    """Разбор текстового формата Prometheus; список найденных нарушений"""
+    problems = []
+    types = {}
+    histograms = {}   # (семейство, метки без le) -> {'buckets': [(le, n)], 'count': n}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ', 3)
+            if name in types:
+                problems.append(f'семейство {name} объявлено дважды')
+            types[name] = kind
+            continue
+        if not line or line.startswith('#'):
+            continue
+        match = SAMPLE.match(line)
+        if not match:
+            problems.append(f'не разбирается: {line[:100]}')
+            continue
+        name, _, raw_labels, value = match.groups()
+        try:
+            number = float(value)
+        except ValueError:
+            problems.append(f'не число: {line[:100]}')
+            continue
+        labels = dict(LABEL.findall(raw_labels or ''))
+        family = name
+        for suffix in ('_bucket', '_sum', '_count'):
+            if name.endswith(suffix) and types.get(name[:-len(suffix)]) == 'histogram':
+                family = name[:-len(suffix)]
+        if family not in types:
+            problems.append(f'нет TYPE для {name}')
+            continue
+        if types[family] != 'histogram':
+            continue
+        key = (family, tuple(sorted((k, v) for k, v in labels.items() if k != 'le')))
+        series = histograms.setdefault(key, {'buckets': [], 'count': None})
+        if name.endswith('_bucket'):
+            series['buckets'].append((float(labels['le']), number))
+        elif name.endswith('_count'):
+            series['count'] = number
+
+    for (family, labels), series in histograms.items():
+        buckets = series['buckets']
+        counts = [n for _, n in buckets]
+        if not buckets or buckets[-1][0] != math.inf:
+            problems.append(f'{family}{dict(labels)}: нет корзины +Inf')
+        elif counts != sorted(counts) or [le for le, _ in buckets] != sorted(le for le, _ in buckets):
+            problems.append(f'{family}{dict(labels)}: корзины убывают')
+        elif counts[-1] != series['count']:
+            problems.append(f'{family}{dict(labels)}: +Inf {counts[-1]} != _count {series["count"]}')
+    return problems, types
+
+
+def samples(text, name):
+    """{метки: значение} показателя name"""
+    result = {}
+    for line in text.splitlines():
+        match = SAMPLE.match(line)
+        if match and match.group(1) == name:
+            result[tuple(sorted(LABEL.findall(match.group(3) or '')))] = float(match.group(4))
+    return result
+
+
+def bench_hot_path(calls):
+    from metrics import Counter as MetricCounter, Histogram
+
+    histogram = Histogram('bench_seconds', 'bench', ('router', 'handler'))
+    counter = MetricCounter('bench_total', 'bench', ('service', 'status'))
+    t0 = time.perf_counter()
+    for i in range(calls):
+        histogram.observe(0.003, 'tasks', 'show_tasks')
+    observe_ns = (time.perf_counter() - t0) / calls * 1e9
+    t0 = time.perf_counter()
+    for i in range(calls):
+        counter.inc('openai_chat', '200')
+    inc_ns = (time.perf_counter() - t0) / calls * 1e9
+    return {'observe_ns': round(observe_ns), 'inc_ns': round(inc_ns)}
+
+
+async def bench_middleware(calls):
+    from metrics import HandlerMetricsMiddleware
+
+    async def show_tasks(event, data):
+        return None
+
+    middleware = HandlerMetricsMiddleware()
+    event = SimpleNamespace()
+    data = {'handler': SimpleNamespace(callback=show_tasks)}
+
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        await show_tasks(event, data)
+    bare = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        await middleware(show_tasks, event, data)
+    wrapped = time.perf_counter() - t0
+    return {'overhead_us': round((wrapped - bare) / calls * 1e6, 3)}
+
+
+async def bench_upstream(requests, concurrency):
+    """Одни и те же чаты с трассировкой и без; сверка счётчиков с сервером"""
+    import aiohttp
+
+    import http_client
+    from metrics import REGISTRY
+
+    fake = FakeOpenAI(error_rate=0.2, seed=7)
+    base_url = await fake.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    payload = {'model': 'gpt-4o-mini', 'messages': [{'role': 'user', 'content': 'привет'}]}
+
+    async def burst(session):
+        async def one():
+            async with semaphore:
+                async with session.post(f'{base_url}/chat/completions', json=payload) as response:
+                    await response.read()
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return (time.perf_counter() - t0) / requests
+
+    try:
+        async with aiohttp.ClientSession() as plain:
+            await burst(plain)
+            bare = await burst(plain)
+        traced_session = await http_client.get_session()
+        await burst(traced_session)
+        before = fake.requests['chat']
+        observed_before = samples(REGISTRY.render(), 'focusup_upstream_responses_total')
+        traced = await burst(traced_session)
+        observed_after = samples(REGISTRY.render(), 'focusup_upstream_responses_total')
+    finally:
+        await http_client.close_session()
+        await fake.stop()
+
+    served_total = fake.requests['chat'] - before
+    observed = Counter()
+    for labels, value in observed_after.items():
+        labels = dict(labels)
+        if labels['service'] == 'openai_chat':
+            observed[labels['status']] += value - observed_before.get(tuple(sorted(labels.items())), 0)
+    return {
+        'bare_ms_per_request': round(bare * 1000, 3),
+        'traced_ms_per_request': round(traced * 1000, 3),
+        'served': served_total,
+        'observed': {status: int(count) for status, count in observed.items()},
+        'observed_total': int(sum(observed.values())),
+    }
+
+
+def bench_render(series):
+    from metrics import Histogram, Registry
+
+    registry = Registry()
+    histogram = registry.register(Histogram('bench_handler_seconds', 'bench', ('router', 'handler', 'event')))
+    for i in range(series):
+        histogram.observe(0.01 * (i % 7), f'router{i % 10}', f'handler_"{i}"\\', 'Message')
+    t0 = time.perf_counter()
+    text = registry.render()
+    elapsed = time.perf_counter() - t0
+    problems, _ = validate(text)
+    return {'series': series, 'render_ms': round(elapsed * 1000, 2), 'bytes': len(text.encode())}, problems
+
+
+def exercise_database():
+    import database
+    from workload import generate
+
+    probes = generate(200, heavy_tasks=100)['probes']
+    database.get_user_tasks(probes['light']['user_id'])
+    database.get_user_stats(probes['light']['user_id'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200_000, help='вызовов observe/inc/middleware')
+    parser.add_argument('--requests', type=int, default=300, help='запросов к фейковому OpenAI')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--series', type=int, default=2000, help='серий гистограммы для render()')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-metrics-')
+    os.environ.setdefault('OPENAI_API_KEY', 'sk-fake')
+    from metrics import REGISTRY
+
+    failures = []
+    results = {'hot_path': bench_hot_path(args.calls)}
+    results['middleware'] = asyncio.run(bench_middleware(args.calls))
+    print(f"observe {results['hot_path']['observe_ns']} нс, inc {results['hot_path']['inc_ns']} нс, "
+          f"middleware +{results['middleware']['overhead_us']} мкс на апдейт")
+
+    upstream = results['upstream'] = asyncio.run(bench_upstream(args.requests, args.concurrency))
+    print(f"запрос к OpenAI: {upstream['bare_ms_per_request']} мс без трассировки, "
+          f"{upstream['traced_ms_per_request']} мс с ней; ответы в метриках {upstream['observed']}")
+    if upstream['observed_total'] != upstream['served']:
+        failures.append(f"в метриках {upstream['observed_total']} ответов OpenAI, сервер отдал {upstream['served']}")
+
+    render, problems = bench_render(args.series)
+    results['render'] = render
+    failures.extend(f'render: {problem}' for problem in problems)
+    print(f"render {render['series']} серий: {render['render_ms']} мс, {render['bytes']} байт")
+
+    exercise_database()
+    t0 = time.perf_counter()
+    text = REGISTRY.render()
+    results['registry_render_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+    problems, types = validate(text)
+    failures.extend(f'/metrics: {problem}' for problem in problems)
+    callers = {dict(labels).get('caller') for labels in samples(text, 'focusup_db_query_seconds_count')}
+    if 'get_user_tasks' not in callers:
+        failures.append(f'нет времени SQL для get_user_tasks: {sorted(callers)}')
+    for family in ('focusup_transcription_queue_depth', 'focusup_deadline_cache_hits_total',
+                   'focusup_transcription_cache_hits_total', 'focusup_upstream_seconds'):
+        if family not in types:
+            failures.append(f'нет семейства {family}')
+    results['families'] = len(types)
+    print(f"/metrics: {len(types)} семейств, {len(text.encode())} байт, {results['registry_render_ms']} мс")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
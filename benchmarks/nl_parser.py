@@ -0,0 +1,116 @@
+"""
+Парсер фраз (nl_parser): проверка на корпусе и пропускная способность на фразу.
+
+Сначала каждая фраза корпуса разбирается при фиксированном «сейчас» и
+сравнивается с ожидаемыми полями (при расхождении — код выхода 1), затем
+для каждой фразы меряется время разбора.
+
+    python benchmarks/nl_parser.py --repeat 20000
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, datetime
+
+import _common  # noqa: F401  (путь к модулям проекта)
+
+NOW = datetime(2025, 3, 10, 12, 0)
+
+# фраза → ожидаемые поля ParsedPhrase (непроверяемые поля опущены)
+CORPUS = [
+    ("Купить молоко завтра в 17:00",
+     dict(title="Купить молоко", due_date=date(2025, 3, 11), due_time="17:00", category="personal")),
+    ("созвон с командой послезавтра в 5 часов вечера",
+     dict(title="созвон с командой", due_date=date(2025, 3, 12), due_time="17:00", category="work")),
+    ("Послезавтра отчёт",
+     dict(title="отчёт", due_date=date(2025, 3, 12), due_time=None)),
+    ("сдать дз 12.03 срочно",
+     dict(title="сдать дз", due_date=date(2025, 3, 12), category="study", priority="high")),
+    ("встать в 9.00",
+     dict(title="встать", due_date=None, due_time="09:00")),
+    ("9.00 пробежка",
+     dict(title="пробежка", due_time="09:00")),
+    ("подготовить отчёт по работе 15 марта высокий приоритет",
+     dict(title="подготовить отчёт", due_date=date(2025, 3, 15), category="work", priority="high")),
+    ("несрочно позвонить маме",
+     dict(title="позвонить маме", priority="low", category=None)),
+    ("тренировка в 7 утра",
+     dict(title="тренировка", due_time="07:00", category="health")),
+    ("Встреча в 18",
+     dict(title="Встреча", due_time="18:00", category="work")),
+    ("важная задача 1.04.2025 10:30",
+     dict(title="задача", due_date=date(2025, 4, 1), due_time="10:30", priority="high")),
+    ("на завтра купить хлеб 🔥",
+     dict(title="купить хлеб", due_date=date(2025, 3, 11), priority="high", category="personal")),
+    ("сходить в зал 2 часа дня",
+     dict(title="сходить в зал", due_time="14:00", category="health")),
+    ("лекция по истории сегодня в 12 ночи",
+     dict(title="лекция по истории", due_date=date(2025, 3, 10), due_time="00:00", category="study")),
+    ("записаться к врачу 5 апреля 2026 в 8:30 средний приоритет",
+     dict(title="записаться к врачу", due_date=date(2026, 4, 5), due_time="08:30",
+          category="health", priority="medium")),
+    ("ужин с друзьями 31.02",
+     dict(due_date=None, category="personal")),
+    ("просто заметка",
+     dict(title="просто заметка", due_date=None, due_time=None, category=None, priority=None)),
+    ("Сегодня",
+     dict(title="Сегодня", due_date=date(2025, 3, 10))),
+    ("проект: дедлайн 25/12/25 в 23:59 низкий приоритет",
+     dict(title="проект: дедлайн", due_date=date(2025, 12, 25), due_time="23:59",
+          category="work", priority="low")),
+    ("позвонить в банк в 25:00",
+     dict(due_time=None)),
+]
+
+
+def check_corpus(parse_phrase):
+    """Расхождения с корпусом: (фраза, поле, получено, ожидалось)"""
+    failures = []
+    for phrase, expected in CORPUS:
+        parsed = parse_phrase(phrase, now=NOW)
+        for field, value in expected.items():
+            if getattr(parsed, field) != value:
+                failures.append((phrase, field, getattr(parsed, field), value))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20000, help='разборов каждой фразы')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    from nl_parser import parse_phrase
+
+    failures = check_corpus(parse_phrase)
+    for phrase, field, got, expected in failures:
+        print(f"FAIL {phrase!r}: {field} = {got!r}, ожидалось {expected!r}")
+    failed_phrases = {phrase for phrase, *_ in failures}
+    print(f"корпус: {len(CORPUS) - len(failed_phrases)}/{len(CORPUS)} фраз разобраны верно")
+
+    results = {}
+    for phrase, _ in CORPUS:
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            parse_phrase(phrase, now=NOW)
+        elapsed = time.perf_counter() - t0
+        results[phrase] = {
+            'us_per_phrase': round(elapsed / args.repeat * 1e6, 2),
+            'phrases_per_s': round(args.repeat / elapsed),
+        }
+
+    print(f"{'phrase':<60} {'µs':>7} {'phrases/s':>10}")
+    for phrase, r in results.items():
+        print(f"{phrase[:60]:<60} {r['us_per_phrase']:>7} {r['phrases_per_s']:>10}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'failures': failures, 'results': results},
+                      f, ensure_ascii=False, indent=2, default=str)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
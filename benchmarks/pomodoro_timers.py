@@ -0,0 +1,185 @@
+"""
+Масштабируемость таймеров Pomodoro: N одновременных виртуальных таймеров.
+
+Каждый таймер — настоящий handlers.pomodoro.pomodoro_timer_seconds с записью
+в active_timers, как после start_pomodoro; сообщение — заглушка, у которой
+edit_caption только запоминает время вызова (--edit-latency имитирует сеть).
+Старты равномерно размазаны по --spread секундам, как у живых пользователей;
+--spread 0 — худший случай, когда все таймеры тикают в одну и ту же долю секунды.
+Для каждого N измеряются:
+
+- задержка event loop (насколько позже просыпается sleep(0.1));
+- дрожание тиков — отклонение интервала между обновлениями подписи от 1 с;
+- процессорное время на таймер и на тик, загрузка ядра;
+- память на запись в active_timers вместе с её задачей (tracemalloc);
+- точность завершения — насколько позже срока пришла подпись «завершена».
+
+Таймер, не дошедший до завершения, или запись, оставшаяся в active_timers, —
+ошибка (код выхода 1).
+
+    python benchmarks/pomodoro_timers.py --timers 100 1000 10000 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+import _common
+
+
+class StubMessage:
+    """Сообщение с анимацией таймера: edit_caption без Bot API"""
+
+    def __init__(self, chat_id, message_id, edit_latency):
+        self.chat = SimpleNamespace(id=chat_id)
+        self.message_id = message_id
+        self.edit_latency = edit_latency
+        self.ticks = []
+        self.started_at = None
+        self.finished_at = None
+
+    async def edit_caption(self, caption=None, reply_markup=None, **kwargs):
+        if self.edit_latency:
+            await asyncio.sleep(self.edit_latency)
+        if 'завершена' in (caption or ''):
+            self.finished_at = time.monotonic()
+        else:
+            self.ticks.append(time.monotonic())
+
+
+async def _watch_loop(lags, stop, interval=0.1):
+    while not stop.is_set():
+        t0 = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append(time.monotonic() - t0 - interval)
+
+
+def _start_timer(pomodoro, user_id, duration, message):
+    # та же запись, что создаёт start_pomodoro
+    pomodoro.active_timers[user_id] = {
+        'task': asyncio.create_task(pomodoro.pomodoro_timer_seconds(user_id, duration, 'work', message)),
+        'start_time': datetime.now(),
+        'duration': duration,
+        'message_id': message.message_id,
+        'chat_id': message.chat.id,
+        'session_type': 'work',
+        'paused': False,
+        'remaining_seconds': duration,
+    }
+
+
+async def run_timers(count, duration, edit_latency, spread):
+    from handlers import pomodoro
+
+    messages = [StubMessage(user_id, user_id, edit_latency) for user_id in range(1, count + 1)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    first_start = time.monotonic()
+    for index, message in enumerate(messages):
+        delay = first_start + spread * index / count - time.monotonic()
+        if delay > 0.001:
+            await asyncio.sleep(delay)
+        message.started_at = time.monotonic()
+        _start_timer(pomodoro, message.chat.id, duration, message)
+    per_entry = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+
+    lags = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(_watch_loop(lags, stop))
+    cpu0 = time.process_time()
+    wall0 = time.monotonic()
+
+    tasks = [entry['task'] for entry in pomodoro.active_timers.values()]
+    await asyncio.wait(tasks, timeout=duration * 3 + 30)
+
+    cpu = time.process_time() - cpu0
+    wall = time.monotonic() - wall0
+    stop.set()
+    await watcher
+
+    leftover = len(pomodoro.active_timers)
+    for user_id in list(pomodoro.active_timers):
+        await pomodoro.stop_pomodoro(user_id)
+
+    jitter = []
+    ticks = 0
+    for message in messages:
+        ticks += len(message.ticks)
+        jitter.extend(abs(b - a - 1.0) for a, b in zip(message.ticks, message.ticks[1:]))
+    late = [
+        message.finished_at - message.started_at - duration
+        for message in messages if message.finished_at is not None
+    ]
+
+    return {
+        'timers': count,
+        'loop_lag': _common.latency_summary(lags),
+        'tick_jitter': _common.latency_summary(jitter),
+        'completion_late': _common.latency_summary(late),
+        'ticks': ticks,
+        'cpu_s': round(cpu, 3),
+        'cpu_core_pct': round(cpu / wall * 100, 1),
+        'cpu_us_per_tick': round(cpu / max(1, ticks) * 1e6, 1),
+        'cpu_ms_per_timer': round(cpu / count * 1000, 3),
+        'bytes_per_entry': round(per_entry),
+        'completed': len(late),
+        'left_in_active_timers': leftover,
+    }
+
+
+async def run(args):
+    results = {}
+    for count in args.timers:
+        results[count] = await run_timers(count, args.duration, args.edit_latency, args.spread)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--timers', type=int, nargs='+', default=[100, 1000, 10_000])
+    parser.add_argument('--duration', type=int, default=10, help='длительность таймера, с')
+    parser.add_argument('--spread', type=float, default=1.0, help='за сколько секунд стартуют все таймеры')
+    parser.add_argument('--edit-latency', type=float, default=0.0, help='задержка edit_caption, с')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    # pomodoro_finished записывает сессию в БД (пользователей нет — только поиск)
+    _common.use_temp_db('focusup-pomodoro-')
+    from database import init_db
+    init_db()
+
+    results = asyncio.run(run(args))
+
+    failures = []
+    print(f"{'timers':>7} {'lag p99':>8} {'jit p50':>8} {'jit p99':>8} {'late p50':>9} {'late max':>9} "
+          f"{'cpu %':>6} {'us/tick':>8} {'B/entry':>8} {'done':>6}")
+    for count, r in results.items():
+        print(f"{count:>7} {r['loop_lag']['p99_ms']:>8.1f} {r['tick_jitter']['p50_ms']:>8.1f} "
+              f"{r['tick_jitter']['p99_ms']:>8.1f} {r['completion_late']['p50_ms']:>9.1f} "
+              f"{r['completion_late']['max_ms']:>9.1f} {r['cpu_core_pct']:>6} {r['cpu_us_per_tick']:>8} "
+              f"{r['bytes_per_entry']:>8} {r['completed']:>6}")
+        if r['completed'] != count or r['left_in_active_timers']:
+            failures.append(f"{count} таймеров: завершено {r['completed']}, "
+                            f"осталось в active_timers {r['left_in_active_timers']}")
+    print("(мс; lag — задержка event loop, jit — отклонение интервала тиков от 1 с, "
+          "late — опоздание завершения)")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Профилировщик SQL (query_profiler.py): накладные расходы и корректность учёта.
+
+На синтетической БД (workload.py) одни и те же вызовы database.py гоняются
+с выключенным и включённым профилировщиком; разница p50 — цена замера.
+Проверки (код выхода 1): у каждого вызова есть запись с его функцией,
+число вызовов и возвращённых строк совпадает с фактическим, медленные
+запросы (порог 0 мс) попадают в журнал с планом EXPLAIN QUERY PLAN.
+
+    python benchmarks/query_profiler.py --users 2000 --repeat 200
+"""
+import argparse
+import json
+import sys
+import time
+
+import _common
+
+
+def _measure(func, args, repeat):
+    func(*args)
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - t0)
+    return _common.latency_summary(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--heavy-tasks', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-sqlprof-')
+    import database
+    from query_profiler import profiler, format_report
+    from workload import generate
+
+    probes = generate(args.users, heavy_tasks=args.heavy_tasks)['probes']
+    light, heavy = probes['light'], probes['heavy']
+    cases = [
+        ('get_user_id_by_telegram_id', database.get_user_id_by_telegram_id, (light['telegram_id'],), 1),
+        ('get_user_tasks', database.get_user_tasks, (light['user_id'],), light['tasks']),
+        ('get_user_tasks', database.get_user_tasks, (heavy['user_id'],), heavy['tasks']),
+        ('get_user_stats', database.get_user_stats, (light['user_id'],), None),
+    ]
+
+    results = {}
+    failures = []
+    print(f"{'case':<34} {'off p50':>9} {'on p50':>9} {'overhead':>9}")
+    for name, func, call_args, _ in cases:
+        label = f"{name}({call_args[0]})"
+        profiler.enabled = False
+        off = _measure(func, call_args, args.repeat)
+        profiler.enabled = True
+        profiler.reset()
+        on = _measure(func, call_args, args.repeat)
+        overhead = on['p50_ms'] - off['p50_ms']
+        results[label] = {'off': off, 'on': on, 'overhead_ms': round(overhead, 4)}
+        print(f"{label:<34} {off['p50_ms']:>9} {on['p50_ms']:>9} {overhead:>9.4f}")
+
+    # Учёт: вызовы и строки
+    for name, func, call_args, expected_rows in cases:
+        if expected_rows is None:
+            continue
+        profiler.reset()
+        for _ in range(3):
+            func(*call_args)
+        entries = [s for s in profiler.report()['statements'] if s['caller'] == name]
+        counted = sum(s['count'] for s in entries)
+        rows = sum(s['rows'] for s in entries if s['sql'].upper().startswith('SELECT'))
+        if counted < 3 or rows != expected_rows * 3:
+            failures.append(f"{name}: учтено вызовов {counted}, строк {rows}, ожидалось строк {expected_rows * 3}")
+
+    # Журнал медленных с планом
+    profiler.reset()
+    profiler.slow_ms, profiler.explain_slow = 0, True
+    database.get_user_tasks(heavy['user_id'])
+    report = profiler.report()
+    profiler.slow_ms, profiler.explain_slow = 100, False
+    slow = [entry for entry in report['slow'] if entry['caller'] == 'get_user_tasks']
+    if not slow or not slow[0]['plan'] or 'не удалось' in slow[0]['plan'][0]:
+        failures.append(f"нет записи о медленном запросе с планом: {report['slow'][:1]}")
+    else:
+        print(f"план get_user_tasks: {slow[0]['plan']}")
+
+    print()
+    print(format_report(report, top=5))
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
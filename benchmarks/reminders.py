@@ -0,0 +1,317 @@
+"""
+Напоминания о дедлайнах (reminders.py): чтение окна по индексу и доставка.
+
+1. Колонка: tasks.deadline_ts (выражение SQLite) совпадает с
+   deadlines.deadline_timestamp на всех задачах синтетической БД.
+2. Окно: загрузка ближайших lead + window минут через get_due_reminders
+   против «наивного» опроса — чтение всех невыполненных задач и разбор дат в
+   Python. Затем в таблицу добавляется ещё столько же задач вне окна:
+   индексная загрузка не должна заметно дорожать (не больше --max-growth раз).
+3. Доставка: два планировщика (как два процесса бота) с общей БД и
+   заглушкой бота. У --due задач пользователя-пробы дедлайны в ближайшие
+   lead + window минут, часть выполнена заранее, часть — после загрузки окна.
+   Часы планировщиков затем переводятся на окно вперёд. Каждая невыполненная
+   задача, чей момент напоминания наступил, должна получить ровно одно
+   напоминание; выполненные и ещё не наступившие — ни одного; темп каждого
+   планировщика — не выше --rate. Третий планировщик («перезапуск») не
+   должен повторить ни одного из них.
+
+Нарушение любой из проверок — код выхода 1.
+
+    python benchmarks/reminders.py --users 10000 --due 1000 --rate 25
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import _common
+
+TELEGRAM_ID = 50_000_000
+# Запас на границах окна: часы планировщика идут, пока идёт проверка
+EDGE_SECONDS = 90
+
+
+class RecordingBot:
+    """Заглушка aiogram.Bot: запоминает, о каких задачах и когда пришли напоминания"""
+
+    def __init__(self):
+        self.sent = []   # (monotonic, task_id)
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        callback_data = reply_markup.inline_keyboard[0][0].callback_data
+        self.sent.append((time.monotonic(), int(callback_data.rsplit('_', 1)[1])))
+
+
+def check_column(failures):
+    import database
+    from deadlines import deadline_timestamp
+
+    conn = database.get_connection()
+    try:
+        rows = conn.execute('SELECT deadline, deadline_ts FROM tasks WHERE deadline IS NOT NULL').fetchall()
+    finally:
+        conn.close()
+    mismatched = [(deadline, ts) for deadline, ts in rows if deadline_timestamp(deadline) != ts]
+    print(f"колонка: {len(rows)} дедлайнов, расхождений с deadline_timestamp: {len(mismatched)}")
+    if mismatched:
+        failures.append(f"deadline_ts расходится с deadline_timestamp: {mismatched[:3]}")
+    return {'deadlines': len(rows), 'mismatched': len(mismatched)}
+
+
+def load_indexed(now, horizon, page_size):
+    import database
+
+    after, rows = (0, 0), 0
+    while True:
+        page = database.get_due_reminders(now, now + horizon, after, page_size)
+        rows += len(page)
+        if len(page) < page_size:
+            return rows
+        after = (page[-1][1], page[-1][0])
+
+
+def load_naive(now, horizon):
+    """Как без индекса: все невыполненные задачи с дедлайном и разбор дат в Python"""
+    import database
+    from deadlines import deadline_timestamp
+
+    conn = database.get_connection()
+    try:
+        rows = conn.execute('''
+            SELECT t.id, t.deadline, u.telegram_id, t.title FROM tasks t JOIN users u ON u.id = t.user_id
+            WHERE t.completed = FALSE AND t.deadline IS NOT NULL
+        ''').fetchall()
+    finally:
+        conn.close()
+    return sum(1 for row in rows if now <= (deadline_timestamp(row[1]) or 0) <= now + horizon)
+
+
+def measure_window(horizon, repeat, page_size):
+    from deadlines import wall_clock_ts
+
+    now = wall_clock_ts()
+    result = {}
+    for name, load in (('indexed', lambda: load_indexed(now, horizon, page_size)),
+                       ('naive', lambda: load_naive(now, horizon))):
+        rows = load()
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            load()
+            samples.append(time.perf_counter() - t0)
+        result[name] = dict(_common.latency_summary(samples), rows=rows)
+    return result
+
+
+def add_filler(tasks, seed):
+    """Ещё tasks задач вне окна напоминаний: прошлые, далёкие и выполненные"""
+    import database
+    from workload import insert_tasks
+
+    database.add_user(TELEGRAM_ID + 1, 'filler')
+    user_id = database.get_user_id_by_telegram_id(TELEGRAM_ID + 1)
+    conn = database.get_connection()
+    try:
+        insert_tasks(conn, random.Random(seed), user_id, tasks, datetime.now() + timedelta(days=365))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def make_due(count, lead, window, seed):
+    """count задач пользователю-пробе с дедлайнами в ближайшие lead + window минут; 10% выполнены"""
+    import database
+
+    rng = random.Random(seed)
+    database.add_user(TELEGRAM_ID, 'reminders')
+    user_id = database.get_user_id_by_telegram_id(TELEGRAM_ID)
+    now = datetime.now().replace(second=0, microsecond=0)
+    rows = []
+    for i in range(count):
+        moment = now + timedelta(minutes=rng.randint(2, lead + window - 1))
+        rows.append((user_id, f'Напоминание {i}', '💼 Работа', moment.strftime('%d.%m.%y %H:%M'),
+                     rng.random() < 0.1))
+    conn = database.get_connection()
+    try:
+        conn.executemany('INSERT INTO tasks (user_id, title, category, deadline, completed) VALUES (?, ?, ?, ?, ?)',
+                         rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def incomplete_deadlines():
+    import database
+
+    conn = database.get_connection()
+    try:
+        return dict(conn.execute(
+            'SELECT id, deadline_ts FROM tasks WHERE completed = FALSE AND deadline_ts IS NOT NULL'
+        ).fetchall())
+    finally:
+        conn.close()
+
+
+async def settle(schedulers, bots, quiet=1.0, timeout=120):
+    """Ждёт, пока планировщики не перестанут отправлять"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        await asyncio.sleep(quiet / 4)
+        last = max((bot.sent[-1][0] for bot in bots if bot.sent), default=started)
+        if time.monotonic() - last >= quiet and all(
+                not s._heap or s._heap[0][0] > s.clock() for s in schedulers):
+            return
+    raise TimeoutError('планировщики не успокоились')
+
+
+def send_rate(bot, capacity):
+    """Темп отправки без начального всплеска ёмкости бакета, в секунду"""
+    times = [t for t, _ in bot.sent]
+    if len(times) <= capacity + 1:
+        return 0.0
+    return (len(times) - capacity) / (times[-1] - times[0])
+
+
+async def run_delivery(lead, window, rate, failures):
+    import database
+    from deadlines import wall_clock_ts
+    from reminders import ReminderScheduler
+
+    shift = [0]
+
+    def clock():
+        return wall_clock_ts() + shift[0]
+
+    def scheduler():
+        return ReminderScheduler(lead_minutes=lead, window_minutes=window, rescan_seconds=0.2,
+                                 rate=rate, page_size=500, clock=clock)
+
+    bots = [RecordingBot(), RecordingBot()]
+    schedulers = [scheduler(), scheduler()]
+    started_at = clock()
+    for s, bot in zip(schedulers, bots):
+        s.start(bot)
+
+    await settle(schedulers, bots)
+    # Задачи, которые выполнили после загрузки окна, но до напоминания
+    pending = incomplete_deadlines()
+    late = [task_id for task_id, ts in pending.items()
+            if clock() + lead * 60 + EDGE_SECONDS < ts <= clock() + (lead + window) * 60]
+    late = random.Random(1).sample(late, len(late) // 10)
+    for task_id in late:
+        database.update_task_status(task_id, True)
+
+    shift[0] = window * 60
+    await settle(schedulers, bots)
+    finished_at = clock()
+    for s in schedulers:
+        await s.stop()
+
+    restarted, restart_bot = scheduler(), RecordingBot()
+    restarted.start(restart_bot)
+    await asyncio.sleep(1)
+    await restarted.stop()
+
+    sent = Counter(task_id for bot in bots for _, task_id in bot.sent)
+    due = incomplete_deadlines()
+    must = {task_id for task_id, ts in due.items()
+            if started_at + EDGE_SECONDS <= ts <= finished_at + lead * 60 - EDGE_SECONDS}
+    allowed = {task_id for task_id, ts in due.items()
+               if started_at - EDGE_SECONDS <= ts <= finished_at + lead * 60 + EDGE_SECONDS}
+
+    duplicates = [task_id for task_id, n in sent.items() if n > 1]
+    missing = must - set(sent)
+    unexpected = set(sent) - allowed
+    rates = [round(send_rate(bot, rate), 1) for bot in bots]
+
+    if duplicates:
+        failures.append(f"повторные напоминания: {len(duplicates)} задач, например {duplicates[:5]}")
+    if missing:
+        failures.append(f"не напомнили о {len(missing)} задачах, например {sorted(missing)[:5]}")
+    if unexpected:
+        failures.append(f"лишние напоминания (выполненные или не наступившие): {sorted(unexpected)[:5]}")
+    if max(rates) > rate * 1.1:
+        failures.append(f"темп отправки {max(rates)}/с при лимите {rate}/с")
+    # после перезапуска законны лишь напоминания, чей момент наступил за эту секунду
+    repeated = [task_id for _, task_id in restart_bot.sent if task_id in sent]
+    if repeated:
+        failures.append(f"после перезапуска повторены напоминания: {repeated[:5]}")
+
+    return {
+        'must': len(must),
+        'sent': sum(sent.values()),
+        'per_scheduler': [s.stats() for s in schedulers],
+        'completed_late': len(late),
+        'rates': rates,
+        'restart_sent': len(restart_bot.sent),
+        'restart_repeated': len(repeated),
+        'duplicates': len(duplicates),
+        'missing': len(missing),
+        'unexpected': len(unexpected),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--heavy-tasks', type=int, default=10_000)
+    parser.add_argument('--due', type=int, default=1000, help='задач пользователя-пробы в окне напоминаний')
+    parser.add_argument('--lead', type=int, default=30, help='за сколько минут напоминать')
+    parser.add_argument('--window', type=int, default=10, help='запас окна сверх lead, минут')
+    parser.add_argument('--rate', type=float, default=25, help='напоминаний в секунду на планировщик')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--max-growth', type=float, default=2.0,
+                        help='во сколько раз может подорожать загрузка окна при удвоении таблицы')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    _common.use_temp_db('focusup-reminders-')
+    import workload
+
+    dataset = workload.generate(users=args.users, heavy_tasks=args.heavy_tasks, seed=args.seed)
+    make_due(args.due, args.lead, args.window, args.seed)
+    print(f"БД: {dataset['users']} пользователей, {dataset['tasks'] + args.due} задач")
+
+    failures = []
+    results = {'dataset': dataset}
+    results['column'] = check_column(failures)
+
+    horizon = (args.lead + args.window) * 60
+    windows = results['window'] = {'base': measure_window(horizon, args.repeat, 500)}
+    add_filler(dataset['tasks'] + args.due, args.seed + 1)
+    windows['doubled'] = measure_window(horizon, args.repeat, 500)
+    print(f"{'окно':<16} {'строк':>6} {'индекс p50':>11} {'наивно p50':>11}")
+    for label, w in windows.items():
+        print(f"{label:<16} {w['indexed']['rows']:>6} {w['indexed']['p50_ms']:>9} мс {w['naive']['p50_ms']:>8} мс")
+        if w['indexed']['rows'] != w['naive']['rows']:
+            failures.append(f"окно {label}: по индексу {w['indexed']['rows']} строк, наивно {w['naive']['rows']}")
+    growth = windows['doubled']['indexed']['p50_ms'] / max(windows['base']['indexed']['p50_ms'], 1e-3)
+    if growth > args.max_growth:
+        failures.append(f"загрузка окна подорожала в {growth:.2f} раза при удвоении таблицы")
+
+    delivery = results['delivery'] = asyncio.run(run_delivery(args.lead, args.window, args.rate, failures))
+    print(f"доставка: обязательных {delivery['must']}, отправлено {delivery['sent']}, "
+          f"выполнено после загрузки {delivery['completed_late']}, темп {delivery['rates']}/с, "
+          f"после перезапуска {delivery['restart_sent']} (повторов {delivery['restart_repeated']})")
+    for stats in delivery['per_scheduler']:
+        print(f"   {stats}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Шардирование (shards.py): пропускная способность от 1 до N процессов-воркеров.
+
+Супервизор забирает апдейты с фейкового Bot API (fake_telegram.py) через
+getUpdates и раздаёт их воркерам по chat id. Каждый виртуальный пользователь
+запускает Pomodoro (рендер GIF — честная нагрузка на CPU) и сразу его
+останавливает. Остановка срабатывает, только если апдейт попал в тот же
+процесс, где живёт таймер, — каждый сорванный сценарий считается ошибкой
+(код выхода 1). Рост пропускной способности ограничен числом ядер машины.
+
+    python benchmarks/sharding.py --shards 1 2 4 --users 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import _common
+from fake_telegram import FakeTelegram
+
+
+def _is_stop_reply(method, params):
+    return method == 'editMessageCaption' and 'остановлена' in str(params.get('caption', ''))
+
+
+async def run_shards(fake, shards, users, timeout):
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from shards import ShardSupervisor
+
+    supervisor = ShardSupervisor(shards)
+    supervisor.start()
+    bot = Bot(token=os.environ['BOT_TOKEN'], session=AiohttpSession(api=TelegramAPIServer.from_base(fake.base_url)))
+    polling = asyncio.create_task(supervisor.run_polling(bot))
+
+    # Прогрев: каждый воркер импортировал bot.py и отвечает
+    await asyncio.gather(*(_help(fake, 900_000 + i) for i in range(shards * 4)))
+
+    latencies = []
+    failures = []
+    api_calls_before = len(fake.calls)
+
+    async def user(user_id):
+        t0 = time.perf_counter()
+        started = fake.wait_reply(user_id, lambda method, _: method == 'sendAnimation')
+        fake.push_update(fake.callback_update(user_id, 'pomo_start_work'))
+        stopped = fake.wait_reply(user_id, _is_stop_reply)
+        try:
+            _, animation = await asyncio.wait_for(started, timeout)
+            fake.push_update(fake.callback_update(user_id, 'pomo_stop', message_id=int(animation.get('message_id', 1))))
+            await asyncio.wait_for(stopped, timeout)
+        except asyncio.TimeoutError:
+            failures.append(user_id)
+            return
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user(user_id) for user_id in range(1, users + 1)))
+    elapsed = time.perf_counter() - t0
+
+    polling.cancel()
+    supervisor.stop()
+    await bot.session.close()
+
+    result = _common.latency_summary(latencies)
+    result.update({
+        'seconds': round(elapsed, 2),
+        'flows_per_s': round(len(latencies) / elapsed, 2),
+        'updates_per_s': round(len(latencies) * 2 / elapsed, 2),
+        'failed_flows': len(failures),
+        'api_calls': len(fake.calls) - api_calls_before,
+        'routed_per_shard': supervisor.routed,
+    })
+    return result
+
+
+async def _help(fake, user_id):
+    reply = fake.wait_reply(user_id)
+    fake.push_update(fake.message_update(user_id, '/help'))
+    await asyncio.wait_for(reply, 120)
+
+
+async def run(args):
+    fake = FakeTelegram()
+    os.environ['TELEGRAM_API_URL'] = await fake.start()
+    results = {}
+    try:
+        for shards in args.shards:
+            results[shards] = await run_shards(fake, shards, args.users, args.timeout)
+    finally:
+        await fake.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--users', type=int, default=40)
+    parser.add_argument('--timeout', type=float, default=120, help='секунд на шаг сценария')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    # Окружение наследуют воркеры, поэтому настраивается только в родительском процессе
+    _common.use_temp_db('focusup-shards-')
+    from database import init_db
+    init_db()
+
+    results = asyncio.run(run(args))
+
+    print(f"ядер: {os.cpu_count()}")
+    print(f"{'shards':>6} {'flows/s':>8} {'upd/s':>7} {'p50 ms':>9} {'p99 ms':>9} {'failed':>7}  routed")
+    for shards, r in results.items():
+        print(f"{shards:>6} {r['flows_per_s']:>8} {r['updates_per_s']:>7} {r['p50_ms']:>9} {r['p99_ms']:>9} "
+              f"{r['failed_flows']:>7}  {r['routed_per_shard']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'cpu_count': os.cpu_count(), 'results': results},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if any(r['failed_flows'] for r in results.values()) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Сериализация /api/tasks: разбор полей при чтении против нормализации при записи.
+
+Заполняет временную БД задачами в «старом» виде (русские категории, ISO-дедлайны,
+приоритет в tags), меряет прежний путь (get_user_tasks + normalize_* на каждую
+строку), затем прогоняет миграцию и меряет новый (get_user_tasks_for_api + проекция).
+
+    python benchmarks/tasks_serialization.py --tasks 5000 --repeat 30
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import _common
+
+CATEGORIES = ['💼 Работа', '📚 Учёба', '🏃 Здоровье', '🏠 Личное', 'work', 'personal', '🔧 Другое']
+TAGS = [None, 'high', 'low', 'medium', 'голосовая', '3', '1']
+
+
+def _deadline(rng, i):
+    if i % 5 == 0:
+        return None
+    day, month, hour = rng.randint(1, 28), rng.randint(1, 12), rng.randint(0, 23)
+    if i % 2:
+        return f"2025-{month:02d}-{day:02d}T{hour:02d}:00:00"
+    return f"{day:02d}.{month:02d}.25 {hour:02d}:00"
+
+
+def seed_legacy(tasks_count: int, seed: int = 42) -> int:
+    """Задачи в том виде, как их писали до нормализации при записи"""
+    import database
+
+    database.init_db()
+    user_id = database.add_user(424242, 'bench', 'Bench', 'User')
+    rng = random.Random(seed)
+    rows = [
+        (user_id, f"Задача {i}", rng.choice(CATEGORIES), rng.choice(TAGS), _deadline(rng, i), i % 4 == 0)
+        for i in range(tasks_count)
+    ]
+    conn = database.get_connection()
+    conn.executemany(
+        'INSERT INTO tasks (user_id, title, category, tags, deadline, completed) VALUES (?, ?, ?, ?, ?, ?)',
+        rows,
+    )
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def legacy_serialize(t) -> dict:
+    """Прежний serialize_task: нормализация каждой строки при каждом чтении"""
+    from task_fields import normalize_category, normalize_deadline, priority_from_tags
+
+    pr = priority_from_tags(t[4])
+    return {
+        "id": t[0],
+        "user_id": t[1],
+        "title": t[2],
+        "category": normalize_category(t[3]),
+        "tags": t[4],
+        "deadline": normalize_deadline(t[5]),
+        "completed": bool(t[6]),
+        "created_at": t[7],
+        "updated_at": t[8],
+        "priority": pr,
+    }
+
+
+def _measure(fetch, serialize, repeat):
+    fetch_s, serialize_s, total_s = [], [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = fetch()
+        t1 = time.perf_counter()
+        body = json.dumps({"success": True, "tasks": [serialize(t) for t in rows]}, ensure_ascii=False)
+        t2 = time.perf_counter()
+        fetch_s.append(t1 - t0)
+        serialize_s.append(t2 - t1)
+        total_s.append(t2 - t0)
+    return {
+        'rows': len(rows),
+        'body_bytes': len(body.encode()),
+        'fetch': _common.latency_summary(fetch_s),
+        'serialize': _common.latency_summary(serialize_s),
+        'total': _common.latency_summary(total_s),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    db_path = _common.use_temp_db()
+    try:
+        import database
+        from api_common import serialize_task
+
+        # логи DEBUG/INFO из database.py искажают замеры
+        database.logger.disabled = True
+        user_id = seed_legacy(args.tasks)
+
+        results = {'legacy': _measure(lambda: database.get_user_tasks(user_id), legacy_serialize, args.repeat)}
+
+        conn = database.get_connection()
+        t0 = time.perf_counter()
+        database._migrate_normalized_fields(conn.cursor())
+        conn.commit()
+        migrate_ms = round((time.perf_counter() - t0) * 1000, 1)
+        conn.close()
+
+        results['write_normalized'] = _measure(
+            lambda: database.get_user_tasks_for_api(user_id), serialize_task, args.repeat
+        )
+        results['migration_ms'] = migrate_ms
+    finally:
+        os.unlink(db_path)
+
+    print(f"{'path':<18} {'rows':>6} {'fetch p50':>10} {'serialize p50':>14} {'total p50':>10} {'total p99':>10}")
+    for name in ('legacy', 'write_normalized'):
+        r = results[name]
+        print(f"{name:<18} {r['rows']:>6} {r['fetch']['p50_ms']:>10} {r['serialize']['p50_ms']:>14} "
+              f"{r['total']['p50_ms']:>10} {r['total']['p99_ms']:>10}")
+    print(f"миграция {args.tasks} задач: {migrate_ms} мс")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
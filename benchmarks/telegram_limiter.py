@@ -0,0 +1,173 @@
+"""
+Таймеры Pomodoro против лимитов Telegram: прямые правки против telegram_limiter.
+
+Фейковый Bot API (fake_telegram.py) отвечает 429 сверх 30 сообщений/с на бота
+и 1 сообщения/с на чат. У каждого пользователя тикает таймер, который правит
+подпись своего сообщения чаще лимита чата, как handlers/pomodoro.py
+(ошибки правки проглатываются). В режиме overlap тик не ждёт предыдущую
+правку (как кнопка паузы, нажатая во время тика) — здесь работает
+схлопывание правок. Сравниваются 429 на сервере, дошедшие и
+потерянные правки, и дошла ли до каждого чата последняя правка.
+
+Отдельно — остановка сессии, как stop_pomodoro: тик таймера ждёт очереди
+чата, к нему присоединяется правка «сессия остановлена», и таймер
+отменяют. Правка остановки должна вернуть результат (а не CancelledError)
+и дойти до Telegram в каждом чате; иначе код выхода 1.
+
+    python benchmarks/telegram_limiter.py --users 40 --ticks 10 --interval 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import _common
+from fake_telegram import FakeTelegram
+
+
+async def run_timers(limiter, users, ticks, interval, overlap=False):
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    fake = FakeTelegram(flood_limits=(30, 1, 3))
+    base_url = await fake.start()
+    bot = Bot(token=os.environ['BOT_TOKEN'], session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    if limiter is not None:
+        bot.session.middleware(limiter)
+
+    failed = 0
+
+    async def edit(chat_id, tick):
+        nonlocal failed
+        try:
+            await bot.edit_message_caption(chat_id=chat_id, message_id=1, caption=f'⏱ тик {tick}')
+        except Exception:
+            failed += 1
+
+    async def timer(chat_id):
+        edits = []
+        for tick in range(1, ticks + 1):
+            await asyncio.sleep(interval)
+            if overlap:
+                edits.append(asyncio.create_task(edit(chat_id, tick)))
+            else:
+                await edit(chat_id, tick)
+        await asyncio.gather(*edits)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(timer(chat_id) for chat_id in range(1, users + 1)))
+    elapsed = time.perf_counter() - t0
+    await bot.session.close()
+    await fake.stop()
+
+    last_caption = {}
+    for method, params, _ in fake.calls:
+        if method == 'editMessageCaption':
+            last_caption[int(params['chat_id'])] = params['caption']
+    accepted = fake.method_counts['editMessageCaption'] - fake.flood_errors
+    result = {
+        'seconds': round(elapsed, 2),
+        'edits_requested': users * ticks,
+        'edits_accepted': accepted,
+        'http_429': fake.flood_errors,
+        'failed_in_handler': failed,
+        'chats_with_final_tick': sum(1 for caption in last_caption.values() if caption == f'⏱ тик {ticks}'),
+    }
+    if limiter is not None:
+        result['limiter'] = limiter.stats()
+    return result
+
+
+async def run_owner_cancelled(users):
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from telegram_limiter import TelegramRateLimiter
+
+    fake = FakeTelegram(flood_limits=(30, 1, 3))
+    base_url = await fake.start()
+    bot = Bot(token=os.environ['BOT_TOKEN'], session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    limiter = TelegramRateLimiter(chat_burst=1)
+    bot.session.middleware(limiter)
+
+    def edit(chat_id, caption):
+        return bot.edit_message_caption(chat_id=chat_id, message_id=1, caption=caption)
+
+    async def stop_session(chat_id):
+        await edit(chat_id, '⏱ тик 0')                         # забирает токен чата
+        tick = asyncio.create_task(edit(chat_id, '⏱ тик 1'))   # ждёт очереди
+        await asyncio.sleep(0.05)
+        stop = asyncio.create_task(edit(chat_id, '⏹ сессия остановлена'))
+        await asyncio.sleep(0)
+        tick.cancel()
+        try:
+            await stop
+            return 'ok'
+        except asyncio.CancelledError:
+            return 'cancelled'
+        except Exception as e:
+            return type(e).__name__
+
+    outcomes = await asyncio.gather(*(stop_session(chat_id) for chat_id in range(1, users + 1)))
+    await bot.session.close()
+    await fake.stop()
+
+    last_caption = {}
+    for method, params, _ in fake.calls:
+        if method == 'editMessageCaption':
+            last_caption[int(params['chat_id'])] = params['caption']
+    return {
+        'stop_ok': outcomes.count('ok'),
+        'stop_errors': sorted(set(outcomes) - {'ok'}),
+        'chats_with_stop': sum(1 for caption in last_caption.values() if caption == '⏹ сессия остановлена'),
+        'limiter': limiter.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=40)
+    parser.add_argument('--ticks', type=int, default=10)
+    parser.add_argument('--interval', type=float, default=0.5, help='секунд между тиками таймера')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    from telegram_limiter import TelegramRateLimiter
+
+    results = {
+        'direct': asyncio.run(run_timers(None, args.users, args.ticks, args.interval)),
+        'limiter': asyncio.run(run_timers(TelegramRateLimiter(), args.users, args.ticks, args.interval)),
+        'overlap': asyncio.run(run_timers(TelegramRateLimiter(), args.users, args.ticks, args.interval, overlap=True)),
+    }
+
+    print(f"{'mode':<8} {'seconds':>8} {'accepted':>9} {'429':>6} {'failed':>7} {'final tick':>11}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['seconds']:>8} {r['edits_accepted']:>9} {r['http_429']:>6} "
+              f"{r['failed_in_handler']:>7} {r['chats_with_final_tick']:>8}/{args.users}")
+    for name in ('limiter', 'overlap'):
+        print(f"{name}: {results[name]['limiter']}")
+
+    stopped = results['owner_cancelled'] = asyncio.run(run_owner_cancelled(args.users))
+    print(f"остановка с отменой таймера: правка вернулась в {stopped['stop_ok']}/{args.users} чатах, "
+          f"дошла в {stopped['chats_with_stop']}/{args.users}, ошибки {stopped['stop_errors'] or '—'}")
+    failures = []
+    if stopped['stop_ok'] != args.users:
+        failures.append(f"правка остановки не вернула результат: {stopped['stop_errors']}")
+    if stopped['chats_with_stop'] != args.users:
+        failures.append(f"правка остановки дошла до {stopped['chats_with_stop']} из {args.users} чатов")
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'failures': failures},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
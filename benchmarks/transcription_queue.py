@@ -0,0 +1,114 @@
+"""
+Очередь распознавания: обычная FIFO против круговой раздачи по пользователям.
+
+Один «шумный» пользователь присылает пачку голосовых, остальные — по одному
+чуть позже. Распознавание имитируется asyncio.sleep. Сравнивается ожидание
+в очереди у остальных пользователей.
+
+    python benchmarks/transcription_queue.py --burst 60 --users 30 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import _common
+
+
+async def _fifo(jobs, workers):
+    """Прежнее поведение при общей очереди: строго по порядку поступления"""
+    queue = asyncio.Queue()
+    waits = {}
+
+    async def worker():
+        while True:
+            user_id, job_id, duration, enqueued_at = await queue.get()
+            waits[(user_id, job_id)] = time.monotonic() - enqueued_at
+            await asyncio.sleep(duration)
+            queue.task_done()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    for user_id, job_id, duration, delay in jobs:
+        if delay:
+            await asyncio.sleep(delay)
+        queue.put_nowait((user_id, job_id, duration, time.monotonic()))
+    await queue.join()
+    for task in tasks:
+        task.cancel()
+    return waits
+
+
+async def _fair(jobs, workers):
+    from transcription_queue import TranscriptionQueue
+
+    queue = TranscriptionQueue(workers=workers, max_size=10_000, per_user=10_000)
+    waits = {}
+    done = asyncio.Event()
+    remaining = len(jobs)
+
+    def make_job(user_id, job_id, duration):
+        enqueued_at = time.monotonic()
+
+        async def work():
+            waits[(user_id, job_id)] = time.monotonic() - enqueued_at
+            await asyncio.sleep(duration)
+
+        async def on_result(_):
+            nonlocal remaining
+            remaining -= 1
+            if not remaining:
+                done.set()
+
+        return work, on_result
+
+    for user_id, job_id, duration, delay in jobs:
+        if delay:
+            await asyncio.sleep(delay)
+        queue.submit(user_id, *make_job(user_id, job_id, duration))
+    await done.wait()
+    stats = queue.stats()
+    await queue.stop()
+    return waits, stats
+
+
+def make_jobs(burst, users, seed=7):
+    rng = random.Random(seed)
+    jobs = [(0, i, rng.uniform(0.05, 0.15), 0) for i in range(burst)]
+    jobs += [(u, 0, rng.uniform(0.05, 0.15), 0.005) for u in range(1, users + 1)]
+    return jobs
+
+
+def _summary(waits):
+    heavy = [w for (user_id, _), w in waits.items() if user_id == 0]
+    others = [w for (user_id, _), w in waits.items() if user_id != 0]
+    return {'noisy_user': _common.latency_summary(heavy), 'other_users': _common.latency_summary(others)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--burst', type=int, default=60, help='голосовых от шумного пользователя')
+    parser.add_argument('--users', type=int, default=30, help='остальных пользователей')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.burst, args.users)
+    results = {'fifo': _summary(asyncio.run(_fifo(jobs, args.workers)))}
+    fair_waits, stats = asyncio.run(_fair(jobs, args.workers))
+    results['fair'] = _summary(fair_waits)
+    results['fair']['queue_stats'] = stats
+
+    print(f"{'queue':<6} {'who':<12} {'wait p50 ms':>12} {'wait p99 ms':>12}")
+    for name in ('fifo', 'fair'):
+        for who in ('noisy_user', 'other_users'):
+            r = results[name][who]
+            print(f"{name:<6} {who:<12} {r['p50_ms']:>12} {r['p99_ms']:>12}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Состояние пользователей в памяти: обычный dict против ttl_cache.TTLCache.
+
+Поток пользователей, каждый оставляет запись и уходит (как с текстом
+голосового или открытым календарём). Меряется память после прохода
+(tracemalloc) и цена операции. Перед замерами проверяется, что размер не
+превышает лимит, а записи истекают по TTL (при ошибке — код выхода 1).
+
+    python benchmarks/ttl_cache.py --users 200000 --max-size 10000
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import _common  # noqa: F401  (путь к модулям проекта)
+
+from ttl_cache import TTLCache
+
+
+def check_limits(max_size):
+    failures = []
+    cache = TTLCache('check_size', ttl_seconds=3600, max_size=max_size)
+    for user_id in range(max_size * 3):
+        cache[user_id] = 'текст'
+    if len(cache) != max_size or cache.evictions != max_size * 2:
+        failures.append(f"размер {len(cache)}, вытеснено {cache.evictions}")
+    if 0 in cache or cache.get(max_size * 3 - 1) != 'текст':
+        failures.append("вытеснена не самая старая запись")
+
+    short = TTLCache('check_ttl', ttl_seconds=0.05, max_size=max_size, sweep_interval=0.05)
+    for user_id in range(100):
+        short[user_id] = {'current_month': 3, 'current_year': 2025}
+    time.sleep(0.1)
+    if short.get(1) is not None:
+        failures.append("TTL: запись не истекла")
+    short['new'] = 1
+    if len(short) != 1 or short.expirations != 100:
+        failures.append(f"проход не вычистил просроченные: {short.stats()}")
+    return failures
+
+
+def run(store, users):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for user_id in range(users):
+        store[user_id] = f'распознанный текст голосового {user_id}'
+        store.get(user_id)
+    elapsed = time.perf_counter() - t0
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'entries': len(store),
+        'memory_kb': round(memory / 1024),
+        'ns_per_op': round(elapsed / (users * 2) * 1e9),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--max-size', type=int, default=10_000)
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    failures = check_limits(args.max_size)
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    results = {
+        'dict': run({}, args.users),
+        'ttl_cache': run(TTLCache('bench', ttl_seconds=1800, max_size=args.max_size), args.users),
+    }
+
+    print(f"{'store':<10} {'entries':>9} {'memory KB':>10} {'ns/op':>7}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['entries']:>9} {r['memory_kb']:>10} {r['ns_per_op']:>7}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'failures': failures, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
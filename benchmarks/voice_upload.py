@@ -0,0 +1,200 @@
+"""
+Голосовое → Whisper: прежний путь (BytesIO + временный файл) против потоковой загрузки
+и повторов из кэша распознавания.
+
+Поднимает в том же процессе фейковый сервер файлов Telegram и фейковый
+эндпоинт Whisper, затем гоняет все пути одинаковой нагрузкой и сравнивает
+задержку, пиковую память (tracemalloc) и число открытых дескрипторов.
+
+    python benchmarks/voice_upload.py --size-kb 300 --messages 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import _common
+
+BOT_TOKEN = '123456:benchmark'
+FILE_PATH = 'voice/file_0.oga'
+
+
+def _open_fds() -> int:
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+async def start_fake_servers(size_bytes, chunk_delay):
+    """Фейковые Telegram (GET /file/bot<token>/<path>) и Whisper (POST /v1/audio/transcriptions)"""
+    from aiohttp import web
+
+    payload = os.urandom(size_bytes)
+
+    async def telegram_file(request):
+        response = web.StreamResponse()
+        response.content_length = len(payload)
+        await response.prepare(request)
+        for start in range(0, len(payload), 64 * 1024):
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+            await response.write(payload[start:start + 64 * 1024])
+        await response.write_eof()
+        return response
+
+    async def transcriptions(request):
+        received = 0
+        reader = await request.multipart()
+        async for part in reader:
+            while chunk := await part.read_chunk():
+                received += len(chunk)
+        return web.json_response({'text': f'получено {received} байт'})
+
+    async def get_file(request):
+        return web.json_response({'ok': True, 'result': {
+            'file_id': 'voice-0', 'file_unique_id': 'voice-unique-0', 'file_path': FILE_PATH,
+        }})
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post('/bot{token}/getFile', get_file)
+    app.router.add_get('/file/bot{token}/{path:.*}', telegram_file)
+    app.router.add_post('/v1/audio/transcriptions', transcriptions)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{port}'
+
+
+async def legacy_recognize(bot, recognizer):
+    """Прежний путь: весь файл в BytesIO, .read(), временный файл, незакрытый open()"""
+    import aiohttp
+    from http_client import get_session
+
+    voice_bytes = (await bot.download_file(FILE_PATH)).read()
+    with tempfile.NamedTemporaryFile(suffix='.ogg', delete=False) as temp_file:
+        temp_file.write(voice_bytes)
+        temp_file_path = temp_file.name
+    try:
+        session = await get_session()
+        data = aiohttp.FormData()
+        data.add_field('file', open(temp_file_path, 'rb'), filename='audio.ogg', content_type='audio/ogg')
+        data.add_field('model', 'whisper-1')
+        data.add_field('language', 'ru')
+        async with session.post(recognizer.api_url, data=data,
+                                headers={'Authorization': f'Bearer {recognizer.api_key}'}) as response:
+            return (await response.json()).get('text', '')
+    finally:
+        os.unlink(temp_file_path)
+
+
+async def streaming_recognize(bot, recognizer):
+    from voice_recognition import telegram_file_chunks
+
+    return await recognizer.recognize_with_whisper_api(telegram_file_chunks(bot, FILE_PATH))
+
+
+async def cached_recognize(bot, recognizer):
+    """Пересланное голосовое: тот же file_unique_id, после первого раза — из кэша"""
+    voice = SimpleNamespace(file_id='voice-0', file_unique_id='voice-unique-0')
+    return await recognizer.recognize_telegram_voice(bot, voice)
+
+
+async def _run(func, bot, recognizer, total, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            t0 = time.perf_counter()
+            result = await func(bot, recognizer)
+            latencies.append(time.perf_counter() - t0)
+            if not result or result.startswith('❌'):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    summary = _common.latency_summary(latencies)
+    summary['msg_per_s'] = round(total / elapsed, 1)
+    summary['errors'] = errors
+    return summary
+
+
+async def run_benchmark(args):
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from http_client import close_session
+    from voice_recognition import VoiceRecognizer
+
+    runner, base_url = await start_fake_servers(args.size_kb * 1024, args.chunk_delay_ms / 1000)
+    bot = Bot(BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    recognizer = VoiceRecognizer(api_key='sk-benchmark', api_url=f'{base_url}/v1/audio/transcriptions')
+
+    results = {}
+    try:
+        scenarios = (
+            ('legacy', legacy_recognize),
+            ('streaming', streaming_recognize),
+            ('cached', cached_recognize),
+        )
+        for name, func in scenarios:
+            await _run(func, bot, recognizer, min(20, args.messages), args.concurrency)  # прогрев
+            fds_before = _open_fds()
+            results[name] = await _run(func, bot, recognizer, args.messages, args.concurrency)
+
+            tracemalloc.start()
+            await _run(func, bot, recognizer, args.concurrency, args.concurrency)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[name]['peak_kb'] = round(peak / 1024, 1)
+            results[name]['fds_leaked'] = _open_fds() - fds_before
+    finally:
+        await bot.session.close()
+        await close_session()
+        await runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-kb', type=int, default=300, help='размер голосового')
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--chunk-delay-ms', type=float, default=2.0,
+                        help='задержка фейкового Telegram на каждые 64 КБ (имитация сети)')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark')
+    db_path = _common.use_temp_db()
+    try:
+        import database
+
+        database.init_db()
+        results = asyncio.run(run_benchmark(args))
+    finally:
+        os.unlink(db_path)
+
+    print(f"{'path':<10} {'msg/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'peak KB':>9} {'fd leak':>8} {'errors':>7}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['msg_per_s']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['peak_kb']:>9} {r['fds_leaked']:>8} {r['errors']:>7}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Доставка апдейтов: long polling против webhook (webhook.py) на фейковом Bot API.
+
+Бот (bot.dp со всеми роутерами) направляется на benchmarks/fake_telegram.py.
+Виртуальные пользователи шлют /help, меряется время от появления апдейта
+до ответа бота. В webhook-режиме дополнительно проверяется, что запрос с
+неверным секретом отклоняется, а /api/health отвечает из того же приложения
+(при ошибке — код выхода 1).
+
+    python benchmarks/webhook.py --users 50 --messages 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import _common
+from fake_telegram import FakeTelegram, free_port
+
+_common.use_temp_db('focusup-webhook-')
+os.environ.setdefault('FSM_STORAGE', 'memory')
+
+
+async def _drive(fake, deliver, users, messages):
+    latencies = []
+
+    async def user(user_id):
+        for _ in range(messages):
+            reply = fake.wait_reply(user_id)
+            t0 = time.perf_counter()
+            await deliver(fake.message_update(user_id, '/help'))
+            await asyncio.wait_for(reply, 10)
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(user(user_id) for user_id in range(1000, 1000 + users)))
+    return _common.latency_summary(latencies)
+
+
+async def run_polling(fake, bot_module, users, messages):
+    dp, bot = bot_module.dp, bot_module.bot
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=10))
+
+    async def deliver(update):
+        fake.push_update(update)
+
+    try:
+        return await _drive(fake, deliver, users, messages)
+    finally:
+        await dp.stop_polling()
+        await polling
+
+
+async def run_webhook(fake, bot_module, users, messages, failures):
+    from aiohttp import ClientSession, web
+    from config import WEBHOOK_PATH
+    from webhook import create_webhook_app, webhook_secret
+
+    port = free_port()
+    runner = web.AppRunner(create_webhook_app(bot_module.dp, bot_module.bot, with_api=True), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    await bot_module.bot.set_webhook(f'http://127.0.0.1:{port}{WEBHOOK_PATH}', secret_token=webhook_secret())
+
+    try:
+        status = await fake.post_update(fake.message_update(1, '/help'), secret='wrong-secret')
+        if status != 401:
+            failures.append(f"запрос с неверным секретом: HTTP {status}, ожидалось 401")
+        async with ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{port}/api/health') as response:
+                if response.status != 200:
+                    failures.append(f"/api/health в webhook-приложении: HTTP {response.status}")
+
+        async def deliver(update):
+            status = await fake.post_update(update)
+            if status != 200:
+                failures.append(f"webhook вернул HTTP {status}")
+
+        return await _drive(fake, deliver, users, messages)
+    finally:
+        await runner.cleanup()
+
+
+async def run(args):
+    fake = FakeTelegram()
+    os.environ['TELEGRAM_API_URL'] = await fake.start()
+    import bot as bot_module
+
+    failures = []
+    try:
+        results = {
+            'polling': await run_polling(fake, bot_module, args.users, args.messages),
+            'webhook': await run_webhook(fake, bot_module, args.users, args.messages, failures),
+        }
+    finally:
+        await bot_module.bot.session.close()
+        await fake.stop()
+    return results, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=10, help='сообщений от каждого пользователя')
+    parser.add_argument('--json', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    results, failures = asyncio.run(run(args))
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    print(f"{'mode':<8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'failures': failures, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
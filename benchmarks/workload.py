@@ -0,0 +1,191 @@
+"""
+Генератор синтетической нагрузки для БД: пользователи, задачи, помидоры.
+
+Детерминирован (seed): один и тот же набор параметров даёт ту же БД (даты —
+относительно текущего дня), поэтому результаты бенчмарков сравнимы между
+коммитами. Распределения приближены к живым данным бота:
+
+- задач на пользователя — логнормально (у большинства десяток, у немногих
+  сотни), плюс несколько «тяжёлых» пользователей с heavy_tasks задачами;
+- категории — подписи бота с весами (работа и личное чаще прочих);
+- дедлайн есть у ~75% задач, в формате бота, от месяца назад до двух
+  месяцев вперёд; у части — только дата; старые чаще выполнены;
+- теги — приоритет (high/medium/low) и изредка «голосовая»;
+- помидоры — 25/5/15 минут за последние 60 дней, активным пользователям больше.
+
+Сгенерировать отдельный файл:
+
+    python benchmarks/workload.py --users 100000 --heavy-tasks 10000 --out /tmp/focusup-100k.db
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import _common
+
+TELEGRAM_ID_BASE = 10_000_000
+
+CATEGORIES = [('💼 Работа', 35), ('🎓 Учеба', 20), ('🏋️ Здоровье', 10), ('🏠 Личное', 25), ('🔧 Другое', 10)]
+PRIORITY_TAGS = [('high', 20), ('medium', 50), ('low', 20), (None, 10)]
+VERBS = ['Купить', 'Подготовить', 'Сделать', 'Позвонить', 'Написать', 'Проверить', 'Сдать', 'Записаться на',
+         'Оплатить', 'Прочитать', 'Отправить', 'Обсудить']
+OBJECTS = ['отчёт', 'молоко', 'презентацию', 'маме', 'домашку', 'курсовую', 'тренировку', 'врача', 'счёт',
+           'книгу', 'письмо', 'проект', 'встречу с командой', 'документы', 'билеты']
+POMODORO_DURATIONS = [(25 * 60, 70), (5 * 60, 20), (15 * 60, 10)]
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _deadline(rng, now):
+    """Строка дедлайна и признак «уже прошёл»"""
+    if rng.random() < 0.25:
+        return None, False
+    moment = now + timedelta(days=rng.uniform(-30, 60))
+    moment = moment.replace(minute=rng.choice((0, 15, 30, 45)), second=0, microsecond=0)
+    if rng.random() < 0.15:
+        return moment.strftime('%d.%m.%y'), moment < now
+    return moment.strftime('%d.%m.%y %H:%M'), moment < now
+
+
+def _task_rows(rng, user_id, count, now):
+    from task_fields import normalize_category, priority_from_tags
+
+    rows = []
+    for _ in range(count):
+        title = f'{rng.choice(VERBS)} {rng.choice(OBJECTS)}'
+        if rng.random() < 0.3:
+            title += f' {rng.randint(1, 99)}'
+        category = _weighted(rng, CATEGORIES)
+        tags = _weighted(rng, PRIORITY_TAGS)
+        if rng.random() < 0.1:
+            tags = f'голосовая,{tags}' if tags else 'голосовая'
+        deadline, passed = _deadline(rng, now)
+        completed = rng.random() < (0.7 if passed else 0.2)
+        created = now - timedelta(days=rng.uniform(0, 90))
+        updated = created + timedelta(days=rng.uniform(0, (now - created).days or 1))
+        rows.append((
+            user_id, title, category, tags, deadline, completed,
+            created.strftime('%Y-%m-%d %H:%M:%S'), min(updated, now).strftime('%Y-%m-%d %H:%M:%S'),
+            priority_from_tags(tags), normalize_category(category),
+        ))
+    return rows
+
+
+def insert_tasks(conn, rng, user_id, count, now=None):
+    """count случайных задач пользователю (без commit)"""
+    conn.executemany(
+        'INSERT INTO tasks (user_id, title, category, tags, deadline, completed, created_at, updated_at,'
+        ' priority, category_code) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        _task_rows(rng, user_id, count, now or datetime.now()),
+    )
+
+
+def generate(users=10_000, median_tasks=10, max_tasks=500, heavy_users=3, heavy_tasks=10_000, seed=42):
+    """
+    Заполняет БД database.DB_PATH (схема — database.init_db) и возвращает
+    описание набора: объёмы и id «пробных» пользователей для бенчмарков.
+    """
+    import database
+
+    database.init_db()
+    rng = random.Random(seed)
+    now = datetime.now()
+    t0 = time.perf_counter()
+
+    conn = database.get_connection()
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany(
+        'INSERT OR IGNORE INTO users (telegram_id, username, first_name) VALUES (?, ?, ?)',
+        ((TELEGRAM_ID_BASE + i, f'user{i}', f'User{i}') for i in range(users)),
+    )
+    user_ids = [row[0] for row in conn.execute(
+        'SELECT id FROM users WHERE telegram_id >= ? ORDER BY telegram_id LIMIT ?', (TELEGRAM_ID_BASE, users)
+    )]
+
+    mu = math.log(median_tasks)
+    tasks_total = 0
+    sessions_total = 0
+    for index, user_id in enumerate(user_ids):
+        if index < heavy_users:
+            count = heavy_tasks
+        else:
+            count = min(max_tasks, int(rng.lognormvariate(mu, 1.0)))
+        insert_tasks(conn, rng, user_id, count, now)
+        tasks_total += count
+
+        sessions = int(rng.expovariate(1 / max(1, count / 2)))
+        conn.executemany(
+            'INSERT INTO pomodoro_sessions (user_id, duration, completed_at) VALUES (?, ?, ?)',
+            (
+                (user_id, _weighted(rng, POMODORO_DURATIONS),
+                 (now - timedelta(days=rng.uniform(0, 60))).strftime('%Y-%m-%d %H:%M:%S'))
+                for _ in range(sessions)
+            ),
+        )
+        sessions_total += sessions
+    conn.commit()
+
+    # «Типичный» пользователь — с медианным числом задач
+    light_user = conn.execute(
+        'SELECT user_id FROM tasks WHERE user_id > ? GROUP BY user_id HAVING COUNT(*) BETWEEN ? AND ? LIMIT 1',
+        (user_ids[heavy_users - 1] if heavy_users else 0, median_tasks - 2, median_tasks + 2),
+    ).fetchone()
+    conn.close()
+
+    def telegram_id(user_id):
+        return TELEGRAM_ID_BASE + user_ids.index(user_id)
+
+    light_id = light_user[0] if light_user else user_ids[-1]
+    heavy_id = user_ids[0] if heavy_users else light_id
+    return {
+        'seed': seed,
+        'users': len(user_ids),
+        'tasks': tasks_total,
+        'pomodoro_sessions': sessions_total,
+        'generated_in_s': round(time.perf_counter() - t0, 2),
+        'probes': {
+            'light': {'user_id': light_id, 'telegram_id': telegram_id(light_id), 'tasks': _count(light_id)},
+            'heavy': {'user_id': heavy_id, 'telegram_id': telegram_id(heavy_id), 'tasks': _count(heavy_id)},
+        },
+    }
+
+
+def _count(user_id):
+    import database
+
+    conn = database.get_connection()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM tasks WHERE user_id = ?', (user_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--median-tasks', type=int, default=10)
+    parser.add_argument('--heavy-users', type=int, default=3)
+    parser.add_argument('--heavy-tasks', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='файл БД (по умолчанию — временный)')
+    args = parser.parse_args()
+
+    if args.out:
+        os.environ['FOCUSUP_DB'] = args.out
+    else:
+        args.out = _common.use_temp_db('focusup-workload-')
+
+    info = generate(args.users, args.median_tasks, heavy_users=args.heavy_users,
+                    heavy_tasks=args.heavy_tasks, seed=args.seed)
+    print(json.dumps({'db': args.out, **info}, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
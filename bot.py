@@ -1,20 +1,50 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN, RUN_API_IN_BOT, BOT_MODE, TELEGRAM_API_URL, TELEGRAM_API_LOCAL,
+    FSM_STORAGE, PENDING_VOICE_TTL_MINUTES, USER_STATE_MAX_ENTRIES, METRICS_HOST, METRICS_PORT,
+    METRICS_TOKEN, REMINDERS_ENABLED,
+)
 from database import init_db
+from fsm_storage import SQLiteStorage
 from handlers import tasks_router, pomodoro_router, stats_router, help_router, kalendar_router, ai_router
-from voice_recognition import VoiceRecognizer
-
-logging.basicConfig(level=logging.INFO)
+from voice_recognition import voice_recognizer
+from transcription_queue import transcription_queue
+from nl_parser import parse_phrase, CATEGORY_LABELS
+from http_client import close_session
+from ttl_cache import TTLCache
+from telegram_limiter import telegram_limiter
+from log_setup import setup_logging
+from metrics import handler_metrics, register_bot_collectors, start_metrics_server
+from reminders import reminder_scheduler
+import loop_watchdog
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
-bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
+if TELEGRAM_API_URL:
+    bot = Bot(token=BOT_TOKEN, session=AiohttpSession(
+        api=TelegramAPIServer.from_base(TELEGRAM_API_URL, is_local=TELEGRAM_API_LOCAL)
+    ))
+else:
+    bot = Bot(token=BOT_TOKEN)
+# Все отправки и правки сообщений идут через общий ограничитель скорости
+bot.session.middleware(telegram_limiter)
+if FSM_STORAGE == 'memory':
+    storage = MemoryStorage()
+else:
+    storage = SQLiteStorage()
 dp = Dispatcher(storage=storage)
+# Время хендлеров для /metrics; внутренние middleware диспетчера действуют и во всех роутерах
+dp.message.middleware(handler_metrics)
+dp.callback_query.middleware(handler_metrics)
+register_bot_collectors(storage)
 
 dp.include_router(tasks_router)
 dp.include_router(pomodoro_router)
@@ -23,7 +53,8 @@ dp.include_router(ai_router)
 dp.include_router(stats_router)
 dp.include_router(help_router)
 
-pending_voice_texts = {}
+# Распознанный текст ждёт выбора «создать задачу / в GPT / отмена»
+pending_voice_texts = TTLCache('pending_voice_texts', PENDING_VOICE_TTL_MINUTES * 60, USER_STATE_MAX_ENTRIES)
 @dp.message(Command("start"))
 async def cmd_start(message):
     from database import add_user
@@ -35,7 +66,7 @@ async def cmd_start(message):
         message.from_user.last_name
     )
     
-    print(f"🔍 DEBUG: Пользователь {message.from_user.id} -> внутренний ID: {user_internal_id}")
+    logger.debug("🔍 Пользователь %s -> внутренний ID: %s", message.from_user.id, user_internal_id)
     from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
     
     keyboard = ReplyKeyboardMarkup(
@@ -67,27 +98,34 @@ async def handle_voice_message(message: Message):
         
         processing_msg = await message.answer("🎤 Обрабатываю голосовое сообщение...")
 
-        voice_file = await bot.get_file(message.voice.file_id)
-        voice_bytes = await bot.download_file(voice_file.file_path)
+        # Распознавание идёт в фоновой очереди, хендлер сразу освобождается.
+        # Повторное/пересланное голосовое берётся из кэша; новое скачивается
+        # из Telegram потоком прямо в загрузку Whisper
+        async def on_result(text):
+            if text:
+                pending_voice_texts[message.from_user.id] = text
 
-        voice_recognizer = VoiceRecognizer()
-        text = await voice_recognizer.recognize_voice(voice_bytes.read())
-        
-        if text:
-            await processing_msg.delete()
+                kb = InlineKeyboardMarkup(inline_keyboard=[
+                    [InlineKeyboardButton(text="📝 Создать задачу", callback_data="voice_create")],
+                    [InlineKeyboardButton(text="🤖 Отправить в GPT", callback_data="voice_gpt")],
+                    [InlineKeyboardButton(text="❌ Отмена", callback_data="voice_cancel")]
+                ])
 
-            pending_voice_texts[message.from_user.id] = text
+                await processing_msg.edit_text(f"\n{text}\n\nЧто сделать с этим текстом?", reply_markup=kb)
+            else:
+                await processing_msg.edit_text("❌ Не удалось распознать голосовое сообщение. Попробуйте еще раз.")
 
-            kb = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="📝 Создать задачу", callback_data="voice_create")],
-                [InlineKeyboardButton(text="🤖 Отправить в GPT", callback_data="voice_gpt")],
-                [InlineKeyboardButton(text="❌ Отмена", callback_data="voice_cancel")]
-            ])
+        async def on_error(e):
+            await processing_msg.edit_text("❌ Произошла ошибка при обработке голосового сообщения.")
 
-            await message.answer(f"\n{text}\n\nЧто сделать с этим текстом?", reply_markup=kb)
-            
-        else:
-            await processing_msg.edit_text("❌ Не удалось распознать голосовое сообщение. Попробуйте еще раз.")
+        accepted = transcription_queue.submit(
+            message.from_user.id,
+            lambda: voice_recognizer.recognize_telegram_voice(bot, message.voice),
+            on_result,
+            on_error,
+        )
+        if not accepted:
+            await processing_msg.edit_text("⏳ Слишком много голосовых в обработке. Отправьте это чуть позже.")
             
     except Exception as e:
         logger.error(f"Ошибка при обработке голосового сообщения: {e}")
@@ -200,7 +238,6 @@ async def voice_cancel_callback(callback: CallbackQuery):
 
 async def try_create_task_from_text(message: Message, text: str) -> bool:
     import re
-    from datetime import datetime, timedelta
     from database import add_user, get_user_id, add_task, get_user_tasks
     
     try:
@@ -217,121 +254,24 @@ async def try_create_task_from_text(message: Message, text: str) -> bool:
             
         clean_text = re.sub(r'^🎤\s*Распознанный текст:\s*', '', text, flags=re.IGNORECASE).strip()
         text_lower = clean_text.lower()
-        
-        time_patterns = [
-            r'(\d{1,2})\s*час[аов]*\s*(вечера|утра|дня|ночи)',  # "5 часов вечера"
-            r'в\s*(\d{1,2})\s*час[аов]*\s*(вечера|утра|дня|ночи)',  # "в 5 часов вечера"
-            r'в (\d{1,2})[:\.](\d{2})',  # "в 17:00"
-            r'в (\d{1,2})',              # "в 17"
-            r'(\d{1,2})[:\.](\d{2})',    # "17:00"
-        ]
-        
-        date_patterns = [
-            r'сегодня',
-            r'завтра',
-            r'послезавтра',
-            r'(\d{1,2})\.(\d{1,2})',   
-            r'(\d{1,2}) (января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря)',
-        ]
-        
-        target_date = datetime.now().date()
-        deadline_time = None
-        
-        if 'завтра' in text_lower:
-            target_date = (datetime.now() + timedelta(days=1)).date()
-        elif 'послезавтра' in text_lower:
-            target_date = (datetime.now() + timedelta(days=2)).date()
-            
-        # Ищем время с улучшенной логикой
-        for pattern in time_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                groups = match.groups()
-                
-                # Обработка времени с "вечера/утра/дня/ночи"
-                if len(groups) == 2 and groups[1] in ['вечера', 'утра', 'дня', 'ночи']:
-                    hour = int(groups[0])
-                    time_period = groups[1]
-                    
-                    # Конвертируем в 24-часовой формат
-                    if time_period == 'утра':
-                        if hour == 12:
-                            hour = 0
-                        elif hour > 12:
-                            continue  # Некорректное время
-                    elif time_period == 'дня':
-                        if hour < 12:
-                            hour += 12
-                        elif hour == 12:
-                            pass  # 12 дня = 12:00
-                        else:
-                            continue  # Некорректное время
-                    elif time_period == 'вечера':
-                        if hour < 12:
-                            hour += 12
-                        elif hour == 12:
-                            pass  # 12 вечера = 12:00 (но это странно, обычно говорят "12 ночи")
-                        else:
-                            continue  # Некорректное время
-                    elif time_period == 'ночи':
-                        if hour == 12:
-                            hour = 0  # 12 ночи = 00:00
-                        elif hour > 12:
-                            continue  # Некорректное время
-                    
-                    if 0 <= hour <= 23:
-                        deadline_time = f"{hour:02d}:00"
-                        break
-                        
-                # Обработка обычного формата времени
-                elif len(groups) >= 2 and groups[1].isdigit():
-                    hour, minute = int(groups[0]), int(groups[1])
-                    if 0 <= hour <= 23 and 0 <= minute <= 59:
-                        deadline_time = f"{hour:02d}:{minute:02d}"
-                        break
-                elif len(groups) == 1:
-                    hour = int(groups[0])
-                    if 0 <= hour <= 23:
-                        deadline_time = f"{hour:02d}:00"
-                        break
-        
 
-        deadline_str = None
-        if deadline_time:
-            deadline_str = f"{target_date.strftime('%d.%m.%y')} {deadline_time}"
-        elif 'сегодня' in text_lower or 'завтра' in text_lower or 'послезавтра' in text_lower:
-            deadline_str = target_date.strftime('%d.%m.%y')
-            
+        # дата/время/категория и «очищенное» название — за один проход общего парсера
+        parsed = parse_phrase(clean_text)
+        deadline_str = parsed.deadline_str()
         task_title = clean_text
 
-        phrases_to_remove = [
-            r'\bсегодня\s*в\s*\d{1,2}\s*час[аов]*\s*(вечера|утра|дня|ночи)\b',  # "сегодня в 5 часов вечера"
-            r'\bзавтра\s*в\s*\d{1,2}\s*час[аов]*\s*(вечера|утра|дня|ночи)\b',   # "завтра в 5 часов вечера"
-            r'\bв\s*\d{1,2}\s*час[аов]*\s*(вечера|утра|дня|ночи)\b',            # "в 5 часов вечера"
-            r'\b\d{1,2}\s*час[аов]*\s*(вечера|утра|дня|ночи)\b',                # "5 часов вечера"
-            r'\bсегодня\s*в\s*\d{1,2}[:\.]?\d{0,2}\b',  
-            r'\bзавтра\s*в\s*\d{1,2}[:\.]?\d{0,2}\b', 
-            r'\bв\s*\d{1,2}[:\.]?\d{0,2}\b',          
-            r'\b\d{1,2}[:\.]?\d{0,2}\s*часов?\b',     
-            r'\bсегодня\b', r'\bзавтра\b', r'\bпослезавтра\b'
-        ]
-        
         try:
             from ai_helper import ai_assistant
-            logger.info(f"🔍 DEBUG: Генерируем название через GPT для текста: '{clean_text}'")
+            logger.debug("🔍 Генерируем название через GPT для текста: '%s'", clean_text)
             gpt_title = await ai_assistant.generate_task_title(clean_text)
             
             if gpt_title and len(gpt_title.strip()) >= 3:
                 task_title = gpt_title.strip()
-                logger.info(f"✅ GPT создал название: '{task_title}'")
+                logger.debug("✅ GPT создал название: '%s'", task_title)
             else:
-                logger.info("⚠️ GPT не смог создать название, используем fallback логику")
-                
-                for phrase in phrases_to_remove:
-                    task_title = re.sub(phrase, '', task_title, flags=re.IGNORECASE).strip()
+                logger.debug("⚠️ GPT не смог создать название, используем fallback логику")
                 
-                task_title = re.sub(r'\s+', ' ', task_title).strip()
-                task_title = re.sub(r'^[,\.\-\s]+|[,\.\-\s]+$', '', task_title).strip()
+                task_title = parsed.title
                 
                 if len(task_title) < 3:
                     if 'встреча' in text_lower:
@@ -350,11 +290,7 @@ async def try_create_task_from_text(message: Message, text: str) -> bool:
                     
         except Exception as e:
             logger.error(f"❌ Ошибка при генерации названия через GPT: {e}")
-            for phrase in phrases_to_remove:
-                task_title = re.sub(phrase, '', task_title, flags=re.IGNORECASE).strip()
-            
-            task_title = re.sub(r'\s+', ' ', task_title).strip()
-            task_title = re.sub(r'^[,\.\-\s]+|[,\.\-\s]+$', '', task_title).strip()
+            task_title = parsed.title
             
             if len(task_title) < 3:
                 task_title = "Новая задача"
@@ -362,19 +298,9 @@ async def try_create_task_from_text(message: Message, text: str) -> bool:
             if len(task_title) > 30:
                 task_title = task_title[:27] + "..."
             
-        category = "Общие"
-        if any(word in text_lower for word in ["встреча", "собрание", "звонок", "разговор"]):
-            category = "Встречи"
-        elif any(word in text_lower for word in ["работа", "проект", "задача", "дело"]):
-            category = "Работа"
-        elif any(word in text_lower for word in ["учеба", "экзамен", "лекция", "урок"]):
-            category = "Учеба"
-        elif any(word in text_lower for word in ["покупки", "магазин", "купить"]):
-            category = "Покупки"
-        elif any(word in text_lower for word in ["спорт", "тренировка", "зал"]):
-            category = "Спорт"
+        category = CATEGORY_LABELS[parsed.category]
             
-        logger.info(f"🔍 DEBUG: Пытаемся создать задачу - title='{task_title}', category='{category}', deadline='{deadline_str}'")
+        logger.debug("🔍 Создаём задачу: title='%s', category='%s', deadline='%s'", task_title, category, deadline_str)
         
         task_id = add_task(
             user_id=user_internal_id,
@@ -384,7 +310,7 @@ async def try_create_task_from_text(message: Message, text: str) -> bool:
             tags="голосовая"
         )
         
-        logger.info(f"🔍 DEBUG: Результат создания задачи - task_id={task_id}")
+        logger.debug("🔍 Результат создания задачи: task_id=%s", task_id)
         
         if task_id:
             success_msg = f"✅ **Задача создана!**\n\n"
@@ -399,8 +325,9 @@ async def try_create_task_from_text(message: Message, text: str) -> bool:
             
             await message.answer(success_msg, parse_mode="Markdown")
             
-            tasks_after = get_user_tasks(user_internal_id)
-            logger.info(f"🔍 DEBUG: Задач у пользователя после создания: {len(tasks_after)}")
+            # лишний запрос всех задач — только когда DEBUG действительно пишется
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 Задач у пользователя после создания: %s", len(get_user_tasks(user_internal_id)))
             
             return True
         else:
@@ -416,12 +343,33 @@ async def main():
     init_db()
     logger.info("🚀 FocusUp Bot запускается...")
     
+    api_runner = None
+    loop_watchdog.start()
+    if REMINDERS_ENABLED:
+        reminder_scheduler.start(bot)
     try:
-        await dp.start_polling(bot)
+        if BOT_MODE == 'webhook':
+            # API (при RUN_API_IN_BOT=1) обслуживается тем же aiohttp-приложением
+            from webhook import run_webhook
+            await run_webhook(dp, bot)
+        else:
+            if RUN_API_IN_BOT:
+                from api_web import start_api_server
+                api_runner = await start_api_server()
+            elif METRICS_PORT and METRICS_TOKEN:
+                api_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+            await dp.start_polling(bot)
         logger.info("✅ Бот успешно запущен!")
     except Exception as e:
         logger.error(f"❌ Ошибка при запуске бота: {e}")
     finally:
+        if api_runner is not None:
+            await api_runner.cleanup()
+        await reminder_scheduler.stop()
+        await loop_watchdog.watchdog.stop()
+        await transcription_queue.stop()
+        await close_session()
         await bot.session.close()
 
 if __name__ == "__main__":
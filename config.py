@@ -6,6 +6,86 @@ load_dotenv()
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o')
+# Адрес OpenAI-совместимого API (прокси, локальная заглушка benchmarks/fake_openai.py)
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1').rstrip('/')
+WHISPER_API_URL = os.getenv('WHISPER_API_URL', f'{OPENAI_BASE_URL}/audio/transcriptions')
+OPENAI_TIMEOUT_SECONDS = float(os.getenv('OPENAI_TIMEOUT_SECONDS', '30'))
+
+# Кэш распознанных голосовых (повторно пересланные не отправляем в Whisper)
+TRANSCRIPTION_CACHE_TTL_DAYS = int(os.getenv('TRANSCRIPTION_CACHE_TTL_DAYS', '30'))
+TRANSCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv('TRANSCRIPTION_CACHE_MAX_ENTRIES', '5000'))
+
+# Очередь распознавания: воркеры, общий лимит и лимит заданий на пользователя
+VOICE_WORKERS = int(os.getenv('VOICE_WORKERS', '4'))
+VOICE_QUEUE_MAX = int(os.getenv('VOICE_QUEUE_MAX', '200'))
+VOICE_QUEUE_PER_USER = int(os.getenv('VOICE_QUEUE_PER_USER', '5'))
+# Предел тела запроса HTTP API (голосовые в /api/voice), одинаковый для Flask и aiohttp;
+# 25 МБ — столько же принимает Whisper
+VOICE_UPLOAD_MAX_BYTES = int(os.getenv('VOICE_UPLOAD_MAX_MB', '25')) * 1024 * 1024
+
+# Хранилище состояний диалогов (FSM): sqlite или memory
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'sqlite')
+FSM_DB_PATH = os.getenv('FSM_DB_PATH', os.getenv('FOCUSUP_DB', 'focusup.db'))
+FSM_STATE_TTL_HOURS = float(os.getenv('FSM_STATE_TTL_HOURS', '24'))
+FSM_CACHE_SIZE = int(os.getenv('FSM_CACHE_SIZE', '10000'))
+
+# Состояние пользователей в памяти процесса (распознанный текст голосового, месяц календаря)
+PENDING_VOICE_TTL_MINUTES = int(os.getenv('PENDING_VOICE_TTL_MINUTES', '30'))
+CALENDAR_STATE_TTL_HOURS = int(os.getenv('CALENDAR_STATE_TTL_HOURS', '12'))
+USER_STATE_MAX_ENTRIES = int(os.getenv('USER_STATE_MAX_ENTRIES', '10000'))
+
+# HTTP API мини-аппы (aiohttp-версия, api_web.py)
+API_HOST = os.getenv('API_HOST', '0.0.0.0')
+API_PORT = int(os.getenv('API_PORT', '8888'))
+RUN_API_IN_BOT = os.getenv('RUN_API_IN_BOT', '0') == '1'
+
+# Режим получения апдейтов: polling или webhook (webhook.py)
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL')   # публичный https-адрес, под которым Telegram видит бота
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')        # по умолчанию выводится из BOT_TOKEN
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+
+# Число процессов-шардов бота (python shards.py, по умолчанию — по числу ядер);
+# апдейты делятся между ними по chat id
+BOT_SHARDS = int(os.getenv('BOT_SHARDS', '0')) or os.cpu_count() or 1
+
+# Свой сервер Bot API (локальный telegram-bot-api или фейковый для нагрузочных тестов)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
+TELEGRAM_API_LOCAL = os.getenv('TELEGRAM_API_LOCAL', '0') == '1'
+
+# Лимиты исходящих запросов к Telegram (telegram_limiter.py): сообщений в секунду
+TG_GLOBAL_RATE = float(os.getenv('TG_GLOBAL_RATE', '30'))
+TG_CHAT_RATE = float(os.getenv('TG_CHAT_RATE', '1'))
+TG_CHAT_BURST = int(os.getenv('TG_CHAT_BURST', '3'))
+TG_MAX_RETRIES = int(os.getenv('TG_MAX_RETRIES', '3'))
+
+# Напоминания о дедлайнах (reminders.py): за сколько минут до дедлайна, какое окно
+# держать в памяти, как часто перечитывать его из БД и сколько напоминаний в секунду слать
+REMINDERS_ENABLED = os.getenv('REMINDERS_ENABLED', '1') == '1'
+REMINDER_LEAD_MINUTES = int(os.getenv('REMINDER_LEAD_MINUTES', '30'))
+REMINDER_WINDOW_MINUTES = int(os.getenv('REMINDER_WINDOW_MINUTES', '10'))
+REMINDER_RESCAN_SECONDS = float(os.getenv('REMINDER_RESCAN_SECONDS', '30'))
+REMINDER_RATE = float(os.getenv('REMINDER_RATE', '10'))
+
+# Логи (log_setup.py): уровень и формат вывода — text или json (по объекту на строку)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+
+# Служебные метрики (/metrics, /api/metrics/...): отдаются только с заголовком
+# Authorization: Bearer <токен>; пока токен не задан, эндпоинты отвечают 404
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+# /metrics бота в режиме polling без встроенного API (в webhook и API он есть всегда);
+# 0 или пустой METRICS_TOKEN — не поднимать
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+# Токены сессии мини-аппы (по умолчанию ключ выводится из BOT_TOKEN)
+SESSION_SECRET = os.getenv('SESSION_SECRET')
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', '3600'))
+# Сколько живёт initData мини-аппы (auth_date): старше — /api/auth токен не выдаёт
+INIT_DATA_MAX_AGE_SECONDS = int(os.getenv('INIT_DATA_MAX_AGE_SECONDS', str(24 * 3600)))
 
 if not BOT_TOKEN:
     raise ValueError("❌ BOT_TOKEN не найден! Проверьте файл .env")
@@ -1,12 +1,60 @@
+import os
 import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 import logging
 
+from deadlines import DATE_ONLY_TIME, wall_clock_ts
+from query_profiler import profiler, ProfilingConnection
+from task_fields import normalize_category, normalize_deadline, normalize_priority, priority_from_tags
+
 logger = logging.getLogger(__name__)
 
+DB_PATH = os.getenv('FOCUSUP_DB', 'focusup.db')
+
+# Сколько секунд соединение ждёт снятия блокировки записи (несколько процессов бота
+# пишут в один файл в режиме WAL)
+DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', '10'))
+
+# Сколько дней храним «надгробия» удалённых задач для дельта-синхронизации;
+# клиенту с более старым курсором отдаём полный список
+TOMBSTONE_RETENTION_DAYS = 30
+
+# Версия схемы (PRAGMA user_version); миграции ниже применяются по одной
+SCHEMA_VERSION = 2
+
+# Сколько дней помним отправленные напоминания (после дедлайна они не нужны)
+REMINDER_RETENTION_DAYS = 30
+
+# tasks.deadline_ts: дедлайн в секундах «по настенным часам» (deadlines.wall_clock_ts).
+# Виртуальная вычисляемая колонка — её не забудет ни одна функция записи, а индекс
+# idx_tasks_deadline_ts хранит уже посчитанные значения. Понимает форматы, в которых
+# дедлайны лежат после normalize_deadline: 'dd.mm.yy HH:MM' и даты без времени.
+# Выражение записано в схему: меняя его или DATE_ONLY_TIME, нужна миграция
+DEADLINE_TS_SQL = f"""CAST(CASE
+    WHEN length(deadline) = 14 AND substr(deadline, 3, 1) = '.' AND substr(deadline, 12, 1) = ':' THEN
+        strftime('%s', '20' || substr(deadline, 7, 2) || '-' || substr(deadline, 4, 2) || '-'
+                 || substr(deadline, 1, 2) || ' ' || substr(deadline, 10, 5))
+    WHEN length(deadline) = 8 AND substr(deadline, 3, 1) = '.' THEN
+        strftime('%s', '20' || substr(deadline, 7, 2) || '-' || substr(deadline, 4, 2) || '-'
+                 || substr(deadline, 1, 2) || ' {DATE_ONLY_TIME}')
+    WHEN length(deadline) = 10 AND substr(deadline, 3, 1) = '.' THEN
+        strftime('%s', substr(deadline, 7, 4) || '-' || substr(deadline, 4, 2) || '-'
+                 || substr(deadline, 1, 2) || ' {DATE_ONLY_TIME}')
+    WHEN length(deadline) = 10 AND substr(deadline, 5, 1) = '-' THEN
+        strftime('%s', deadline || ' {DATE_ONLY_TIME}')
+END AS INTEGER)"""
+
+# Колонки для API: категория уже в кодовом виде, приоритет — отдельной колонкой
+API_TASK_COLUMNS = 'id, user_id, title, category_code, tags, deadline, completed, created_at, updated_at, priority'
+
 def init_db():
-    conn = sqlite3.connect('focusup.db', check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=DB_BUSY_TIMEOUT)
     cursor = conn.cursor()
+    # WAL: читатели не ждут писателя, режим сохраняется в самом файле БД
+    cursor.execute('PRAGMA journal_mode=WAL')
     
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -30,6 +78,8 @@ def init_db():
             completed BOOLEAN DEFAULT FALSE,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            priority TEXT DEFAULT 'medium',
+            category_code TEXT DEFAULT 'personal',
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
     ''')
@@ -60,13 +110,170 @@ def init_db():
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_deadline ON tasks(deadline)')
 
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_pomodoro_user_id ON pomodoro_sessions(user_id)')
+
+    # Версия списка задач пользователя (для ETag) и надгробия удалённых задач (для ?since=)
+    try:
+        cursor.execute('ALTER TABLE users ADD COLUMN tasks_version INTEGER NOT NULL DEFAULT 0')
+        logger.info("✅ Добавлено поле tasks_version")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" not in str(e):
+            raise
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_tombstones (
+            task_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_updated ON tasks(user_id, updated_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tombstones_user_deleted ON task_tombstones(user_id, deleted_at)')
+
+    # Версию поднимают триггеры, чтобы её не забыла ни одна функция записи
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_version_insert AFTER INSERT ON tasks
+        BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id = NEW.user_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_version_update AFTER UPDATE ON tasks
+        BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id = NEW.user_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_version_delete AFTER DELETE ON tasks
+        BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id = OLD.user_id;
+            INSERT OR REPLACE INTO task_tombstones (task_id, user_id) VALUES (OLD.id, OLD.user_id);
+        END
+    ''')
+    # Кэш распознанных голосовых: ключ tg:<file_unique_id> или sha256:<хэш аудио>
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transcriptions (
+            cache_key TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transcriptions_last_used ON transcriptions(last_used_at)')
+
+    # Отправленные напоминания (reminders.py): ключ с дедлайном, чтобы перенос
+    # задачи давал новое напоминание, а перезапуск бота — не давал повторного
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sent_reminders (
+            task_id INTEGER NOT NULL,
+            deadline_ts INTEGER NOT NULL,
+            sent_at REAL NOT NULL,
+            PRIMARY KEY (task_id, deadline_ts)
+        ) WITHOUT ROWID
+    ''')
+
+    _migrate(cursor)
+
+    cursor.execute(
+        'DELETE FROM task_tombstones WHERE deleted_at < datetime(\'now\', ?)',
+        (f'-{TOMBSTONE_RETENTION_DAYS} days',),
+    )
+    cursor.execute(
+        'DELETE FROM sent_reminders WHERE deadline_ts < ?',
+        (wall_clock_ts() - REMINDER_RETENTION_DAYS * 86400,),
+    )
     
     conn.commit()
     conn.close()
     logger.info("✅ База данных инициализирована с правильными связями")
 
+def _migrate(cursor):
+    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    if version < 1:
+        _migrate_normalized_fields(cursor)
+    if version < 2:
+        _migrate_deadline_ts(cursor)
+    if version < SCHEMA_VERSION:
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        logger.info(f"✅ Схема БД обновлена до версии {SCHEMA_VERSION}")
+
+def _migrate_normalized_fields(cursor):
+    """v1: priority и category_code в отдельных колонках, дедлайны в формате 'dd.mm.yy HH:MM'"""
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(tasks)')}
+    # в старых базах priority был INTEGER 1..3 и нигде не использовался — перезаписываем
+    if 'priority' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN priority TEXT DEFAULT 'medium'")
+    if 'category_code' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN category_code TEXT DEFAULT 'personal'")
+
+    rows = cursor.execute('SELECT id, category, tags, deadline FROM tasks').fetchall()
+    cursor.executemany(
+        'UPDATE tasks SET category_code = ?, priority = ?, deadline = ? WHERE id = ?',
+        [
+            (normalize_category(category), priority_from_tags(tags), normalize_deadline(deadline), task_id)
+            for task_id, category, tags, deadline in rows
+        ],
+    )
+    logger.info(f"✅ Нормализовано задач: {len(rows)}")
+
+def _migrate_deadline_ts(cursor):
+    """v2: вычисляемая tasks.deadline_ts и индекс для планировщика напоминаний"""
+    # table_xinfo, в отличие от table_info, показывает и вычисляемые колонки
+    columns = {row[1] for row in cursor.execute('PRAGMA table_xinfo(tasks)')}
+    if 'deadline_ts' not in columns:
+        cursor.execute(f'ALTER TABLE tasks ADD COLUMN deadline_ts INTEGER GENERATED ALWAYS AS ({DEADLINE_TS_SQL}) VIRTUAL')
+    # Частичный индекс: выполненные задачи планировщику не нужны
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_deadline_ts ON tasks(deadline_ts) WHERE completed = FALSE')
+
+class QueryCounter:
+    """Сколько SQL-запросов и соединений понадобилось блоку count_queries()"""
+
+    def __init__(self):
+        self.statements = 0
+        self.connections = 0
+        self.seconds = 0.0
+
+    def _trace(self, statement):
+        # операторы внутри триггеров приходят отдельно, с комментарием «-- TRIGGER»
+        if not statement.startswith('--'):
+            self.statements += 1
+
+    def __repr__(self):
+        return (f"QueryCounter(statements={self.statements}, connections={self.connections}, "
+                f"seconds={self.seconds:.4f})")
+
+
+_query_counter = ContextVar('query_counter', default=None)
+
+
+@contextmanager
+def count_queries():
+    """
+    Считает запросы к БД внутри блока (в текущем потоке/задаче):
+
+        with count_queries() as counter:
+            render()
+        counter.statements, counter.connections, counter.seconds
+    """
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    started = time.perf_counter()
+    try:
+        yield counter
+    finally:
+        counter.seconds = time.perf_counter() - started
+        _query_counter.reset(token)
+
+
 def get_connection():
-    return sqlite3.connect('focusup.db', check_same_thread=False)
+    # при SQL_PROFILE=1 курсоры замеряют каждый запрос (query_profiler.py)
+    factory = ProfilingConnection if profiler.enabled else sqlite3.Connection
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=DB_BUSY_TIMEOUT, factory=factory)
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.connections += 1
+        conn.set_trace_callback(counter._trace)
+    return conn
 
 def get_user_id_by_telegram_id(telegram_id):
     conn = get_connection()
@@ -95,7 +302,7 @@ def add_user(telegram_id, username=None, first_name=None, last_name=None):
         result = cursor.fetchone()
         user_id = result[0] if result else None
         
-        logger.info(f"✅ Пользователь добавлен: {telegram_id} -> ID: {user_id}")
+        logger.debug("✅ Пользователь добавлен: %s -> ID: %s", telegram_id, user_id)
         return user_id
     except Exception as e:
         logger.error(f"❌ Ошибка при добавлении пользователя {telegram_id}: {e}")
@@ -104,18 +311,21 @@ def add_user(telegram_id, username=None, first_name=None, last_name=None):
         conn.close()
 
 
-def add_task(user_id, title, category='general', tags=None, deadline=None):
+def add_task(user_id, title, category='general', tags=None, deadline=None, priority=None):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        logger.info(f"🔍 DEBUG add_task: adding task '{title}' for user_id={user_id} (type: {type(user_id)})")
+        logger.debug("🔍 add_task: задача '%s' для пользователя %s", title, user_id)
         cursor.execute('''
-            INSERT INTO tasks (user_id, title, category, tags, deadline) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, title, category, tags, deadline))
+            INSERT INTO tasks (user_id, title, category, category_code, tags, priority, deadline) 
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            user_id, title, category, normalize_category(category),
+            tags, normalize_priority(priority, tags), normalize_deadline(deadline),
+        ))
         task_id = cursor.lastrowid
         conn.commit()
-        logger.info(f"✅ Задача добавлена: ID {task_id} для пользователя {user_id}")
+        logger.debug("✅ Задача добавлена: ID %s для пользователя %s", task_id, user_id)
         return task_id
     except Exception as e:
         logger.error(f"❌ Ошибка при добавлении задачи: {e}")
@@ -127,7 +337,7 @@ def get_user_tasks(user_id, include_completed=True):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        logger.info(f"🔍 DEBUG get_user_tasks: searching for tasks with user_id={user_id} (type: {type(user_id)})")
+        logger.debug("🔍 get_user_tasks: поиск задач user_id=%s", user_id)
         if include_completed:
             cursor.execute('''
                 SELECT id, user_id, title, category, tags, deadline, completed, created_at, updated_at FROM tasks 
@@ -149,7 +359,7 @@ def get_user_tasks(user_id, include_completed=True):
             ''', (user_id,))
         
         tasks = cursor.fetchall()
-        logger.info(f"📋 Получено {len(tasks)} задач для пользователя {user_id}")
+        logger.debug("📋 Получено %s задач для пользователя %s", len(tasks), user_id)
         return tasks
     except Exception as e:
         logger.error(f"❌ Ошибка при получении задач: {e}")
@@ -157,6 +367,27 @@ def get_user_tasks(user_id, include_completed=True):
     finally:
         conn.close()
 
+def get_user_tasks_for_api(user_id):
+    """Все задачи пользователя в колонках API_TASK_COLUMNS — поля уже нормализованы при записи"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''
+            SELECT {API_TASK_COLUMNS} FROM tasks
+            WHERE user_id = ?
+            ORDER BY 
+                completed ASC,
+                CASE WHEN deadline IS NULL THEN 1 ELSE 0 END,
+                deadline ASC,
+                created_at DESC
+        ''', (user_id,))
+        return cursor.fetchall()
+    except Exception as e:
+        logger.error(f"❌ Ошибка при получении задач: {e}")
+        return []
+    finally:
+        conn.close()
+
 def get_active_tasks(user_id):
     conn = get_connection()
     cursor = conn.cursor()
@@ -170,7 +401,7 @@ def get_active_tasks(user_id):
                 created_at DESC
         ''', (user_id,))
         tasks = cursor.fetchall()
-        logger.info(f"🟢 Получено {len(tasks)} активных задач для пользователя {user_id}")
+        logger.debug("🟢 Получено %s активных задач для пользователя %s", len(tasks), user_id)
         return tasks
     except Exception as e:
         logger.error(f"❌ Ошибка при получении активных задач: {e}")
@@ -188,7 +419,7 @@ def get_completed_tasks(user_id):
             ORDER BY created_at DESC
         ''', (user_id,))
         tasks = cursor.fetchall()
-        logger.info(f"✅ Получено {len(tasks)} выполненных задач для пользователя {user_id}")
+        logger.debug("✅ Получено %s выполненных задач для пользователя %s", len(tasks), user_id)
         return tasks
     except Exception as e:
         logger.error(f"❌ Ошибка при получении выполненных задач: {e}")
@@ -203,7 +434,7 @@ def get_user_id(telegram_id):
         cursor.execute('SELECT id FROM users WHERE telegram_id = ?', (telegram_id,))
         result = cursor.fetchone()
         user_id = result[0] if result else None
-        logger.info(f"🔍 Поиск user_id для {telegram_id}: {user_id}")
+        logger.debug("🔍 Поиск user_id для %s: %s", telegram_id, user_id)
         return user_id
     except Exception as e:
         logger.error(f"❌ Ошибка при получении user_id: {e}")
@@ -211,20 +442,73 @@ def get_user_id(telegram_id):
     finally:
         conn.close()
 
-def update_task_status(task_id: int, completed: bool) -> bool:
+def get_tasks_version(user_id):
+    """(счётчик изменений, максимальный updated_at) списка задач — из них строится ETag"""
     conn = get_connection()
     cursor = conn.cursor()
     try:
         cursor.execute('''
-            UPDATE tasks 
-            SET completed = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE id = ?
-        ''', (completed, task_id))
+            SELECT u.tasks_version,
+                   (SELECT MAX(updated_at) FROM tasks WHERE user_id = u.id)
+            FROM users u WHERE u.id = ?
+        ''', (user_id,))
+        result = cursor.fetchone()
+        return (result[0], result[1]) if result else (0, None)
+    except Exception as e:
+        logger.error(f"❌ Ошибка при получении версии задач: {e}")
+        return (None, None)
+    finally:
+        conn.close()
+
+def get_tasks_changed_since(user_id, since):
+    """
+    Задачи, изменённые начиная с курсора since ('YYYY-MM-DD HH:MM:SS'), и id удалённых.
+    Сравнение нестрогое: у CURRENT_TIMESTAMP секундная точность, поэтому строки
+    с updated_at == since приходят повторно — клиент просто перезаписывает их.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'''
+            SELECT {API_TASK_COLUMNS} FROM tasks
+            WHERE user_id = ? AND updated_at >= ?
+            ORDER BY updated_at ASC
+        ''', (user_id, since))
+        changed = cursor.fetchall()
+
+        cursor.execute('''
+            SELECT task_id, deleted_at FROM task_tombstones
+            WHERE user_id = ? AND deleted_at >= ?
+        ''', (user_id, since))
+        deleted = cursor.fetchall()
+        return changed, deleted
+    except Exception as e:
+        logger.error(f"❌ Ошибка при получении изменений задач: {e}")
+        return [], []
+    finally:
+        conn.close()
+
+def update_task_status(task_id: int, completed: bool, user_id=None) -> bool:
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if user_id is None:
+            cursor.execute('''
+                UPDATE tasks 
+                SET completed = ?, updated_at = CURRENT_TIMESTAMP 
+                WHERE id = ?
+            ''', (completed, task_id))
+        else:
+            cursor.execute('''
+                UPDATE tasks 
+                SET completed = ?, updated_at = CURRENT_TIMESTAMP 
+                WHERE id = ? AND user_id = ?
+            ''', (completed, task_id, user_id))
         conn.commit()
         success = cursor.rowcount > 0
         if success:
             status = "выполнена" if completed else "активна"
-            logger.info(f"✅ Статус задачи {task_id} изменен на '{status}'")
+            logger.debug("✅ Статус задачи %s изменен на '%s'", task_id, status)
         return success
     except Exception as e:
         logger.error(f"❌ Ошибка при обновлении статуса задачи: {e}")
@@ -232,15 +516,18 @@ def update_task_status(task_id: int, completed: bool) -> bool:
     finally:
         conn.close()
 
-def delete_task(task_id):
+def delete_task(task_id, user_id=None):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+        if user_id is None:
+            cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+        else:
+            cursor.execute('DELETE FROM tasks WHERE id = ? AND user_id = ?', (task_id, user_id))
         conn.commit()
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"🗑️ Задача {task_id} удалена")
+            logger.debug("🗑️ Задача %s удалена", task_id)
         return success
     except Exception as e:
         logger.error(f"❌ Ошибка при удалении задачи: {e}")
@@ -294,7 +581,7 @@ def add_pomodoro_session(user_id, duration, task_id=None):
         
         conn.commit()
         session_id = cursor.lastrowid
-        logger.info(f"🍅 Pomodoro сессия добавлена: ID {session_id}")
+        logger.debug("🍅 Pomodoro сессия добавлена: ID %s", session_id)
         return session_id
     except Exception as e:
         logger.error(f"❌ Ошибка при добавлении Pomodoro сессии: {e}")
@@ -432,11 +719,11 @@ def update_task_deadline(task_id, new_deadline):
             UPDATE tasks 
             SET deadline = ?, updated_at = CURRENT_TIMESTAMP 
             WHERE id = ?
-        ''', (new_deadline, task_id))
+        ''', (normalize_deadline(new_deadline), task_id))
         conn.commit()
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"📅 Дедлайн задачи {task_id} обновлен")
+            logger.debug("📅 Дедлайн задачи %s обновлен", task_id)
         return success
     except Exception as e:
         logger.error(f"❌ Ошибка при обновлении дедлайна: {e}")
@@ -457,7 +744,7 @@ def update_task_title(task_id: int, new_title: str) -> bool:
         conn.commit()
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"📝 Название задачи {task_id} обновлено")
+            logger.debug("📝 Название задачи %s обновлено", task_id)
         return success
     except Exception as e:
         logger.error(f"❌ Ошибка при обновлении названия задачи: {e}")
@@ -472,13 +759,13 @@ def update_task_category(task_id: int, new_category: str) -> bool:
     try:
         cursor.execute('''
             UPDATE tasks 
-            SET category = ?, updated_at = CURRENT_TIMESTAMP 
+            SET category = ?, category_code = ?, updated_at = CURRENT_TIMESTAMP 
             WHERE id = ?
-        ''', (new_category, task_id))
+        ''', (new_category, normalize_category(new_category), task_id))
         conn.commit()
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"📂 Категория задачи {task_id} изменена на '{new_category}'")
+            logger.debug("📂 Категория задачи %s изменена на '%s'", task_id, new_category)
         return success
     except Exception as e:
         logger.error(f"❌ Ошибка при обновлении категории задачи: {e}")
@@ -547,13 +834,13 @@ def update_task_tags(task_id: int, new_tags: str) -> bool:
     try:
         cursor.execute('''
             UPDATE tasks 
-            SET tags = ?, updated_at = CURRENT_TIMESTAMP 
+            SET tags = ?, priority = ?, updated_at = CURRENT_TIMESTAMP 
             WHERE id = ?
-        ''', (new_tags, task_id))
+        ''', (new_tags, priority_from_tags(new_tags), task_id))
         conn.commit()
         success = cursor.rowcount > 0
         if success:
-            logger.info(f"✅ Теги задачи {task_id} обновлены")
+            logger.debug("✅ Теги задачи %s обновлены", task_id)
         return success
     except Exception as e:
         logger.error(f"❌ Ошибка при обновлении тегов задачи: {e}")
@@ -593,10 +880,114 @@ def get_overdue_tasks(user_id):
         ''', (user_id,))
         
         tasks = cursor.fetchall()
-        logger.info(f"⏰ Получено {len(tasks)} просроченных задач для пользователя {user_id}")
+        logger.debug("⏰ Получено %s просроченных задач для пользователя %s", len(tasks), user_id)
         return tasks
     except Exception as e:
         logger.error(f"❌ Ошибка при получении просроченных задач: {e}")
         return []
     finally:
         conn.close()
+
+def get_cached_transcription(cache_key, max_age_seconds):
+    """Текст из кэша распознавания или None (просроченные записи не отдаём)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        now = time.time()
+        cursor.execute(
+            'SELECT text FROM transcriptions WHERE cache_key = ? AND created_at >= ?',
+            (cache_key, now - max_age_seconds),
+        )
+        result = cursor.fetchone()
+        if not result:
+            return None
+        cursor.execute(
+            'UPDATE transcriptions SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?',
+            (now, cache_key),
+        )
+        conn.commit()
+        return result[0]
+    except Exception as e:
+        logger.error(f"❌ Ошибка при чтении кэша распознавания: {e}")
+        return None
+    finally:
+        conn.close()
+
+def save_transcription(cache_key, text, max_entries, max_age_seconds):
+    """Сохраняет распознанный текст и чистит кэш: сначала просроченное, затем давно не использованное сверх max_entries"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        now = time.time()
+        cursor.execute('''
+            INSERT OR REPLACE INTO transcriptions (cache_key, text, created_at, last_used_at, hits)
+            VALUES (?, ?, ?, ?, 0)
+        ''', (cache_key, text, now, now))
+        cursor.execute('DELETE FROM transcriptions WHERE created_at < ?', (now - max_age_seconds,))
+        cursor.execute('''
+            DELETE FROM transcriptions WHERE cache_key IN (
+                SELECT cache_key FROM transcriptions
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
+            )
+        ''', (max_entries,))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"❌ Ошибка при сохранении в кэш распознавания: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_due_reminders(from_ts, until_ts, after=(0, 0), limit=1000):
+    """
+    Невыполненные задачи с deadline_ts в [from_ts, until_ts], по которым ещё не
+    было напоминания: (task_id, deadline_ts, telegram_id, title, deadline).
+    Идёт по частичному индексу idx_tasks_deadline_ts (id в нём неявно, так что и
+    сортировка бесплатная); индекс указан явно — без ANALYZE SQLite выбирает
+    idx_tasks_completed. after — (deadline_ts, task_id) последней полученной
+    строки, чтобы читать окно страницами по limit
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        after_ts, after_id = after
+        cursor.execute('''
+            SELECT t.id, t.deadline_ts, u.telegram_id, t.title, t.deadline
+            FROM tasks t INDEXED BY idx_tasks_deadline_ts JOIN users u ON u.id = t.user_id
+            WHERE t.deadline_ts >= ? AND t.deadline_ts <= ? AND t.completed = FALSE
+              AND (t.deadline_ts > ? OR t.id > ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM sent_reminders s WHERE s.task_id = t.id AND s.deadline_ts = t.deadline_ts
+              )
+            ORDER BY t.deadline_ts, t.id
+            LIMIT ?
+        ''', (max(from_ts, after_ts), until_ts, after_ts, after_id, limit))
+        return cursor.fetchall()
+    except Exception as e:
+        logger.error(f"❌ Ошибка при получении напоминаний: {e}")
+        return []
+    finally:
+        conn.close()
+
+def claim_reminder(task_id, deadline_ts):
+    """
+    Помечает напоминание отправленным, если задача всё ещё не выполнена, дедлайн
+    не менялся и напоминания не было. True — можно отправлять; False — его уже
+    отправил другой процесс (или до перезапуска) либо оно больше не нужно
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT OR IGNORE INTO sent_reminders (task_id, deadline_ts, sent_at)
+            SELECT id, deadline_ts, ? FROM tasks
+            WHERE id = ? AND deadline_ts = ? AND completed = FALSE
+        ''', (time.time(), task_id, deadline_ts))
+        conn.commit()
+        return cursor.rowcount == 1
+    except Exception as e:
+        logger.error(f"❌ Ошибка при отметке напоминания: {e}")
+        return False
+    finally:
+        conn.close()
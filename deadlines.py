@@ -0,0 +1,101 @@
+"""
+Разбор строк дедлайнов, как они лежат в БД.
+
+Почти все дедлайны записаны в формате бота 'dd.mm.yy HH:MM' — его разбираем
+вручную срезами строки, без strptime. Остальные форматы (дата без времени,
+полный год, ISO из мини-аппы) перебираются как раньше. Строк-дедлайнов у
+пользователей немного, а разбираются они на каждом рендере календаря и
+списков, поэтому результат кэшируется в ограниченном LRU.
+"""
+import calendar
+from datetime import datetime
+from functools import lru_cache
+
+DEADLINE_FORMAT = "%d.%m.%y %H:%M"
+DEADLINE_CACHE_SIZE = 4096
+
+# Дедлайн без времени считается наступающим утром этого дня (напоминания, tasks.deadline_ts)
+DATE_ONLY_TIME = "09:00"
+
+_SLOW_FORMATS = ("%d.%m.%Y %H:%M", "%d.%m.%y", "%d.%m.%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+
+def _is_bot_format(value: str) -> bool:
+    """'dd.mm.yy HH:MM' — проверка по позициям разделителей"""
+    return (
+        len(value) == 14
+        and value[2] == "." and value[5] == "." and value[8] == " " and value[11] == ":"
+    )
+
+
+def _parse_bot_format(value: str) -> datetime | None:
+    try:
+        year = int(value[6:8])
+        # как у strptime('%y'): 00–68 → 20xx, 69–99 → 19xx
+        year += 2000 if year < 69 else 1900
+        return datetime(year, int(value[3:5]), int(value[0:2]), int(value[9:11]), int(value[12:14]))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=DEADLINE_CACHE_SIZE)
+def _parse_cached(value: str) -> datetime | None:
+    if _is_bot_format(value):
+        parsed = _parse_bot_format(value)
+        if parsed is not None:
+            return parsed
+
+    if "T" in value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+
+    for fmt in _SLOW_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if parsed.year < 1950:
+            parsed = parsed.replace(year=parsed.year + 100)
+        return parsed
+    return None
+
+
+def parse_deadline(value: str | None) -> datetime | None:
+    """Строка дедлайна → datetime; None, если строка пустая или формат незнаком"""
+    if not value or not isinstance(value, str):
+        return None
+    return _parse_cached(value)
+
+
+def deadline_has_time(value: str | None) -> bool:
+    """Есть ли в дедлайне время (у 'dd.mm.yy' без времени его нет)"""
+    return bool(value) and ":" in value
+
+
+def format_deadline(value: datetime) -> str:
+    return value.strftime(DEADLINE_FORMAT)
+
+
+def wall_clock_ts(moment: datetime | None = None) -> int:
+    """
+    Секунды «по настенным часам»: наивное локальное время, посчитанное как UTC.
+    Дедлайны хранятся без часового пояса, и tasks.deadline_ts считается так же
+    """
+    return calendar.timegm((moment or datetime.now()).timetuple())
+
+
+def deadline_timestamp(value: str | None) -> int | None:
+    """Значение колонки tasks.deadline_ts для строки дедлайна (её зеркало на Python)"""
+    parsed = parse_deadline(value)
+    if parsed is None:
+        return None
+    if not deadline_has_time(value):
+        hour, minute = map(int, DATE_ONLY_TIME.split(":"))
+        parsed = parsed.replace(hour=hour, minute=minute)
+    return wall_clock_ts(parsed)
+
+
+def cache_info():
+    return _parse_cached.cache_info()
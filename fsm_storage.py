@@ -0,0 +1,206 @@
+"""
+FSM-хранилище aiogram на SQLite.
+
+Состояния диалогов (создание и редактирование задачи, планирование) больше
+не живут в памяти процесса: одна строка на ключ в отдельной таблице, WAL и
+busy_timeout, поэтому после перезапуска диалог продолжается, а несколько
+процессов бота видят одно и то же. Брошенные диалоги удаляются по TTL —
+срок продлевается при каждой записи.
+
+Чтения обслуживает сквозной LRU-кэш в памяти: каждая запись сразу уходит в
+БД, а повторное чтение того же ключа до БД не доходит. Кэш рассчитан на то,
+что апдейты одного чата обрабатывает один процесс; если это не так,
+передайте cache_size=0.
+"""
+import asyncio
+import functools
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from config import FSM_DB_PATH, FSM_STATE_TTL_HOURS, FSM_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Как часто удалять из таблицы просроченные и пустые строки
+PURGE_INTERVAL_SECONDS = 600
+
+_EMPTY_DATA = '{}'
+
+
+class SQLiteStorage(BaseStorage):
+    def __init__(
+        self,
+        path: str = FSM_DB_PATH,
+        ttl_seconds: float = FSM_STATE_TTL_HOURS * 3600,
+        cache_size: int = FSM_CACHE_SIZE,
+        key_builder: KeyBuilder | None = None,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+
+        # key -> [state, data, expires_at]; самые свежие — в конце
+        self._cache = OrderedDict()
+        # Одно соединение и один поток: записи процесса не спорят за блокировку между собой
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='focusup-fsm')
+        self._conn = None
+        self._last_purge = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.purged = 0
+
+    # --- синхронная часть, выполняется в потоке хранилища ---
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS fsm_storage (
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT NOT NULL DEFAULT '{}',
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_fsm_storage_expires ON fsm_storage(expires_at)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _load(self, key: str):
+        row = self._connection().execute(
+            'SELECT state, data, expires_at FROM fsm_storage WHERE key = ? AND expires_at > ?',
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        state, data, expires_at = row
+        return [state, json.loads(data), expires_at]
+
+    def _write(self, key: str, column: str, value, expires_at: float) -> None:
+        conn = self._connection()
+        # Пишем только свой столбец: параллельная запись другого столбца не затирается
+        conn.execute(
+            f'''
+            INSERT INTO fsm_storage (key, {column}, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, expires_at = excluded.expires_at
+            ''',
+            (key, value, expires_at),
+        )
+        conn.commit()
+        self._purge_if_due(conn)
+
+    def _purge_if_due(self, conn: sqlite3.Connection) -> None:
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        cursor = conn.execute(
+            'DELETE FROM fsm_storage WHERE expires_at <= ? OR (state IS NULL AND data = ?)',
+            (now, _EMPTY_DATA),
+        )
+        conn.commit()
+        if cursor.rowcount:
+            self.purged += cursor.rowcount
+            logger.info(f"🧹 FSM: удалено {cursor.rowcount} устаревших состояний")
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    # --- кэш ---
+
+    def _cached(self, key: str):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, entry) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _entry(self, key: str):
+        entry = self._cached(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = await self._run(self._load, key)
+        if entry is None:
+            entry = [None, {}, time.time() + self.ttl_seconds]
+        self._remember(key, entry)
+        return entry
+
+    # --- BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        value = state.state if isinstance(state, State) else state
+        expires_at = time.time() + self.ttl_seconds
+        await self._run(self._write, storage_key, 'state', value, expires_at)
+        self.writes += 1
+
+        entry = self._cache.get(storage_key)
+        if entry is not None:
+            entry[0], entry[2] = value, expires_at
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        entry = await self._entry(self.key_builder.build(key))
+        return entry[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        data = dict(data)
+        expires_at = time.time() + self.ttl_seconds
+        await self._run(self._write, storage_key, 'data', json.dumps(data, ensure_ascii=False), expires_at)
+        self.writes += 1
+
+        entry = self._cache.get(storage_key)
+        if entry is not None:
+            entry[1], entry[2] = data, expires_at
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        entry = await self._entry(self.key_builder.build(key))
+        return entry[1].copy()
+
+    async def close(self) -> None:
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {
+            'cached': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'purged': self.purged,
+        }
@@ -6,7 +6,9 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from ai_helper import ai_assistant
 from database import get_user_id, get_user_tasks, get_user_stats
 import re
+import logging
 
+logger = logging.getLogger(__name__)
 router = Router()
 
 
@@ -369,5 +371,5 @@ async def handle_general_chat(message: types.Message, state: FSMContext):
         await message.answer(formatted_response)
         
     except Exception as e:
-        print(f"❌ Ошибка в общем чате: {e}")
+        logger.error("❌ Ошибка в общем чате: %s", e)
         await message.answer("Извините, произошла ошибка при обработке вашего сообщения. Попробуйте ещё раз.")
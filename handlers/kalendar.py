@@ -1,35 +1,17 @@
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from datetime import datetime, timedelta
-from database import get_user_tasks
+from database import get_user_tasks, count_queries
+from deadlines import parse_deadline
+from config import CALENDAR_STATE_TTL_HOURS, USER_STATE_MAX_ENTRIES
+from ttl_cache import TTLCache
 import logging
 import calendar as cal_lib
 
 router = Router()
 logger = logging.getLogger(__name__)
 
-user_calendars = {}
-
-def parse_deadline(deadline_str):
-    if not deadline_str:
-        return None
-    
-    try:
-        formats = ['%d.%m.%y %H:%M', '%d.%m.%Y %H:%M', '%d.%m.%y', '%d.%m.%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d']
-        
-        for fmt in formats:
-            try:
-                parsed_date = datetime.strptime(deadline_str, fmt)
-                
-                if parsed_date.year < 1950:
-                    parsed_date = parsed_date.replace(year=parsed_date.year + 100)
-                
-                return parsed_date
-            except ValueError:
-                continue
-        return None
-    except Exception:
-        return None
+user_calendars = TTLCache('user_calendars', CALENDAR_STATE_TTL_HOURS * 3600, USER_STATE_MAX_ENTRIES)
 
 def get_tasks_for_date(telegram_user_id, target_date):
     from database import get_user_id_by_telegram_id
@@ -53,8 +35,31 @@ def get_tasks_for_date(telegram_user_id, target_date):
     
     return date_tasks
 
-def get_date_status(telegram_user_id, target_date):
-    tasks = get_tasks_for_date(telegram_user_id, target_date)
+def get_month_tasks(telegram_user_id, month, year):
+    """
+    Задачи месяца по дням {date: [task, ...]} — одна выборка задач на весь
+    календарь вместо выборки на каждый день
+    """
+    from database import get_user_id_by_telegram_id
+    
+    user_id = get_user_id_by_telegram_id(telegram_user_id)
+    if not user_id:
+        return {}
+    
+    tasks_by_day = {}
+    for task in get_user_tasks(user_id):
+        if len(task) >= 6 and task[5]:
+            deadline_date = parse_deadline(task[5])
+            if deadline_date and deadline_date.month == month and deadline_date.year == year:
+                tasks_by_day.setdefault(deadline_date.date(), []).append(task)
+    
+    return tasks_by_day
+
+def get_date_status(telegram_user_id, target_date, tasks_by_day=None):
+    if tasks_by_day is None:
+        tasks = get_tasks_for_date(telegram_user_id, target_date)
+    else:
+        tasks = tasks_by_day.get(target_date, [])
     
     if not tasks:
         return None
@@ -77,9 +82,9 @@ def get_date_status(telegram_user_id, target_date):
         'pending': total - completed
     }
 
-def get_day_emoji_and_count(telegram_user_id, target_date):
+def get_day_emoji_and_count(telegram_user_id, target_date, tasks_by_day=None):
     today = datetime.now().date()
-    status = get_date_status(telegram_user_id, target_date)
+    status = get_date_status(telegram_user_id, target_date, tasks_by_day)
     
     if not status:
         if target_date == today:
@@ -98,7 +103,9 @@ def get_day_emoji_and_count(telegram_user_id, target_date):
     else:
         return "⏳", str(count)
 
-def get_month_statistics(telegram_user_id, month, year):
+def get_month_statistics(telegram_user_id, month, year, tasks_by_day=None):
+    if tasks_by_day is None:
+        tasks_by_day = get_month_tasks(telegram_user_id, month, year)
     days_in_month = cal_lib.monthrange(year, month)[1]
     
     total_days = 0
@@ -108,7 +115,7 @@ def get_month_statistics(telegram_user_id, month, year):
     
     for day in range(1, days_in_month + 1):
         date_obj = datetime(year, month, day).date()
-        status = get_date_status(telegram_user_id, date_obj)
+        status = get_date_status(telegram_user_id, date_obj, tasks_by_day)
         
         if status:
             total_days += 1
@@ -123,7 +130,7 @@ def get_month_statistics(telegram_user_id, month, year):
         'overdue_tasks': overdue_tasks
     }
 
-def generate_calendar_header(month, year, telegram_user_id):
+def generate_calendar_header(month, year, telegram_user_id, tasks_by_day=None):
     month_names = {
         1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель", 
         5: "Май", 6: "Июнь", 7: "Июль", 8: "Август", 
@@ -133,13 +140,15 @@ def generate_calendar_header(month, year, telegram_user_id):
     today = datetime.now()
     is_current_month = (month == today.month and year == today.year)
     
-    month_stats = get_month_statistics(telegram_user_id, month, year)
+    if tasks_by_day is None:
+        tasks_by_day = get_month_tasks(telegram_user_id, month, year)
+    month_stats = get_month_statistics(telegram_user_id, month, year, tasks_by_day)
     
     header = f"📅 **Календарь задач - {month_names[month]} {year}**\n\n"
     
     if is_current_month:
         header += f"📍 **Сегодня:** {today.strftime('%d.%m.%Y')}\n"
-        today_status = get_date_status(telegram_user_id, today.date())
+        today_status = get_date_status(telegram_user_id, today.date(), tasks_by_day)
         if today_status:
             header += f"   📋 Задач на сегодня: {today_status['total']}\n"
             if today_status['overdue'] > 0:
@@ -160,7 +169,9 @@ def generate_calendar_header(month, year, telegram_user_id):
     
     return header
 
-def create_calendar_keyboard(telegram_user_id, month, year):
+def create_calendar_keyboard(telegram_user_id, month, year, tasks_by_day=None):
+    if tasks_by_day is None:
+        tasks_by_day = get_month_tasks(telegram_user_id, month, year)
     cal = cal_lib.monthcalendar(year, month)
     keyboard = []
     
@@ -178,7 +189,7 @@ def create_calendar_keyboard(telegram_user_id, month, year):
                 week_row.append(types.InlineKeyboardButton(text=" ", callback_data="ignore"))
             else:
                 current_date = datetime(year, month, day).date()
-                emoji, count = get_day_emoji_and_count(telegram_user_id, current_date)
+                emoji, count = get_day_emoji_and_count(telegram_user_id, current_date, tasks_by_day)
                 
                 if emoji:
                     if count:
@@ -230,6 +241,14 @@ def create_calendar_keyboard(telegram_user_id, month, year):
     
     return types.InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+def render_calendar(telegram_user_id, month, year):
+    """Текст и клавиатура месяца; counter — запросы к БД и время рендера"""
+    with count_queries() as counter:
+        tasks_by_day = get_month_tasks(telegram_user_id, month, year)
+        text = generate_calendar_header(month, year, telegram_user_id, tasks_by_day)
+        keyboard = create_calendar_keyboard(telegram_user_id, month, year, tasks_by_day)
+    return text, keyboard, counter
+
 @router.message(F.text == "📅 Календарь")
 async def calendar_menu(message: types.Message):
     try:
@@ -248,11 +267,17 @@ async def calendar_menu(message: types.Message):
 
 async def show_calendar(message: types.Message, user_id, edit_message=False):
     try:
-        month = user_calendars[user_id]['current_month']
-        year = user_calendars[user_id]['current_year']
+        # Запись могла истечь — тогда показываем текущий месяц
+        current = user_calendars.get(user_id)
+        if current is None:
+            now = datetime.now()
+            current = user_calendars[user_id] = {'current_month': now.month, 'current_year': now.year}
+        month = current['current_month']
+        year = current['current_year']
         
-        calendar_text = generate_calendar_header(month, year, user_id)
-        keyboard = create_calendar_keyboard(user_id, month, year)
+        calendar_text, keyboard, counter = render_calendar(user_id, month, year)
+        logger.debug("Календарь %s %s.%s: %s запросов, %s соединений, %.1f мс",
+                     user_id, month, year, counter.statements, counter.connections, counter.seconds * 1000)
         
         if edit_message:
             try:
@@ -348,8 +373,10 @@ async def calendar_prev_month(callback: types.CallbackQuery):
         month = int(month)
         year = int(year)
         
-        user_calendars[user_id]['current_month'] = month
-        user_calendars[user_id]['current_year'] = year
+        user_calendars[user_id] = {
+            'current_month': month,
+            'current_year': year
+        }
         
         await show_calendar(callback.message, user_id, edit_message=True)
         await callback.answer()
@@ -365,8 +392,10 @@ async def calendar_next_month(callback: types.CallbackQuery):
         month = int(month)
         year = int(year)
         
-        user_calendars[user_id]['current_month'] = month
-        user_calendars[user_id]['current_year'] = year
+        user_calendars[user_id] = {
+            'current_month': month,
+            'current_year': year
+        }
         
         await show_calendar(callback.message, user_id, edit_message=True)
         await callback.answer()
@@ -380,8 +409,10 @@ async def calendar_today(callback: types.CallbackQuery):
     try:
         current_date = datetime.now()
         
-        user_calendars[user_id]['current_month'] = current_date.month
-        user_calendars[user_id]['current_year'] = current_date.year
+        user_calendars[user_id] = {
+            'current_month': current_date.month,
+            'current_year': current_date.year
+        }
         
         await show_calendar(callback.message, user_id, edit_message=True)
         await callback.answer()
@@ -5,8 +5,10 @@ import asyncio
 import random
 import tempfile
 import os
+import logging
 from database import add_pomodoro_session
 from gif_creator import gif_creator
+logger = logging.getLogger(__name__)
 router = Router()
 active_timers = {}
 POMODORO_GIFs = {
@@ -31,7 +33,7 @@ async def create_and_send_timer_gif(duration, session_type):
         return types.BufferedInputFile(gif_data, filename="pomodoro_timer.gif")
        
     except Exception as e:
-        print(f"Ошибка создания GIF: {e}")
+        logger.error("Ошибка создания GIF: %s", e)
         return None
 def create_initial_caption(session_type, duration):
 
@@ -170,9 +172,9 @@ async def pomodoro_timer_seconds(user_id, duration, session_type, message):
             await pomodoro_finished(user_id, session_type, message)
            
     except asyncio.CancelledError:
-        print("Таймер отменен")
+        logger.debug("Таймер пользователя %s отменен", user_id)
     except Exception as e:
-        print(f"Ошибка в таймере: {e}")
+        logger.error("Ошибка в таймере: %s", e)
 def create_active_timer_buttons(session_type):
 
     return types.InlineKeyboardMarkup(
@@ -420,7 +422,7 @@ async def pomodoro_finished(user_id, session_type, message):
                 del active_timers[user_id]
        
     except Exception as e:
-        print(f"Ошибка при завершении: {e}")
+        logger.error("Ошибка при завершении: %s", e)
         if user_id in active_timers:
             del active_timers[user_id]
 
@@ -464,7 +466,7 @@ async def start_next_auto_step(user_id, step, message):
         active_timers[user_id]['next_duration'] = duration
         
     except Exception as e:
-        print(f"Ошибка в автоцикле: {e}")
+        logger.error("Ошибка в автоцикле: %s", e)
 
 @router.callback_query(F.data.startswith("auto_continue_"))
 async def continue_auto_cycle(callback: types.CallbackQuery):
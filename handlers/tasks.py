@@ -10,7 +10,10 @@ from database import (
     get_active_tasks, get_completed_tasks, get_today_tasks,
     get_upcoming_tasks, search_tasks
 )
+from deadlines import parse_deadline, deadline_has_time
+import logging
 
+logger = logging.getLogger(__name__)
 router = Router()
 
 class TaskCreation(StatesGroup):
@@ -312,11 +315,11 @@ async def save_task_with_deadline(message_or_callback, state: FSMContext, deadli
     if isinstance(message_or_callback, types.CallbackQuery):
         user_telegram_id = message_or_callback.from_user.id
         response_target = message_or_callback.message
-        print(f"🔍 DEBUG save_task: CallbackQuery from user {user_telegram_id}")
+        logger.debug("🔍 save_task: CallbackQuery от пользователя %s", user_telegram_id)
     else:
         user_telegram_id = message_or_callback.from_user.id
         response_target = message_or_callback
-        print(f"🔍 DEBUG save_task: Message from user {user_telegram_id}")
+        logger.debug("🔍 save_task: Message от пользователя %s", user_telegram_id)
     
     user_internal_id = get_user_id(user_telegram_id)
     
@@ -385,21 +388,18 @@ async def save_task_with_deadline(message_or_callback, state: FSMContext, deadli
 @router.callback_query(F.data == "my_tasks")
 async def show_my_tasks_list(callback: types.CallbackQuery):
 
-    print(f"🔍 DEBUG my_tasks: telegram_id={callback.from_user.id}")
     user_internal_id = get_user_id(callback.from_user.id)
-    print(f"🔍 DEBUG my_tasks: user_internal_id={user_internal_id}")
+    logger.debug("🔍 my_tasks: telegram_id=%s -> user_id=%s", callback.from_user.id, user_internal_id)
     
     if not user_internal_id:
-        print("❌ DEBUG: user_internal_id is None!")
         await callback.message.edit_text("❌ Пользователь не найден. Начните с /start")
         await callback.answer()
         return
     
     tasks = get_user_tasks(user_internal_id)
-    print(f"🔍 DEBUG my_tasks: found {len(tasks)} tasks for user_id {user_internal_id}")
+    logger.debug("🔍 my_tasks: %s задач у пользователя %s", len(tasks), user_internal_id)
     
     if not tasks:
-        print("❌ DEBUG: tasks list is empty!")
         await callback.message.edit_text(
             "📭 *У вас пока нет задач!*\n\n"
             "Создайте первую задачу с помощью кнопки ниже:",
@@ -570,13 +570,11 @@ async def show_overdue_tasks(callback: types.CallbackQuery):
     now = datetime.now()
     
     for task in tasks:
-        if not task[6] and task[5]:
-            try:
-                deadline_date = datetime.strptime(task[5], '%d.%m.%y %H:%M')
-                if deadline_date < now:
-                    overdue_tasks.append(task)
-            except:
-                continue
+        # дедлайн без времени (только дата) просроченным не считаем
+        if not task[6] and deadline_has_time(task[5]):
+            deadline_date = parse_deadline(task[5])
+            if deadline_date and deadline_date < now:
+                overdue_tasks.append(task)
     
     response = format_task_list(overdue_tasks, "overdue")
     await send_task_list(callback, response, "overdue")
@@ -598,20 +596,18 @@ async def start_voice_input(callback: types.CallbackQuery, state: FSMContext):
 @router.message(F.voice, TaskVoiceInput.voice_text)
 async def process_voice_message(message: types.Message, state: FSMContext):
 
-    await message.answer("🎤 Обрабатываю голосовое сообщение...")
+    processing_msg = await message.answer("🎤 Обрабатываю голосовое сообщение...")
     
-    try:
-        voice_file = await message.bot.get_file(message.voice.file_id)
-        voice_data = await message.bot.download_file(voice_file.file_path)
-        
-        from voice_recognition import voice_recognizer
-        recognized_text = await voice_recognizer.recognize_voice(voice_data.read())
-        
+    from voice_recognition import voice_recognizer
+    from transcription_queue import transcription_queue
+
+    # распознавание в фоновой очереди, по готовности правим «Обрабатываю...»
+    async def on_result(recognized_text):
         if recognized_text:
             await state.update_data(title=recognized_text, category="🔧 Другое")
             await state.set_state(TaskCreation.deadline)
             
-            await message.answer(
+            await processing_msg.edit_text(
                 f"**Текст распознан:**\n{recognized_text}\n\n"
                 "Установите дедлайн:",
                 reply_markup=types.InlineKeyboardMarkup(
@@ -629,18 +625,29 @@ async def process_voice_message(message: types.Message, state: FSMContext):
                 parse_mode="Markdown"
             )
         else:
-            await message.answer(
+            await processing_msg.edit_text(
                 "❌ Не удалось распознать голосовое сообщение.\n"
                 "Попробуйте ввести задачу текстом или повторите запись."
             )
-            
-    except Exception as e:
-        print(f"Ошибка обработки голоса: {e}")
-        await message.answer(
+
+    async def on_error(e):
+        await processing_msg.edit_text(
             "❌ Ошибка при обработке голосового сообщения.\n"
             "Попробуйте ввести задачу текстом."
         )
 
+    accepted = transcription_queue.submit(
+        message.from_user.id,
+        lambda: voice_recognizer.recognize_telegram_voice(message.bot, message.voice),
+        on_result,
+        on_error,
+    )
+    if not accepted:
+        await processing_msg.edit_text(
+            "⏳ Слишком много голосовых в обработке.\n"
+            "Попробуйте ввести задачу текстом."
+        )
+
 @router.message(TaskVoiceInput.voice_text)
 async def process_voice_input(message: types.Message, state: FSMContext):
 
@@ -689,9 +696,8 @@ async def tasks_main_menu_callback(callback: types.CallbackQuery):
     )
     
     telegram_id = callback.from_user.id
-    print(f"🔍 DEBUG tasks_main_menu_callback: callback.from_user.id = {telegram_id}")
     user_internal_id = get_user_id(telegram_id)
-    print(f"🔍 DEBUG tasks_main_menu_callback: user_internal_id = {user_internal_id}")
+    logger.debug("🔍 tasks_main_menu_callback: telegram_id=%s -> user_id=%s", telegram_id, user_internal_id)
     stats_text = ""
     if user_internal_id:
         tasks = get_user_tasks(user_internal_id)
@@ -0,0 +1,31 @@
+import asyncio
+import weakref
+
+import aiohttp
+
+from metrics import http_trace_config
+
+# Одна ClientSession на event loop: сессия привязана к циклу, в котором создана,
+# поэтому бот и фоновый цикл API-сервера получают каждый свою, но переиспользуют её
+_sessions = weakref.WeakKeyDictionary()
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Общая HTTP-сессия (пул соединений) для текущего event loop"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+            trace_configs=[http_trace_config()],   # задержка и статусы OpenAI/Whisper для /metrics
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close_session():
+    """Закрывает сессию текущего event loop (вызывать при остановке)"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
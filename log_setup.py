@@ -0,0 +1,105 @@
+"""
+Логирование через очередь: хендлеры и запросы к БД не ждут записи в консоль.
+
+setup_logging() вешает на корневой логгер единственный QueueHandler, а
+настоящий вывод (StreamHandler) живёт в фоновом потоке QueueListener.
+Запись лога на горячем пути — это создание LogRecord и put в очередь;
+сообщение со строками и числами в аргументах не форматируется, пока его не
+заберёт фоновый поток, поэтому logger.debug("... %s", x) при выключенном
+DEBUG не стоит почти ничего, а при включённом не форматируется в event loop.
+
+LOG_FORMAT=json пишет по JSON-объекту на строку: время, уровень, логгер,
+сообщение и поля, переданные через extra=.
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+from config import LOG_FORMAT, LOG_LEVEL
+
+TEXT_FORMAT = logging.BASIC_FORMAT
+
+# Атрибуты, которые есть у любой LogRecord; всё остальное пришло через extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Аргументы, которые безопасно форматировать позже, в фоновом потоке
+_IMMUTABLE_ARGS = (str, bytes, int, float, complex, type(None), datetime.date, datetime.time, datetime.timedelta)
+
+_listener = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке: стандартный prepare()
+    склеивает msg % args сразу. Здесь запись со строками, числами и датами в
+    args уходит как есть; если среди аргументов есть что-то изменяемое (dict,
+    list, объект), сообщение склеивается сразу — иначе фоновый поток увидел бы
+    значение, изменённое уже после вызова логгера. Traceback превращается в
+    текст, чтобы не держать кадры стека до записи
+    """
+
+    def prepare(self, record):
+        if record.args and not (isinstance(record.args, tuple)
+                                and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level=LOG_LEVEL, fmt=TEXT_FORMAT, structured=LOG_FORMAT == 'json', stream=None, force=False):
+    """
+    Вместо logging.basicConfig: корневой логгер пишет через очередь и фоновый поток.
+    Как и basicConfig, повторный вызов ничего не меняет, если не передан force=True
+    """
+    global _listener
+    if _listener is not None and not force:
+        return _listener
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if structured else logging.Formatter(fmt))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает фоновый поток (вызывается и при выходе)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,170 @@
+"""
+Сторож event loop: задержка цикла и блокирующие вызовы в хендлерах.
+
+Фоновая задача каждые LOOP_LAG_INTERVAL_MS засыпает и замеряет, насколько
+позже проснулась (гистограмма focusup_event_loop_lag_seconds), и обновляет
+«пульс». Отдельный поток следит за пульсом: если цикл не отвечает дольше
+LOOP_STALL_MS, он снимает стек потока цикла — то есть синхронный код, который
+держит цикл прямо сейчас (SQLite, Pillow, разбор дат в цикле) — и пишет его
+в лог вместе с хендлером из handlers/*.py, в котором это случилось. Когда
+цикл оживает, к записи добавляется полная длительность блокировки.
+
+Последние STALL_LOG_SIZE случаев — watchdog.report(); счётчик по хендлерам —
+focusup_event_loop_stalls_total в /metrics.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from metrics import REGISTRY, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Как и query_profiler, читаем окружение напрямую: сторож нужен и шардам, и бенчмаркам
+LOOP_WATCHDOG = os.getenv('LOOP_WATCHDOG', '1') == '1'
+LOOP_LAG_INTERVAL_MS = float(os.getenv('LOOP_LAG_INTERVAL_MS', '100'))
+LOOP_STALL_MS = float(os.getenv('LOOP_STALL_MS', '250'))
+
+STALL_LOG_SIZE = 50
+STACK_DEPTH = 15
+
+THIS_FILE = os.path.abspath(__file__)
+ROOT = os.path.dirname(THIS_FILE)
+HANDLER_FILES = (os.path.join(ROOT, 'handlers') + os.sep, os.path.join(ROOT, 'bot.py'))
+# Обёртки-замеры не считаются виновниками: за fetchall профилировщика стоит вызов из database.py
+INSTRUMENTATION = {THIS_FILE, os.path.join(ROOT, 'query_profiler.py'), os.path.join(ROOT, 'metrics.py')}
+
+loop_lag = REGISTRY.register(Histogram(
+    'focusup_event_loop_lag_seconds', 'Опоздание пробуждения event loop',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+))
+loop_stalls = REGISTRY.register(Counter(
+    'focusup_event_loop_stalls_total', 'Блокировки event loop дольше LOOP_STALL_MS', ('handler',),
+))
+
+
+def _is_project(filename):
+    return filename.startswith(ROOT) and 'site-packages' not in filename and filename not in INSTRUMENTATION
+
+
+def _where(frame):
+    return f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno} {frame.name}"
+
+
+def describe_stack(frame):
+    """(хендлер, виновник, строки стека) для кадра потока event loop"""
+    stack = traceback.extract_stack(frame)
+    project = [entry for entry in stack if _is_project(entry.filename)]
+    handler = next((entry for entry in project if entry.filename.startswith(HANDLER_FILES)), None)
+    handler_name = None
+    if handler is not None:
+        module = os.path.splitext(os.path.basename(handler.filename))[0]
+        handler_name = f"{module}.{handler.name}"
+    culprit = _where(project[-1]) if project else _where(stack[-1])
+    lines = [_where(entry) + (f"  | {entry.line}" if entry.line else '') for entry in stack[-STACK_DEPTH:]]
+    return handler_name, culprit, lines
+
+
+class LoopWatchdog:
+    def __init__(self, interval_ms=LOOP_LAG_INTERVAL_MS, stall_ms=LOOP_STALL_MS):
+        self.interval = interval_ms / 1000
+        self.stall = stall_ms / 1000
+        self.stalls = deque(maxlen=STALL_LOG_SIZE)
+        self.max_lag = 0.0
+        self._beat = 0.0
+        self._pending = None      # снятый потоком случай, ждущий, пока цикл оживёт
+        self._loop_thread = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Запускает сторож на текущем event loop (из корутины)"""
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        logger.info(f"🐕 Сторож event loop: порог блокировки {self.stall * 1000:.0f} мс")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _tick(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            previous, self._beat = self._beat, now
+            loop_lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            stall, self._pending = self._pending, None
+            # поток мог снять случай уже после того, как цикл ожил, — тогда оценка остаётся его
+            if stall is not None and stall['beat'] == previous:
+                stall['blocked_ms'] = round(lag * 1000, 1)
+                logger.warning(f"🐕 Event loop ожил через {stall['blocked_ms']:.0f} мс "
+                               f"(хендлер: {stall['handler'] or '—'}, {stall['culprit']})")
+
+    def _watch(self):
+        while not self._stop.wait(self.stall / 2):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.stall or (self._pending is not None and self._pending['beat'] == beat):
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            handler, culprit, lines = describe_stack(frame)
+            del frame
+            stall = {
+                'at': time.time(),
+                'beat': beat,
+                'handler': handler,
+                'culprit': culprit,
+                'blocked_ms': round(overdue * 1000, 1),   # уточняется, когда цикл оживёт
+                'stack': lines,
+            }
+            self._pending = stall
+            self.stalls.append(stall)
+            loop_stalls.inc(handler or 'unknown')
+            logger.warning(f"🐕 Event loop заблокирован дольше {overdue * 1000:.0f} мс "
+                           f"в {handler or 'коде вне хендлеров'}: {culprit}\n   " + '\n   '.join(lines))
+
+    def report(self) -> dict:
+        return {
+            'stall_ms': self.stall * 1000,
+            'max_lag_ms': round(self.max_lag * 1000, 1),
+            'stalls': [{k: v for k, v in stall.items() if k != 'beat'} for stall in self.stalls],
+        }
+
+
+watchdog = LoopWatchdog()
+
+
+def start():
+    """watchdog.start(), если сторож не выключен LOOP_WATCHDOG=0"""
+    if LOOP_WATCHDOG:
+        watchdog.start()
@@ -0,0 +1,324 @@
+"""
+Метрики в текстовом формате Prometheus (/metrics).
+
+Свой маленький реестр без внешних зависимостей: Counter и Histogram с
+метками обновляются на горячем пути (лок и bisect — доли микросекунды),
+а всё, что модули уже считают сами (stats() очередей, кэшей, FSM,
+профилировщика SQL), снимается коллекторами только в момент опроса.
+
+Что собирается:
+- время хендлеров бота по роутеру и функции (HandlerMetricsMiddleware);
+- задержка и статусы запросов к OpenAI/Whisper (трассировка общей
+  HTTP-сессии, http_client.py);
+- время SQL-запросов по функциям database.py (query_profiler.py);
+- очереди, кэши и хранилища: transcription_queue, TTLCache, кэш разбора
+  дедлайнов, кэш распознаваний; в боте ещё Pomodoro, FSM и лимитер Telegram.
+"""
+import bisect
+import logging
+import math
+import threading
+import time
+
+import aiohttp
+from aiogram import BaseMiddleware
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Границы корзин по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # метки -> [счётчики корзин (последняя — +Inf), сумма]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        yield from render_histogram(self.name, self.documentation, self.labelnames, self.buckets, series)
+
+
+def render_histogram(name, documentation, labelnames, buckets, series):
+    """series — [(метки, счётчики по корзинам + последняя для +Inf, сумма)], счётчики не накопленные"""
+    yield f'# HELP {name} {documentation}'
+    yield f'# TYPE {name} histogram'
+    for labels, counts, total in series:
+        cumulative = 0
+        for bound, count in zip((*buckets, math.inf), counts):
+            cumulative += count
+            le = 'le="%s"' % _number(float(bound))
+            yield f'{name}_bucket{_labels(labelnames, labels, le)} {cumulative}'
+        yield f'{name}_sum{_labels(labelnames, labels)} {_number(total)}'
+        yield f'{name}_count{_labels(labelnames, labels)} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """func() -> строки в формате Prometheus; вызывается при каждом опросе"""
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning(f"⚠️ Коллектор метрик {getattr(collector, '__name__', collector)}: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+handler_seconds = REGISTRY.register(Histogram(
+    'focusup_handler_seconds', 'Время обработки апдейта хендлером бота', ('router', 'handler', 'event'),
+))
+handler_errors = REGISTRY.register(Counter(
+    'focusup_handler_errors_total', 'Исключения в хендлерах бота', ('router', 'handler'),
+))
+upstream_seconds = REGISTRY.register(Histogram(
+    'focusup_upstream_seconds', 'Задержка внешних HTTP-запросов до заголовков ответа', ('service',),
+))
+upstream_responses = REGISTRY.register(Counter(
+    'focusup_upstream_responses_total', 'Ответы внешних сервисов по статусу', ('service', 'status'),
+))
+
+
+def stats_lines(prefix, stats: dict, counters=(), documentation='', label=None):
+    """
+    Словарь stats() → показатели focusup_<prefix>_<ключ>; ключи из counters —
+    накопительные счётчики (суффикс _total). С label stats — {значение метки: stats()}
+    """
+    rows = stats.items() if label else [(None, stats)]
+    families = {}
+    for value, row in rows:
+        for key, number in row.items():
+            if isinstance(number, (int, float)) and not isinstance(number, bool):
+                families.setdefault(key, []).append((value, number))
+    for key, samples in families.items():
+        kind = 'counter' if key in counters else 'gauge'
+        name = f'focusup_{prefix}_{key}' + ('_total' if kind == 'counter' else '')
+        yield f'# HELP {name} {documentation or prefix} {key}'
+        yield f'# TYPE {name} {kind}'
+        for value, number in samples:
+            labels = _labels((label,), (value,)) if label else ''
+            yield f'{name}{labels} {_number(number)}'
+
+
+def gauge_lines(name, documentation, value):
+    yield f'# HELP {name} {documentation}'
+    yield f'# TYPE {name} gauge'
+    yield f'{name} {_number(value)}'
+
+
+# --------- ХЕНДЛЕРЫ БОТА ---------
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware диспетчера: dp.message.middleware(handler_metrics).
+    Роутер — модуль хендлера (tasks, kalendar, ... или bot), хендлер — имя функции
+    """
+
+    async def __call__(self, handler, event, data):
+        callback = data['handler'].callback
+        router = callback.__module__.rpartition('.')[2]
+        name = getattr(callback, '__name__', 'handler')
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors.inc(router, name)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, router, name, type(event).__name__)
+
+
+handler_metrics = HandlerMetricsMiddleware()
+
+
+# --------- ВНЕШНИЕ ЗАПРОСЫ ---------
+
+def _service(url) -> str:
+    path = url.path
+    if path.endswith('/audio/transcriptions'):
+        return 'whisper'
+    if path.endswith('/chat/completions'):
+        return 'openai_chat'
+    return url.host or 'unknown'
+
+
+async def _on_request_start(session, context, params):
+    context.started = time.perf_counter()
+
+
+async def _on_request_end(session, context, params):
+    service = _service(params.url)
+    upstream_seconds.observe(time.perf_counter() - context.started, service)
+    upstream_responses.inc(service, str(params.response.status))
+
+
+async def _on_request_exception(session, context, params):
+    service = _service(params.url)
+    upstream_seconds.observe(time.perf_counter() - context.started, service)
+    upstream_responses.inc(service, type(params.exception).__name__)
+
+
+def http_trace_config() -> aiohttp.TraceConfig:
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(_on_request_start)
+    trace.on_request_end.append(_on_request_end)
+    trace.on_request_exception.append(_on_request_exception)
+    return trace
+
+
+# --------- КОЛЛЕКТОРЫ ---------
+
+@REGISTRY.collector
+def _db_queries():
+    from query_profiler import BUCKETS_MS, profiler
+
+    series = [
+        ((caller,), buckets, seconds)
+        for caller, (buckets, seconds) in sorted(profiler.by_caller().items())
+    ]
+    bounds = [bound / 1000 for bound in BUCKETS_MS[:-1]]
+    return render_histogram('focusup_db_query_seconds', 'Время SQL-запросов по функциям database.py',
+                            ('caller',), bounds, series)
+
+
+@REGISTRY.collector
+def _caches():
+    import deadlines
+    import ttl_cache
+    from voice_recognition import voice_recognizer
+
+    info = deadlines.cache_info()
+    yield from stats_lines('deadline_cache', {'hits': info.hits, 'misses': info.misses, 'entries': info.currsize},
+                           counters=('hits', 'misses'), documentation='Кэш разбора дедлайнов:')
+    yield from stats_lines('transcription_cache', voice_recognizer.cache_stats(), counters=('hits', 'misses'),
+                           documentation='Кэш распознанных голосовых:')
+    yield from stats_lines('ttl_cache', ttl_cache.all_stats(), counters=('evictions', 'expirations'),
+                           documentation='Состояние пользователей в памяти:', label='cache')
+
+
+@REGISTRY.collector
+def _transcription_queue():
+    from transcription_queue import transcription_queue
+
+    return stats_lines('transcription_queue', transcription_queue.stats(),
+                       counters=('submitted', 'completed', 'failed', 'rejected'),
+                       documentation='Очередь распознавания:')
+
+
+def register_bot_collectors(storage=None):
+    """Показатели процесса бота: Pomodoro, напоминания, FSM, лимитер Telegram"""
+
+    @REGISTRY.collector
+    def _bot():
+        from handlers.pomodoro import active_timers
+        from reminders import reminder_scheduler
+        from telegram_limiter import telegram_limiter
+
+        yield from gauge_lines('focusup_pomodoro_active_timers', 'Запущенные таймеры Pomodoro', len(active_timers))
+        yield from stats_lines('telegram_limiter', telegram_limiter.stats(),
+                               counters=('sent', 'coalesced', 'retried', 'dropped'),
+                               documentation='Лимитер исходящих запросов Telegram:')
+        yield from stats_lines('reminders', reminder_scheduler.stats(),
+                               counters=('loaded', 'sent', 'skipped', 'failed'),
+                               documentation='Напоминания о дедлайнах:')
+        if storage is not None and hasattr(storage, 'stats'):
+            yield from stats_lines('fsm', storage.stats(), counters=('hits', 'misses', 'writes', 'purged'),
+                                   documentation='Хранилище состояний FSM:')
+
+
+# --------- HTTP ---------
+
+async def metrics_handler(request):
+    """/metrics для aiohttp-приложений (api_web, webhook, отдельный сервер бота)"""
+    from aiohttp import web
+    from api_common import metrics_denied
+
+    denied = metrics_denied(request.headers.get('Authorization'))
+    if denied:
+        return web.Response(status=denied, text='Unauthorized' if denied == 401 else 'Not Found')
+    return web.Response(body=REGISTRY.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+
+async def start_metrics_server(host, port):
+    """Отдельный /metrics для бота в режиме polling без встроенного API"""
+    from aiohttp import web
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 Метрики: http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,225 @@
+"""
+Разбор русской фразы в задачу: дата, время, приоритет, категория и название.
+
+Один предкомпилированный регэксп-токенизатор проходит строку за один раз
+(re.finditer), без повторной компиляции шаблонов и цепочек re.search /
+strptime на каждый вызов. Используется и API мини-аппы (parse_voice_to_task),
+и ботом (try_create_task_from_text).
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+MONTHS = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+)
+_MONTH_NUMBERS = {name: i for i, name in enumerate(MONTHS, start=1)}
+
+RELATIVE_DAYS = {"сегодня": 0, "завтра": 1, "послезавтра": 2}
+
+# Порядок важен: при нескольких совпадениях побеждает первая категория
+CATEGORY_KEYWORDS = {
+    "work": r"работ\w*|офис\w*|созвон\w*|митинг\w*|совещан\w*|проект\w*|встреч\w*|собрани\w*|звон[оя]к\w*",
+    "study": r"уч[её]б\w*|универ\w*|школ\w*|лекци\w*|семинар\w*|дз|домашк\w*|экзамен\w*|урок\w*",
+    "health": r"здоров\w*|спорт\w*|трениров\w*|зал|врач\w*|клиник\w*|больниц\w*",
+    "personal": r"дом|дома|домой|семь\w*|личн\w*|друз\w*|поездк\w*|покупк\w*|магазин\w*|купить",
+}
+
+# Явные указания категории — вырезаются из названия, в отличие от ключевых слов
+CATEGORY_MARKERS = {
+    "work": r"работе|работа|рабочее",
+    "study": r"уч[её]бе|уч[её]ба",
+    "health": r"здоровью|здоровье",
+    "personal": r"личное",
+}
+
+# Подписи категорий в боте (как в меню выбора категории)
+CATEGORY_LABELS = {
+    "work": "💼 Работа",
+    "study": "🎓 Учеба",
+    "health": "🏋️ Здоровье",
+    "personal": "🏠 Личное",
+    None: "🔧 Другое",
+}
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<period_time>\b(?:в\s*)?(?P<pt_hour>\d{1,2})(?:\s*час(?:а|ов)?)?\s+(?P<pt_period>утра|дня|вечера|ночи)\b)
+  | (?P<colon_time>\b(?:в\s*)?(?P<ct_hour>\d{1,2}):(?P<ct_min>\d{2})\b)
+  | (?P<at_dot_time>\bв\s*(?P<dt_hour>\d{1,2})\.(?P<dt_min>\d{2})\b)
+  | (?P<num_date>\b(?:на\s+)?(?P<nd_day>\d{1,2})[./-](?P<nd_month>\d{1,2})(?:[./-](?P<nd_year>\d{2,4}))?\b)
+  | (?P<month_date>\b(?:на\s+)?(?P<md_day>\d{1,2})\s+(?P<md_month>"""
+    + "|".join(MONTHS)
+    + r""")(?:\s+(?P<md_year>\d{4}))?\b)
+  | (?P<hour_time>\b(?:в\s*(?P<ht_at>\d{1,2})(?:\s*час(?:а|ов)?)?|(?P<ht_hour>\d{1,2})\s*час(?:а|ов)?)\b)
+  | (?P<relative_day>\b(?:на\s+)?(?P<rd_word>послезавтра|завтра|сегодня)\b)
+  | (?P<priority_high>(?:\b(?:высок\w*(?:\s+приоритет\w*)?|срочн\w*|очень\s+важно|самое\s+важное|важн\w*)\b|🔥))
+  | (?P<priority_medium>\b(?:средн\w*|обычн\w*)(?:\s+приоритет\w*)?\b)
+  | (?P<priority_low>\b(?:низк\w*(?:\s+приоритет\w*)?|несрочн\w*|когда-нибудь)\b)
+  | (?P<priority_word>\bприоритет\w*\b)
+  | (?P<category_marker>\b(?:по\s+)?(?:"""
+    + "|".join(f"(?P<cm_{code}>{pattern})" for code, pattern in CATEGORY_MARKERS.items())
+    + r""")\b)
+  | (?P<keyword>\b(?:"""
+    + "|".join(f"(?P<kw_{code}>{pattern})" for code, pattern in CATEGORY_KEYWORDS.items())
+    + r""")\b)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+_SPACES_RE = re.compile(r"\s+")
+_EDGE_PUNCT = " ,.-"
+
+
+@dataclass
+class ParsedPhrase:
+    text: str
+    title: str
+    due_date: date | None = None
+    due_time: str | None = None      # 'HH:MM'
+    category: str | None = None      # work / study / health / personal
+    priority: str | None = None      # low / medium / high
+
+    def deadline_str(self, now: datetime | None = None) -> str | None:
+        """Дедлайн в формате бота 'dd.mm.yy HH:MM' (без времени — 'dd.mm.yy'); время без даты — сегодня"""
+        if self.due_date is None and self.due_time is None:
+            return None
+        day = self.due_date or (now or datetime.now()).date()
+        if self.due_time:
+            return f"{day.strftime('%d.%m.%y')} {self.due_time}"
+        return day.strftime("%d.%m.%y")
+
+    def as_api_dict(self) -> dict:
+        """Формат ответа /api/voice (parsed)"""
+        return {
+            "title": self.title,
+            "date": self.due_date.strftime("%Y-%m-%d") if self.due_date else None,
+            "time": self.due_time,
+            "category": self.category,
+            "priority": self.priority,
+        }
+
+
+def _hour_from_period(hour: int, period: str) -> int | None:
+    if period in ("утра", "ночи"):
+        if hour == 12:
+            return 0
+        return hour if hour < 12 else None
+    # дня / вечера
+    if hour < 12:
+        return hour + 12
+    return hour if hour == 12 else None
+
+
+def _make_date(year: int, month: int, day: int) -> date | None:
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _clock(hour: int, minute: int = 0) -> str | None:
+    if 0 <= hour <= 23 and 0 <= minute <= 59:
+        return f"{hour:02d}:{minute:02d}"
+    return None
+
+
+def parse_phrase(text: str, now: datetime | None = None) -> ParsedPhrase:
+    """Разбирает фразу за один проход токенизатора"""
+    original_text = (text or "").strip()
+    now = now or datetime.now()
+
+    found_date = None
+    found_time = None
+    priority = None
+    categories = set()
+    cut_spans = []
+
+    for m in _TOKEN_RE.finditer(original_text):
+        kind = m.lastgroup
+        if kind == "keyword":
+            for code in CATEGORY_KEYWORDS:
+                if m.group(f"kw_{code}"):
+                    categories.add(code)
+                    break
+            continue
+
+        consumed = True
+        if kind == "period_time":
+            value = _hour_from_period(int(m.group("pt_hour")), m.group("pt_period").lower())
+            clock = _clock(value) if value is not None else None
+            if found_time is None and clock:
+                found_time = clock
+        elif kind == "colon_time":
+            clock = _clock(int(m.group("ct_hour")), int(m.group("ct_min")))
+            if found_time is None and clock:
+                found_time = clock
+        elif kind == "at_dot_time":
+            clock = _clock(int(m.group("dt_hour")), int(m.group("dt_min")))
+            if found_time is None and clock:
+                found_time = clock
+        elif kind == "num_date":
+            day, month, year = m.group("nd_day"), m.group("nd_month"), m.group("nd_year")
+            parsed = _make_date(int(year) if year else now.year, int(month), int(day))
+            if parsed is not None:
+                if found_date is None:
+                    found_date = parsed
+            else:
+                # «9.00» — не дата, а время
+                clock = _clock(int(day), int(month)) if not year and len(month) == 2 else None
+                if clock and found_time is None:
+                    found_time = clock
+                consumed = clock is not None
+        elif kind == "month_date":
+            year = m.group("md_year")
+            parsed = _make_date(
+                int(year) if year else now.year,
+                _MONTH_NUMBERS[m.group("md_month").lower()],
+                int(m.group("md_day")),
+            )
+            if found_date is None and parsed:
+                found_date = parsed
+        elif kind == "hour_time":
+            clock = _clock(int(m.group("ht_at") or m.group("ht_hour")))
+            if found_time is None and clock:
+                found_time = clock
+            consumed = clock is not None
+        elif kind == "relative_day":
+            if found_date is None:
+                found_date = (now + timedelta(days=RELATIVE_DAYS[m.group("rd_word").lower()])).date()
+        elif kind.startswith("priority_") and kind != "priority_word":
+            if priority is None:
+                priority = kind[len("priority_"):]
+        elif kind == "category_marker":
+            for code in CATEGORY_MARKERS:
+                if m.group(f"cm_{code}"):
+                    categories.add(code)
+                    break
+
+        if consumed:
+            cut_spans.append(m.span())
+
+    # Название — исходная фраза без распознанных служебных фрагментов
+    parts = []
+    last = 0
+    for start, end in cut_spans:
+        parts.append(original_text[last:start])
+        last = end
+    parts.append(original_text[last:])
+    title = _SPACES_RE.sub(" ", " ".join(parts)).strip(_EDGE_PUNCT)
+    if not title:
+        title = original_text
+
+    category = next((code for code in CATEGORY_KEYWORDS if code in categories), None)
+
+    return ParsedPhrase(
+        text=original_text,
+        title=title,
+        due_date=found_date,
+        due_time=found_time,
+        category=category,
+        priority=priority,
+    )
@@ -0,0 +1,334 @@
+"""
+Профилировщик SQL-запросов database.py.
+
+database.get_connection() при SQL_PROFILE=1 открывает ProfilingConnection:
+её курсор замеряет каждый оператор (execute и чтение результата до конца)
+и считает возвращённые строки. По каждой паре (функция database.py, SQL)
+копится гистограмма задержек; операторы дольше SQL_SLOW_MS пишутся в лог
+(а с SQL_EXPLAIN_SLOW=1 — вместе с EXPLAIN QUERY PLAN) и в кольцевой список
+последних медленных. Отчёт: profiler.report(), /api/metrics/sql (только
+при заданном METRICS_TOKEN) и
+
+    python query_profiler.py --url http://localhost:8888/api/metrics/sql --token $METRICS_TOKEN
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Как и database.py, читаем окружение напрямую, без config (тому нужен BOT_TOKEN)
+SQL_PROFILE = os.getenv('SQL_PROFILE', '1') == '1'
+SQL_SLOW_MS = float(os.getenv('SQL_SLOW_MS', '100'))
+SQL_EXPLAIN_SLOW = os.getenv('SQL_EXPLAIN_SLOW', '0') == '1'
+
+# Верхние границы корзин гистограммы, мс
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+# Сколько последних медленных запросов держать для отчёта
+SLOW_LOG_SIZE = 100
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    return ' '.join(sql.split())
+
+
+def _caller():
+    """Имя функции, вызвавшей курсор (первый кадр вне этого модуля)"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else '?'
+
+
+class _Statement:
+    __slots__ = ('count', 'seconds', 'max_seconds', 'rows', 'errors', 'buckets', 'plan')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.plan = None
+
+    def percentile_ms(self, p):
+        """Верхняя граница корзины, в которую попадает p-й процентиль"""
+        rank = self.count * p / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return bound if bound != float('inf') else round(self.max_seconds * 1000, 3)
+        return 0.0
+
+
+class QueryProfiler:
+    def __init__(self, enabled=SQL_PROFILE, slow_ms=SQL_SLOW_MS, explain_slow=SQL_EXPLAIN_SLOW):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.explain_slow = explain_slow
+        self.started_at = time.time()
+        self._statements = {}      # (функция, SQL) -> _Statement
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()   # запросы идут из пула потоков async_database
+
+    def record(self, caller, sql, parameters, seconds, rows, error, database_path):
+        sql = normalize_sql(sql)
+        ms = seconds * 1000
+        bucket = next(i for i, bound in enumerate(BUCKETS_MS) if ms <= bound)
+        with self._lock:
+            stats = self._statements.get((caller, sql))
+            if stats is None:
+                stats = self._statements[(caller, sql)] = _Statement()
+            stats.count += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += rows
+            stats.errors += error
+            stats.buckets[bucket] += 1
+            need_plan = self.explain_slow and stats.plan is None
+        if ms < self.slow_ms:
+            return
+
+        plan = None
+        if need_plan:
+            plan = stats.plan = _explain(database_path, sql, parameters)
+        logger.warning(f"🐢 Медленный запрос {ms:.1f} мс в {caller} (строк: {rows}): {sql}"
+                       + (f"\n   план: {plan}" if plan else ""))
+        self._slow.append({
+            'at': time.time(),
+            'caller': caller,
+            'sql': sql,
+            'ms': round(ms, 3),
+            'rows': rows,
+            'plan': stats.plan,
+        })
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+
+    def by_caller(self) -> dict:
+        """функция -> (корзины гистограммы, суммарные секунды) по всем её запросам"""
+        totals = {}
+        with self._lock:
+            for (caller, _), stats in self._statements.items():
+                buckets, seconds = totals.get(caller, ([0] * len(BUCKETS_MS), 0.0))
+                totals[caller] = ([a + b for a, b in zip(buckets, stats.buckets)], seconds + stats.seconds)
+        return totals
+
+    def report(self) -> dict:
+        with self._lock:
+            items = list(self._statements.items())
+        statements = []
+        for (caller, sql), stats in sorted(items, key=lambda item: -item[1].seconds):
+            statements.append({
+                'caller': caller,
+                'sql': sql,
+                'count': stats.count,
+                'errors': stats.errors,
+                'total_ms': round(stats.seconds * 1000, 3),
+                'mean_ms': round(stats.seconds * 1000 / stats.count, 3),
+                'p50_ms': stats.percentile_ms(50),
+                'p99_ms': stats.percentile_ms(99),
+                'max_ms': round(stats.max_seconds * 1000, 3),
+                'rows': stats.rows,
+                'histogram': {str(bound): count for bound, count in zip(BUCKETS_MS, stats.buckets) if count},
+                'plan': stats.plan,
+            })
+        return {
+            'enabled': self.enabled,
+            'slow_ms': self.slow_ms,
+            'since': self.started_at,
+            'statements': statements,
+            'slow': list(self._slow),
+        }
+
+
+def _explain(database_path, sql, parameters):
+    """EXPLAIN QUERY PLAN в отдельном соединении (исходное к этому времени уже закрыто)"""
+    if not sql.upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+        return None
+    try:
+        conn = sqlite3.connect(database_path, timeout=1)
+        try:
+            return [row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', parameters or ())]
+        finally:
+            conn.close()
+    except Exception as e:
+        return [f'не удалось получить план: {e}']
+
+
+profiler = QueryProfiler()
+
+
+# --------- СОЕДИНЕНИЕ И КУРСОР ---------
+
+class ProfilingCursor(sqlite3.Cursor):
+    """
+    Оператор замеряется от execute до окончания чтения результата: fetchall,
+    fetchone, вернувший None, следующий execute или сборка курсора
+    """
+    _pending = None   # [функция, SQL, параметры, секунды, строки, ошибка]
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        caller = _caller()
+        started = time.perf_counter()
+        error = True
+        try:
+            super().execute(sql, parameters)
+            error = False
+            return self
+        finally:
+            self._pending = [caller, sql, parameters, time.perf_counter() - started, 0, error]
+            if error:
+                self._finish()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        caller = _caller()
+        started = time.perf_counter()
+        error = True
+        try:
+            super().executemany(sql, seq_of_parameters)
+            error = False
+            return self
+        finally:
+            rows = max(self.rowcount, 0)
+            self._pending = [caller, sql, (), time.perf_counter() - started, rows, error]
+            self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        pending = self._pending
+        if pending is not None:
+            pending[3] += time.perf_counter() - started
+            if row is None:
+                self._finish()
+            else:
+                pending[4] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        pending = self._pending
+        if pending is not None:
+            pending[3] += time.perf_counter() - started
+            pending[4] += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        pending = self._pending
+        if pending is not None:
+            pending[3] += time.perf_counter() - started
+            pending[4] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def _finish(self):
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        caller, sql, parameters, seconds, rows, error = pending
+        if not error and rows == 0 and self.rowcount > 0:
+            rows = self.rowcount   # UPDATE/DELETE: затронутые строки
+        profiler.record(caller, sql, parameters, seconds, rows, error, self.connection.database_path)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.database_path = database
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or ProfilingCursor)
+
+    # Connection.execute в sqlite3 создаёт обычный курсор в обход cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# --------- ОТЧЁТ В КОНСОЛИ ---------
+
+def format_report(report, top=20, sort='total_ms'):
+    lines = [f"{'функция':<28} {'вызовов':>8} {'всего мс':>10} {'p50':>7} {'p99':>7} {'max мс':>9} "
+             f"{'строк/выз':>9}  SQL"]
+    statements = sorted(report['statements'], key=lambda s: -s[sort])[:top]
+    for s in statements:
+        lines.append(f"{s['caller'][:28]:<28} {s['count']:>8} {s['total_ms']:>10.1f} {s['p50_ms']:>7} "
+                     f"{s['p99_ms']:>7} {s['max_ms']:>9.1f} {s['rows'] / s['count']:>9.1f}  {s['sql'][:80]}")
+    if report['slow']:
+        lines.append('')
+        lines.append(f"Медленные (> {report['slow_ms']} мс), последние {len(report['slow'])}:")
+        for entry in report['slow'][-top:]:
+            when = time.strftime('%H:%M:%S', time.localtime(entry['at']))
+            lines.append(f"  {when} {entry['ms']:>9.1f} мс {entry['caller']}: {entry['sql'][:100]}")
+            for step in entry.get('plan') or []:
+                lines.append(f"      {step}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Отчёт профилировщика SQL')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--url', help='адрес /api/metrics/sql работающего API')
+    source.add_argument('--file', help='JSON, сохранённый с --json')
+    parser.add_argument('--token', help='METRICS_TOKEN сервера')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--sort', choices=('total_ms', 'p99_ms', 'max_ms', 'count', 'rows'), default='total_ms')
+    parser.add_argument('--json', help='сохранить отчёт в файл')
+    args = parser.parse_args()
+
+    if args.url:
+        import urllib.request
+
+        request = urllib.request.Request(args.url)
+        if args.token:
+            request.add_header('Authorization', f'Bearer {args.token}')
+        with urllib.request.urlopen(request, timeout=10) as response:
+            report = json.load(response)
+    else:
+        with open(args.file, encoding='utf-8') as f:
+            report = json.load(f)
+
+    print(format_report(report, args.top, args.sort))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
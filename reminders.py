@@ -0,0 +1,166 @@
+"""
+Напоминания о дедлайнах задач.
+
+Планировщик не опрашивает пользователей: раз в REMINDER_RESCAN_SECONDS он
+читает по индексу idx_tasks_deadline_ts только задачи с дедлайном в
+ближайшие REMINDER_LEAD_MINUTES + REMINDER_WINDOW_MINUTES и кладёт их в кучу
+по моменту напоминания (дедлайн минус REMINDER_LEAD_MINUTES). Стоимость
+перечитывания зависит от числа задач в окне, а не от размера таблицы;
+перечитывание же подхватывает задачи, созданные или перенесённые уже после
+загрузки окна (с опозданием не больше REMINDER_RESCAN_SECONDS).
+
+Перед отправкой напоминание «захватывается» в sent_reminders одним INSERT,
+который заодно проверяет, что задача не выполнена и дедлайн не менялся.
+Поэтому ни перезапуск, ни несколько процессов бота не шлют его дважды;
+цена — при падении между захватом и отправкой напоминание теряется.
+Отправки идут через свой токен-бакет (REMINDER_RATE в секунду), чтобы
+волна напоминаний (например, дедлайны без времени в DATE_ONLY_TIME) не
+съедала общий лимит Telegram у живых ответов бота.
+"""
+import asyncio
+import heapq
+import logging
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+import async_database as db
+from config import REMINDER_LEAD_MINUTES, REMINDER_RATE, REMINDER_RESCAN_SECONDS, REMINDER_WINDOW_MINUTES
+from deadlines import deadline_has_time, wall_clock_ts
+from telegram_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Строк за один запрос при чтении окна
+PAGE_SIZE = 1000
+
+
+def reminder_text(title, deadline) -> str:
+    if deadline_has_time(deadline):
+        return f"⏰ Напоминание: «{title}» — дедлайн {deadline}"
+    return f"⏰ Сегодня дедлайн: «{title}» ({deadline})"
+
+
+def reminder_keyboard(task_id) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text="✅ Выполнить", callback_data=f"complete_task_{task_id}"),
+        InlineKeyboardButton(text="👁 Открыть", callback_data=f"view_task_{task_id}"),
+    ]])
+
+
+class ReminderScheduler:
+    def __init__(self, lead_minutes=REMINDER_LEAD_MINUTES, window_minutes=REMINDER_WINDOW_MINUTES,
+                 rescan_seconds=REMINDER_RESCAN_SECONDS, rate=REMINDER_RATE, page_size=PAGE_SIZE,
+                 clock=wall_clock_ts):
+        self.lead = lead_minutes * 60
+        self.window = window_minutes * 60
+        self.rescan = rescan_seconds
+        self.page_size = page_size
+        self.clock = clock
+        self.bucket = TokenBucket(rate, max(1.0, rate))
+        self.send = None
+
+        self._heap = []           # (момент напоминания, deadline_ts, task_id, telegram_id, title, deadline)
+        self._scheduled = set()   # (task_id, deadline_ts) в куче
+        self._task = None
+
+        self.loaded = 0
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def start(self, bot):
+        """Запускает планировщик на текущем event loop; напоминания уходят через bot.send_message"""
+        if self._task is not None and not self._task.done():
+            return
+
+        async def send(chat_id, text, reply_markup):
+            await bot.send_message(chat_id, text, reply_markup=reply_markup)
+
+        self.send = send
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"⏰ Напоминания: за {self.lead // 60} мин до дедлайна, не больше {self.bucket.rate:g} в секунду")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def refill(self, now=None) -> int:
+        """Дочитывает в кучу задачи с дедлайном в ближайшем окне; возвращает, сколько добавлено"""
+        now = self.clock() if now is None else now
+        until = now + self.lead + self.window
+        after = (0, 0)
+        added = 0
+        while True:
+            rows = await db.get_due_reminders(now, until, after, self.page_size)
+            for task_id, deadline_ts, telegram_id, title, deadline in rows:
+                if (task_id, deadline_ts) in self._scheduled:
+                    continue
+                self._scheduled.add((task_id, deadline_ts))
+                heapq.heappush(self._heap, (deadline_ts - self.lead, deadline_ts, task_id, telegram_id, title, deadline))
+                added += 1
+            if len(rows) < self.page_size:
+                break
+            after = (rows[-1][1], rows[-1][0])
+        self.loaded += added
+        return added
+
+    async def _run(self):
+        next_refill = 0
+        while True:
+            now = self.clock()
+            if now >= next_refill:
+                try:
+                    await self.refill(now)
+                except Exception as e:
+                    logger.error(f"❌ Ошибка при чтении напоминаний: {e}")
+                next_refill = now + self.rescan
+
+            while self._heap and self._heap[0][0] <= now < next_refill:
+                entry = heapq.heappop(self._heap)
+                self._scheduled.discard((entry[2], entry[1]))
+                await self._deliver(entry)
+                now = self.clock()
+
+            delay = next_refill - now
+            if self._heap:
+                delay = min(delay, self._heap[0][0] - now)
+            await asyncio.sleep(max(0.05, delay))
+
+    async def _deliver(self, entry):
+        _, deadline_ts, task_id, telegram_id, title, deadline = entry
+        if not await db.claim_reminder(task_id, deadline_ts):
+            self.skipped += 1
+            return
+
+        wait = self.bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            await self.send(telegram_id, reminder_text(title, deadline), reminder_keyboard(task_id))
+            self.sent += 1
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # бот заблокирован или чат недоступен — повторять бессмысленно
+            self.failed += 1
+            logger.debug("Напоминание о задаче %s не доставлено: %s", task_id, e)
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"⚠️ Ошибка при отправке напоминания о задаче {task_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'scheduled': len(self._heap),
+            'loaded': self.loaded,
+            'sent': self.sent,
+            'skipped': self.skipped,
+            'failed': self.failed,
+        }
+
+
+reminder_scheduler = ReminderScheduler()
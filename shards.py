@@ -0,0 +1,275 @@
+"""
+Шардирование бота по процессам: python shards.py
+
+Супервизор сам получает апдейты (long polling или webhook, как BOT_MODE) и
+раздаёт их BOT_SHARDS процессам-воркерам. Каждый воркер — полноценный бот
+со своим Dispatcher из bot.py, так что GIF, разбор фраз и JSON считаются на
+нескольких ядрах. Шард выбирается консистентным хешированием по chat id:
+все апдейты чата попадают в один процесс — там живут его таймеры Pomodoro и
+кэш FSM, а внутри процесса апдейты одного чата обрабатываются строго по
+очереди. При изменении числа шардов переезжает лишь малая часть чатов.
+Общая БД — SQLite в режиме WAL с busy_timeout.
+"""
+import asyncio
+import bisect
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import queue
+
+from config import (
+    BOT_TOKEN, BOT_MODE, BOT_SHARDS, REMINDERS_ENABLED, RUN_API_IN_BOT, TELEGRAM_API_URL, TELEGRAM_API_LOCAL,
+    TG_GLOBAL_RATE, WEBHOOK_PATH, WEBHOOK_HOST, WEBHOOK_PORT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Точек на кольце на один шард: чем больше, тем ровнее раскладка чатов
+VIRTUAL_NODES = 64
+
+# Сколько апдейтов может ждать в очереди одного воркера
+WORKER_QUEUE_MAX = 10_000
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, shards, virtual_nodes=VIRTUAL_NODES):
+        points = sorted(
+            (_hash(f"shard-{shard}-{node}"), shard)
+            for shard in range(shards)
+            for node in range(virtual_nodes)
+        )
+        self._points = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, chat_id) -> int:
+        index = bisect.bisect(self._points, _hash(str(chat_id))) % len(self._points)
+        return self._shards[index]
+
+
+def update_chat_id(update: dict):
+    """Ключ шардирования: id чата апдейта, без чата — id пользователя"""
+    for field, value in update.items():
+        if field == "update_id" or not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = value.get("from") or value.get("user")
+        if user:
+            return user["id"]
+    return update.get("update_id", 0)
+
+
+# --------- ВОРКЕР ---------
+
+def _worker_process(index, shards, queue):
+    from log_setup import TEXT_FORMAT, setup_logging
+    setup_logging(fmt=f"[shard {index}] {TEXT_FORMAT}")
+    asyncio.run(_worker_main(index, shards, queue))
+
+
+async def _handle_in_order(dp, bot, update, previous):
+    if previous is not None:
+        await asyncio.wait([previous])
+    try:
+        await dp.feed_raw_update(bot, update)
+    except Exception as e:
+        logger.error(f"❌ Ошибка обработки апдейта {update.get('update_id')}: {e}")
+
+
+async def _worker_main(index, shards, queue):
+    import bot as bot_module
+    import loop_watchdog
+    from http_client import close_session
+    from reminders import reminder_scheduler
+    from telegram_limiter import telegram_limiter, TokenBucket
+    from transcription_queue import transcription_queue
+
+    # Общий лимит Telegram на бота делится между шардами
+    share = TG_GLOBAL_RATE / shards
+    telegram_limiter.global_bucket = TokenBucket(share, share)
+
+    dp, bot = bot_module.dp, bot_module.bot
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    logger.info(f"🧩 Шард {index + 1}/{shards} запущен")
+    loop_watchdog.start()
+    # Напоминания шлёт один шард: захват в sent_reminders и так не даст дублей,
+    # но остальным незачем читать то же окно
+    if REMINDERS_ENABLED and index == 0:
+        reminder_scheduler.start(bot)
+
+    loop = asyncio.get_running_loop()
+    last_by_chat = {}   # chat id -> задача последнего апдейта чата
+
+    def forget(chat_id, task):
+        if last_by_chat.get(chat_id) is task:
+            del last_by_chat[chat_id]
+
+    try:
+        while True:
+            update = await loop.run_in_executor(None, queue.get)
+            if update is None:
+                break
+            chat_id = update_chat_id(update)
+            task = asyncio.create_task(_handle_in_order(dp, bot, update, last_by_chat.get(chat_id)))
+            last_by_chat[chat_id] = task
+            task.add_done_callback(lambda t, c=chat_id: forget(c, t))
+        if last_by_chat:
+            await asyncio.wait(list(last_by_chat.values()))
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await reminder_scheduler.stop()
+        await loop_watchdog.watchdog.stop()
+        await transcription_queue.stop()
+        await close_session()
+        await bot.session.close()
+
+
+# --------- СУПЕРВИЗОР ---------
+
+class ShardSupervisor:
+    def __init__(self, shards=BOT_SHARDS):
+        self.shards = shards
+        self.ring = HashRing(shards)
+        # spawn: воркер импортирует bot.py с нуля, без состояния супервизора
+        self._context = multiprocessing.get_context("spawn")
+        self.queues = [self._context.Queue(WORKER_QUEUE_MAX) for _ in range(shards)]
+        self.processes = [None] * shards
+        self.routed = [0] * shards
+        self.dropped = 0
+        self.restarts = 0
+
+    def _start_worker(self, index):
+        process = self._context.Process(
+            target=_worker_process,
+            args=(index, self.shards, self.queues[index]),
+            name=f"focusup-shard-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(self.shards):
+            self._start_worker(index)
+        logger.info(f"🧩 Запущено шардов: {self.shards}")
+
+    def route(self, update: dict):
+        index = self.ring.shard_for(update_chat_id(update))
+        if not self.processes[index].is_alive():
+            logger.error(f"❌ Шард {index} упал, перезапускаю (его таймеры потеряны)")
+            self.restarts += 1
+            self._start_worker(index)
+        try:
+            self.queues[index].put_nowait(update)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"⚠️ Очередь шарда {index} переполнена, апдейт {update.get('update_id')} пропущен")
+            return
+        self.routed[index] += 1
+
+    def stop(self, timeout=10):
+        for worker_queue in self.queues:
+            worker_queue.put(None)
+        for process in self.processes:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    async def run_polling(self, bot):
+        from aiogram.dispatcher.dispatcher import DEFAULT_BACKOFF_CONFIG
+        from aiogram.exceptions import TelegramRetryAfter
+        from aiogram.utils.backoff import Backoff
+
+        # Как dp.start_polling: сбой сети или 5xx не должен ронять супервизор и все шарды
+        backoff = Backoff(DEFAULT_BACKOFF_CONFIG)
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30)
+            except TelegramRetryAfter as e:
+                logger.warning(f"⏳ getUpdates: Telegram просит подождать {e.retry_after} с")
+                await asyncio.sleep(e.retry_after)
+                continue
+            except Exception as e:
+                logger.error(f"❌ Ошибка getUpdates ({type(e).__name__}: {e}), повтор через {backoff.next_delay:.1f} с")
+                await backoff.asleep()
+                continue
+            if backoff.counter:
+                logger.info(f"✅ Связь с Telegram восстановлена после {backoff.counter} попыток")
+                backoff.reset()
+            for update in updates:
+                offset = update.update_id + 1
+                self.route(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+
+    async def run_webhook(self, bot):
+        from aiohttp import web
+        from webhook import webhook_secret, register_webhook
+
+        secret = webhook_secret()
+
+        async def receive(request: web.Request):
+            if not hmac.compare_digest(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), secret):
+                return web.Response(status=401)
+            self.route(await request.json())
+            return web.Response()
+
+        if RUN_API_IN_BOT:
+            from api_web import create_app
+            app = create_app()
+        else:
+            app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, receive)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+            logger.info(f"🌐 Webhook супервизора слушает http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+            await register_webhook(bot)
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+async def main():
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from database import init_db
+
+    init_db()
+    supervisor = ShardSupervisor()
+    supervisor.start()
+
+    # Супервизору нужен только клиент Bot API, без диспетчера и хендлеров
+    if TELEGRAM_API_URL:
+        bot = Bot(token=BOT_TOKEN, session=AiohttpSession(
+            api=TelegramAPIServer.from_base(TELEGRAM_API_URL, is_local=TELEGRAM_API_LOCAL)
+        ))
+    else:
+        bot = Bot(token=BOT_TOKEN)
+    try:
+        if BOT_MODE == "webhook":
+            await supervisor.run_webhook(bot)
+        else:
+            await supervisor.run_polling(bot)
+    finally:
+        supervisor.stop()
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    from log_setup import setup_logging
+    setup_logging()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🛑 Бот остановлен пользователем")
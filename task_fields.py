@@ -0,0 +1,59 @@
+"""
+Нормализация полей задачи (категория, дедлайн, приоритет).
+
+Вызывается при записи в database.py, поэтому в БД лежат уже приведённые
+значения и API отдаёт строки без разбора на каждый запрос.
+"""
+from deadlines import parse_deadline, deadline_has_time, format_deadline
+
+PRIORITIES = ("low", "medium", "high")
+
+
+def normalize_category(cat: str | None) -> str:
+    """Переводим старые русские категории в кодовые (work/personal/study/health)"""
+    if not cat:
+        return "personal"
+    c = str(cat).lower()
+    if c in {"work", "personal", "study", "health"}:
+        return c
+    if "работ" in c:
+        return "work"
+    if "учеб" in c or "учёб" in c:
+        return "study"
+    if "здоров" in c:
+        return "health"
+    return "personal"
+
+
+def normalize_deadline(deadline: str | None) -> str | None:
+    """
+    Приводим deadline к формату 'dd.mm.yy HH:MM',
+    чтобы всё было как у задач из бота. Дату без времени и незнакомые
+    строки оставляем как есть.
+    """
+    if not deadline:
+        return None
+
+    dt = parse_deadline(deadline)
+    if dt is None or not deadline_has_time(deadline):
+        return deadline
+    return format_deadline(dt)
+
+
+def priority_from_tags(tags: str | None) -> str:
+    """Достаём приоритет из поля tags, если оно используется, иначе medium"""
+    if not tags:
+        return "medium"
+    t = str(tags).lower()
+    if "high" in t or "высок" in t or "3" == t.strip():
+        return "high"
+    if "low" in t or "низк" in t or "1" == t.strip():
+        return "low"
+    return "medium"
+
+
+def normalize_priority(priority: str | None, tags: str | None = None) -> str:
+    """Явный приоритет, если он корректный, иначе — из tags (как раньше делал API)"""
+    if priority in PRIORITIES:
+        return priority
+    return priority_from_tags(tags)
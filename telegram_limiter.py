@@ -0,0 +1,160 @@
+"""
+Ограничитель исходящих запросов к Bot API (middleware сессии aiogram).
+
+Telegram пропускает около 30 сообщений в секунду на бота и около одного в
+секунду на чат, а сверх этого отвечает 429. Все отправки и правки сообщений
+проходят через два токен-бакета — общий и бакет чата — и ждут своей очереди
+вместо того, чтобы получить ошибку. Правки одного сообщения, ещё ждущие
+очереди, схлопываются: уходит только последняя, а все вызывающие получают
+её результат (тик таймера Pomodoro, заставший в очереди предыдущий тик,
+не отправляет устаревший текст). На RetryAfter запрос повторяется после
+указанной паузы, а чат (или весь бот) до её окончания не получает токенов.
+"""
+import asyncio
+import logging
+import time
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from config import TG_GLOBAL_RATE, TG_CHAT_RATE, TG_CHAT_BURST, TG_MAX_RETRIES
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Методы, на которые распространяются лимиты Telegram
+_LIMITED_PREFIXES = ("send", "edit", "copy", "forward")
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self) -> float:
+        """Берёт токен (при нехватке — в долг) и возвращает, сколько ждать до его появления"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def block(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class TelegramRateLimiter(BaseRequestMiddleware):
+    def __init__(self, global_rate=TG_GLOBAL_RATE, chat_rate=TG_CHAT_RATE, chat_burst=TG_CHAT_BURST,
+                 max_retries=TG_MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets = TTLCache('telegram_chat_buckets', ttl_seconds=600, max_size=100_000)
+
+        # (метод, чат, сообщение) -> [последний метод, задача отправки, число присоединившихся]
+        self._pending_edits = {}
+
+        self.queued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def _wait_turn(self, chat_id):
+        self.queued += 1
+        try:
+            if chat_id is not None:
+                wait = self._chat_bucket(chat_id).reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            wait = self.global_bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        finally:
+            self.queued -= 1
+
+    async def __call__(self, make_request, bot, method):
+        api_method = getattr(method, "__api_method__", "")
+        if not api_method.startswith(_LIMITED_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        if not api_method.startswith("edit"):
+            await self._wait_turn(chat_id)
+            return await self._send(make_request, bot, method, chat_id)
+
+        edit_key = (api_method, chat_id, getattr(method, "message_id", None), getattr(method, "inline_message_id", None))
+        slot = self._pending_edits.get(edit_key)
+        if slot is not None:
+            # Правка ещё в очереди — заменяем её своей и ждём общий результат
+            slot[0] = method
+            slot[2] += 1
+            self.coalesced += 1
+            return await asyncio.shield(slot[1])
+
+        # Правку отправляет отдельная задача: если вызвавшего отменят (stop_pomodoro
+        # отменяет таймер, чей тик ждёт очереди), присоединившиеся всё равно получат
+        # результат, а до Telegram дойдёт последняя правка
+        slot = self._pending_edits[edit_key] = [method, None, 0]
+        slot[1] = asyncio.ensure_future(self._send_edit(make_request, bot, edit_key, slot, chat_id))
+        try:
+            return await asyncio.shield(slot[1])
+        except asyncio.CancelledError:
+            if not slot[2]:
+                # никто не присоединился — правка больше никому не нужна
+                if self._pending_edits.get(edit_key) is slot:
+                    del self._pending_edits[edit_key]
+                slot[1].cancel()
+            raise
+
+    async def _send_edit(self, make_request, bot, edit_key, slot, chat_id):
+        try:
+            await self._wait_turn(chat_id)
+        finally:
+            # С этого момента новые правки встают в очередь заново
+            if self._pending_edits.get(edit_key) is slot:
+                del self._pending_edits[edit_key]
+        return await self._send(make_request, bot, slot[0], chat_id)
+
+    async def _send(self, make_request, bot, method, chat_id):
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = await make_request(bot, method)
+                self.sent += 1
+                return result
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    self.dropped += 1
+                    logger.warning(f"⚠️ Telegram: {e.method.__api_method__} в чат {chat_id} не отправлен после {attempt + 1} попыток")
+                    raise
+                self.retried += 1
+                bucket = self._chat_bucket(chat_id) if chat_id is not None else self.global_bucket
+                bucket.block(e.retry_after)
+                logger.info(f"⏳ Telegram просит подождать {e.retry_after} с (чат {chat_id})")
+                await asyncio.sleep(e.retry_after)
+                await self._wait_turn(chat_id)
+
+    def stats(self) -> dict:
+        return {
+            'queued': self.queued,
+            'pending_edits': len(self._pending_edits),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'retried': self.retried,
+            'dropped': self.dropped,
+            'chats': len(self.chat_buckets),
+        }
+
+
+telegram_limiter = TelegramRateLimiter()
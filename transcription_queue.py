@@ -0,0 +1,145 @@
+"""
+Фоновая очередь распознавания голосовых.
+
+Хендлер только ставит задание и сразу возвращается, а скачивание и Whisper
+выполняют несколько воркеров. Задания раздаются по кругу между пользователями:
+тот, кто прислал двадцать голосовых подряд, не задерживает остальных.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from config import VOICE_WORKERS, VOICE_QUEUE_MAX, VOICE_QUEUE_PER_USER
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних замеров хранить для перцентилей
+_SAMPLES = 1000
+
+
+def _percentile_ms(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 1)
+
+
+class TranscriptionQueue:
+    def __init__(self, workers=VOICE_WORKERS, max_size=VOICE_QUEUE_MAX, per_user=VOICE_QUEUE_PER_USER):
+        self.workers = workers
+        self.max_size = max_size
+        self.per_user = per_user
+
+        self._pending = {}            # user_id -> deque заданий
+        self._ready_users = deque()   # очередь пользователей с заданиями (round-robin)
+        self._jobs_available = None
+        self._worker_tasks = []
+        self._depth = 0
+        self._in_flight = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_times = deque(maxlen=_SAMPLES)
+        self.run_times = deque(maxlen=_SAMPLES)
+
+    def submit(self, user_id, work, on_result, on_error=None) -> bool:
+        """
+        Ставит задание: work() — корутина распознавания, on_result(result) /
+        on_error(exc) — что сделать с итогом. False, если очередь переполнена.
+        """
+        queued = self._pending.get(user_id)
+        if self._depth >= self.max_size or (queued and len(queued) >= self.per_user):
+            self.rejected += 1
+            return False
+
+        self._ensure_started()
+        if queued is None:
+            queued = self._pending[user_id] = deque()
+            self._ready_users.append(user_id)
+        queued.append((work, on_result, on_error, time.monotonic()))
+
+        self._depth += 1
+        self.submitted += 1
+        self._jobs_available.release()
+        return True
+
+    def _ensure_started(self):
+        if self._worker_tasks:
+            return
+        self._jobs_available = asyncio.Semaphore(0)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"transcription-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"🎤 Очередь распознавания: {self.workers} воркеров")
+
+    def _next_job(self):
+        user_id = self._ready_users.popleft()
+        queued = self._pending[user_id]
+        job = queued.popleft()
+        if queued:
+            self._ready_users.append(user_id)
+        else:
+            del self._pending[user_id]
+        self._depth -= 1
+        return job
+
+    async def _worker(self):
+        while True:
+            await self._jobs_available.acquire()
+            work, on_result, on_error, enqueued_at = self._next_job()
+
+            started = time.monotonic()
+            self.wait_times.append(started - enqueued_at)
+            self._in_flight += 1
+            try:
+                result = await work()
+                await on_result(result)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ Ошибка задания распознавания: {e}")
+                if on_error is not None:
+                    try:
+                        await on_error(e)
+                    except Exception as notify_error:
+                        logger.error(f"❌ Не удалось сообщить об ошибке: {notify_error}")
+            finally:
+                self._in_flight -= 1
+                self.run_times.append(time.monotonic() - started)
+
+    async def stop(self):
+        """Останавливает воркеров; невыполненные задания отбрасываются"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self._depth:
+            logger.warning(f"⚠️ Очередь распознавания остановлена, отброшено заданий: {self._depth}")
+        self._pending.clear()
+        self._ready_users.clear()
+        self._depth = 0
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._depth,
+            "in_flight": self._in_flight,
+            "users_waiting": len(self._pending),
+            "workers": len(self._worker_tasks),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_p50_ms": _percentile_ms(self.wait_times, 50),
+            "wait_p99_ms": _percentile_ms(self.wait_times, 99),
+            "run_p50_ms": _percentile_ms(self.run_times, 50),
+            "run_p99_ms": _percentile_ms(self.run_times, 99),
+        }
+
+
+transcription_queue = TranscriptionQueue()
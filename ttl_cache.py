@@ -0,0 +1,94 @@
+"""
+Словарь с ограничением размера и временем жизни записей (TTL + LRU).
+
+Для состояния «на пользователя», которое живёт в памяти процесса (распознанный
+текст голосового до нажатия кнопки, открытый месяц календаря): запись
+истекает, если к ней не обращались ttl_seconds, а при переполнении
+вытесняется самая давно использованная. Просроченные записи вычищаются
+проходом раз в sweep_interval секунд при обращениях к словарю, так что
+память долгоживущего процесса не растёт с числом пользователей.
+"""
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+# Все созданные кэши по имени — для метрик
+_registry = {}
+
+
+class TTLCache(MutableMapping):
+    def __init__(self, name, ttl_seconds, max_size, sweep_interval=60):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+
+        self._data = OrderedDict()   # key -> [value, expires_at]; самые свежие — в конце
+        self._last_sweep = time.monotonic()
+
+        self.evictions = 0
+        self.expirations = 0
+        _registry[name] = self
+
+    def __getitem__(self, key):
+        now = time.monotonic()
+        self._maybe_sweep(now)
+        entry = self._data[key]
+        if entry[1] <= now:
+            del self._data[key]
+            self.expirations += 1
+            raise KeyError(key)
+        # Обращение продлевает жизнь записи
+        entry[1] = now + self.ttl_seconds
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def __setitem__(self, key, value):
+        now = time.monotonic()
+        self._maybe_sweep(now)
+        self._data[key] = [value, now + self.ttl_seconds]
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+
+    def __iter__(self):
+        now = time.monotonic()
+        return iter([key for key, entry in self._data.items() if entry[1] > now])
+
+    def __len__(self):
+        self._maybe_sweep(time.monotonic())
+        return len(self._data)
+
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+    def sweep(self, now=None) -> int:
+        """Удаляет просроченные записи, возвращает их число"""
+        now = time.monotonic() if now is None else now
+        self._last_sweep = now
+        expired = [key for key, entry in self._data.items() if entry[1] <= now]
+        for key in expired:
+            del self._data[key]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._data),
+            'max_size': self.max_size,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+def all_stats() -> dict:
+    return {name: cache.stats() for name, cache in _registry.items()}
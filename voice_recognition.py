@@ -1,76 +1,148 @@
 import aiohttp
 import asyncio
-import tempfile
-import os
-from config import OPENAI_API_KEY
+import hashlib
+import logging
+import async_database as db
+from config import (
+    OPENAI_API_KEY,
+    WHISPER_API_URL,
+    OPENAI_TIMEOUT_SECONDS,
+    TRANSCRIPTION_CACHE_TTL_DAYS,
+    TRANSCRIPTION_CACHE_MAX_ENTRIES,
+)
+from http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+# Размер чанка при пересылке голосового из Telegram в Whisper: в памяти
+# одновременно лежит не больше одного такого куска
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+async def telegram_file_chunks(bot, file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Файл из Telegram потоком чанков — без BytesIO и временных файлов.
+    Следующий чанк читается, только когда предыдущий ушёл в загрузку.
+    """
+    if bot.session.api.is_local:
+        # локальный Bot API отдаёт путь на диске, а не HTTP-ссылку
+        buffer = await bot.download_file(file_path, chunk_size=chunk_size)
+        yield buffer.getvalue()
+        return
+
+    url = bot.session.api.file_url(bot.token, file_path)
+    async for chunk in bot.session.stream_content(url=url, chunk_size=chunk_size, raise_for_status=True):
+        yield chunk
+
 
 class VoiceRecognizer:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, api_url=None):
         self.api_key = api_key or OPENAI_API_KEY
+        self.api_url = api_url or WHISPER_API_URL
         self.is_available = bool(self.api_key)
+        self.cache_ttl = TRANSCRIPTION_CACHE_TTL_DAYS * 24 * 3600
+        self.cache_hits = 0
+        self.cache_misses = 0
     
+    async def recognize_telegram_voice(self, bot, voice, file_format="ogg"):
+        """
+        Голосовое из Telegram. file_unique_id одинаков у пересланных и повторно
+        отправленных копий, поэтому повтор не скачивается и не уходит в Whisper.
+        """
+        cache_key = f"tg:{voice.file_unique_id}"
+        cached = await db.get_cached_transcription(cache_key, self.cache_ttl)
+        if cached:
+            self.cache_hits += 1
+            logger.debug("Распознавание %s взято из кэша", cache_key)
+            return cached
+        self.cache_misses += 1
+
+        voice_file = await bot.get_file(voice.file_id)
+        text = await self.recognize_voice(telegram_file_chunks(bot, voice_file.file_path), file_format)
+        await self._remember(cache_key, text)
+        return text
+
+    async def recognize_bytes(self, voice_bytes, file_format="ogg"):
+        """Загруженный файл (/api/voice): кэш по хэшу содержимого"""
+        cache_key = f"sha256:{hashlib.sha256(voice_bytes).hexdigest()}"
+        cached = await db.get_cached_transcription(cache_key, self.cache_ttl)
+        if cached:
+            self.cache_hits += 1
+            logger.debug("Распознавание %s взято из кэша", cache_key)
+            return cached
+        self.cache_misses += 1
+
+        text = await self.recognize_voice(voice_bytes, file_format)
+        await self._remember(cache_key, text)
+        return text
+
+    def cache_stats(self) -> dict:
+        return {'hits': self.cache_hits, 'misses': self.cache_misses}
+
+    async def _remember(self, cache_key, text):
+        # ошибки и «не удалось распознать» не кэшируем — их стоит повторить
+        if text and not text.startswith("❌"):
+            await db.save_transcription(cache_key, text, TRANSCRIPTION_CACHE_MAX_ENTRIES, self.cache_ttl)
+
     async def recognize_voice(self, voice_file_data, file_format="ogg"):
+        """voice_file_data — bytes или асинхронный итератор чанков (см. telegram_file_chunks)"""
         if not self.is_available:
             return "❌ Голосовое распознавание недоступно. Не настроен OpenAI API ключ."
         
         try:
             return await self.recognize_with_whisper_api(voice_file_data, file_format)
         except Exception as e:
-            print(f"Ошибка распознавания голоса: {e}")
+            logger.error("Ошибка распознавания голоса: %s", e)
             return "❌ Ошибка при распознавании голоса. Попробуйте ещё раз."
     
     async def recognize_with_whisper_api(self, voice_file_data, file_format="ogg"):
         if not self.api_key:
             return "❌ OpenAI API ключ не настроен"
         
-        with tempfile.NamedTemporaryFile(suffix=f".{file_format}", delete=False) as temp_file:
-            temp_file.write(voice_file_data)
-            temp_file_path = temp_file.name
-        
         try:
-            async with aiohttp.ClientSession() as session:
-                data = aiohttp.FormData()
-                data.add_field('file', 
-                              open(temp_file_path, 'rb'), 
-                              filename=f"audio.{file_format}",
-                              content_type=f"audio/{file_format}")
-                data.add_field('model', 'whisper-1')
-                data.add_field('language', 'ru') 
+            session = await get_session()
+            data = aiohttp.FormData()
+            # bytes уходят без копии, итератор чанков — chunked-загрузкой по мере скачивания
+            data.add_field('file', 
+                          voice_file_data, 
+                          filename=f"audio.{file_format}",
+                          content_type=f"audio/{file_format}")
+            data.add_field('model', 'whisper-1')
+            data.add_field('language', 'ru') 
+            
+            headers = {
+                'Authorization': f'Bearer {self.api_key}'
+            }
+            
+            async with session.post(
+                self.api_url,
+                data=data,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=OPENAI_TIMEOUT_SECONDS)
+            ) as response:
+                
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error("Ошибка Whisper API: %s - %s", response.status, error_text)
+                    return f"❌ Ошибка распознавания: {response.status}"
                 
-                headers = {
-                    'Authorization': f'Bearer {self.api_key}'
-                }
+                result = await response.json()
+                recognized_text = result.get('text', '').strip()
                 
-                async with session.post(
-                    'https://api.openai.com/v1/audio/transcriptions',
-                    data=data,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    
-                    if response.status != 200:
-                        error_text = await response.text()
-                        print(f"Ошибка Whisper API: {response.status} - {error_text}")
-                        return f"❌ Ошибка распознавания: {response.status}"
-                    
-                    result = await response.json()
-                    recognized_text = result.get('text', '').strip()
-                    
-                    if recognized_text:
-                        return f"🎤 Распознанный текст:\n\n{recognized_text}"
-                    else:
-                        return "❌ Не удалось распознать речь. Попробуйте говорить чётче."
+                if recognized_text:
+                    return f"🎤 Распознанный текст:\n\n{recognized_text}"
+                else:
+                    return "❌ Не удалось распознать речь. Попробуйте говорить чётче."
         
         except asyncio.TimeoutError:
             return "❌ Превышено время ожидания. Попробуйте ещё раз."
         except Exception as e:
-            print(f"Ошибка Whisper API: {e}")
+            logger.error("Ошибка Whisper API: %s", e)
             return "❌ Ошибка при обращении к сервису распознавания."
         
         finally:
-            try:
-                os.unlink(temp_file_path)
-            except Exception:
-                pass
+            # если загрузка оборвалась, закрываем и скачивание из Telegram
+            if hasattr(voice_file_data, 'aclose'):
+                await voice_file_data.aclose()
 
 voice_recognizer = VoiceRecognizer()
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Режим webhook (BOT_MODE=webhook): Telegram сам присылает апдейты POST-запросом.
+
+Вместо long polling бот поднимает aiohttp.web-приложение с обработчиком
+апдейтов aiogram. Запросы без правильного X-Telegram-Bot-Api-Secret-Token
+отклоняются. При RUN_API_IN_BOT=1 в том же приложении живут маршруты
+/api/* мини-аппы (и /metrics есть в любом случае) — один процесс и один порт обслуживают и бота, и API.
+Несколько таких процессов можно поставить за балансировщик.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import (
+    BOT_TOKEN,
+    RUN_API_IN_BOT,
+    WEBHOOK_BASE_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def webhook_secret() -> str:
+    """
+    Секрет для заголовка X-Telegram-Bot-Api-Secret-Token. По умолчанию
+    выводится из BOT_TOKEN, чтобы все процессы бота получали одно значение.
+    """
+    if WEBHOOK_SECRET:
+        return WEBHOOK_SECRET
+    return hmac.new(BOT_TOKEN.encode(), b"focusup-webhook", hashlib.sha256).hexdigest()
+
+
+def create_webhook_app(dispatcher: Dispatcher, bot: Bot, with_api: bool = RUN_API_IN_BOT) -> web.Application:
+    if with_api:
+        from api_web import create_app
+        app = create_app()
+    else:
+        from metrics import metrics_handler
+        app = web.Application()
+        app.router.add_get('/metrics', metrics_handler)
+
+    SimpleRequestHandler(dispatcher=dispatcher, bot=bot, secret_token=webhook_secret()).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def register_webhook(bot: Bot, allowed_updates: list[str] | None = None):
+    if not WEBHOOK_BASE_URL:
+        logger.warning("⚠️ WEBHOOK_BASE_URL не задан — webhook в Telegram не регистрируется")
+        return
+    url = WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH
+    await bot.set_webhook(
+        url,
+        secret_token=webhook_secret(),
+        allowed_updates=allowed_updates,
+    )
+    logger.info(f"🔗 Webhook зарегистрирован: {url}")
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot, host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT):
+    """Обслуживает webhook (и API при RUN_API_IN_BOT=1) до отмены задачи"""
+    app = create_webhook_app(dispatcher, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        logger.info(f"🌐 Webhook слушает http://{host}:{port}{WEBHOOK_PATH}")
+        await register_webhook(bot, dispatcher.resolve_used_update_types())
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()